@@ -0,0 +1,84 @@
+import queue
+import threading
+from collections import namedtuple
+import numpy as np
+
+
+# Immutable per-file result batch published by the worker thread
+FileResult = namedtuple('FileResult', ['file_index', 'file_name', 'timestamps', 'heart_rates', 'quality',
+                                       'best_lead'])
+
+# Final message of a job: status is 'completed', 'cancelled' or 'error'
+JobFinished = namedtuple('JobFinished', ['status', 'message'])
+
+
+class AnalysisCancelled(Exception):
+    """Raised at a checkpoint after the job has been cancelled."""
+
+
+class AnalysisJob:
+    """
+    Pause/resume/cancel control and result channel for one background analysis run.
+
+    The worker calls ``checkpoint()`` between steps: it blocks on a threading.Event
+    while paused (woken immediately by resume/cancel) and raises AnalysisCancelled
+    once cancelled. Results travel to the Tk thread through ``results`` as immutable
+    FileResult batches followed by a single JobFinished.
+    """
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+        self.results = queue.Queue()
+
+    @property
+    def is_paused(self):
+        return not self._running.is_set()
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        """Request cancellation (also wakes a paused worker)."""
+        self._cancelled.set()
+        self._running.set()
+
+    def checkpoint(self):
+        """Block while paused; raise AnalysisCancelled if the job was cancelled."""
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise AnalysisCancelled()
+
+    def publish(self, file_index, file_name, timestamps, heart_rates, quality=None, best_lead=None):
+        """Queue one file's results as an immutable batch of read-only arrays (worker thread)."""
+        timestamps = np.array(timestamps, dtype=np.float64)
+        heart_rates = np.array(heart_rates, dtype=np.float32)
+        quality = np.full(len(timestamps), np.nan, dtype=np.float32) if quality is None \
+            else np.array(quality, dtype=np.float32)
+        best_lead = np.zeros(len(timestamps), dtype=np.int16) if best_lead is None \
+            else np.array(best_lead, dtype=np.int16)
+        for array in (timestamps, heart_rates, quality, best_lead):
+            array.flags.writeable = False
+        self.results.put(FileResult(file_index, file_name, timestamps, heart_rates, quality, best_lead))
+
+    def finish(self, status, message=""):
+        """Queue the final job status (worker thread)."""
+        self.results.put(JobFinished(status, message))
+
+    def drain(self, max_items=None):
+        """Return queued messages without blocking (Tk thread)."""
+        items = []
+        try:
+            while max_items is None or len(items) < max_items:
+                items.append(self.results.get_nowait())
+        except queue.Empty:
+            pass
+        return items
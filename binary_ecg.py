@@ -0,0 +1,322 @@
+import os
+import re
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+EDF_SUFFIXES = ('.edf',)
+WFDB_SUFFIXES = ('.hea',)  # WFDB records are read through their header (signals in the .dat files it names)
+
+EDF_HEADER_BYTES = 256
+EDF_ANNOTATION_LABEL = "EDF Annotations"  # EDF+ annotation channel (TAL bytes, not a signal)
+EDF_SIGNAL_FIELDS = (  # (name, width) of the per-signal header fields, stored field by field
+    ('label', 16), ('transducer', 80), ('physical_dimension', 8), ('physical_min', 8), ('physical_max', 8),
+    ('digital_min', 8), ('digital_max', 8), ('prefiltering', 80), ('samples_per_record', 8), ('reserved', 32)
+)
+
+WFDB_FORMATS = (16, 212)
+WFDB_DEFAULT_GAIN = 200.0  # ADC units per physical unit when the header gives 0
+_WFDB_FORMAT_RE = re.compile(r'^(\d+)')
+
+
+def _segment_times(start, count, seconds):
+    """Naive local datetimes of `count` consecutive segments of `seconds` each."""
+    return [start + timedelta(seconds=idx * seconds) for idx in range(count)]
+
+
+def _check_lead(target_lead, n_signals, file_name):
+    if target_lead is not None and not 1 <= target_lead <= n_signals:
+        raise IndexError(f"Lead {target_lead} out of range (1-{n_signals}) in {file_name}")
+
+
+# ---------------------------------------------------------------- EDF / EDF+
+
+def is_edf(head):
+    """True if the first bytes of a file look like an EDF header (version '0' + space padding)."""
+    return len(head) >= EDF_HEADER_BYTES and head[:8] == b'0       '
+
+
+def read_edf_header(file_path):
+    """
+    Parse the fixed EDF/EDF+ header.
+
+    Returns:
+        dict: start (naive local datetime), n_records, record_seconds, header_bytes,
+        signals (list of dicts with label, sampling_rate, samples_per_record, gain, offset)
+        and leads (header indices of the signals that are not EDF+ annotations).
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(EDF_HEADER_BYTES)
+        if not is_edf(head):
+            raise ValueError(f"Not an EDF file: {os.path.basename(file_path)}")
+        text = head.decode('ascii', errors='replace')
+        n_signals = int(text[252:256])
+        signal_text = f.read(n_signals * EDF_HEADER_BYTES).decode('ascii', errors='replace')
+
+    day, month, year = (int(part) for part in text[168:176].split('.'))
+    hour, minute, second = (int(part) for part in text[176:184].split('.'))
+    year += 1900 if year >= 85 else 2000  # EDF clipping date: 1985
+    header_bytes = int(text[184:192])
+    n_records = int(text[236:244])
+    record_seconds = float(text[244:252])
+
+    fields = {}
+    position = 0
+    for name, width in EDF_SIGNAL_FIELDS:
+        fields[name] = [signal_text[position + idx * width:position + (idx + 1) * width].strip()
+                        for idx in range(n_signals)]
+        position += n_signals * width
+
+    signals = []
+    for idx in range(n_signals):
+        physical_min, physical_max = float(fields['physical_min'][idx]), float(fields['physical_max'][idx])
+        digital_min, digital_max = float(fields['digital_min'][idx]), float(fields['digital_max'][idx])
+        gain = (physical_max - physical_min) / (digital_max - digital_min)
+        samples_per_record = int(fields['samples_per_record'][idx])
+        signals.append({
+            "label": fields['label'][idx],
+            "samples_per_record": samples_per_record,
+            "sampling_rate": samples_per_record / record_seconds if record_seconds else float('nan'),
+            "gain": gain,
+            "offset": physical_min - digital_min * gain
+        })
+
+    record_samples = sum(signal["samples_per_record"] for signal in signals)
+    if n_records < 0:  # -1 while recording: derive from the file size
+        n_records = (os.path.getsize(file_path) - header_bytes) // (2 * record_samples)
+    return {
+        "start": datetime(year, month, day, hour, minute, second),
+        "n_records": n_records,
+        "record_seconds": record_seconds,
+        "header_bytes": header_bytes,
+        "record_samples": record_samples,
+        "signals": signals,
+        "leads": [idx for idx, signal in enumerate(signals) if signal["label"] != EDF_ANNOTATION_LABEL]
+    }
+
+
+def read_edf(file_path, target_lead=None):
+    """
+    Read one signal (or all signals) of an EDF/EDF+ file, one segment per data record.
+
+    Data records are memory-mapped as an (n_records, record_samples) int16 array; the
+    selected signal is a column slice of it, scaled to physical units in one NumPy
+    operation. EDF+D (discontinuous) files are read as if contiguous.
+
+    Parameters:
+        file_path (str): .edf file.
+        target_lead (int or None): Lead number (1-based, header order of the signals that are not
+            EDF+ annotations); None = all leads (requires equal samples per record).
+
+    Returns:
+        tuple: (signal_segments (list of np.array float64), timestamps (list of datetime))
+    """
+    file_name = os.path.basename(file_path)
+    header = read_edf_header(file_path)
+    signals = header["signals"]
+    leads = header["leads"]
+    _check_lead(target_lead, len(leads), file_name)
+    if not header["n_records"]:
+        return [], []
+
+    records = np.memmap(file_path, dtype='<i2', mode='r', offset=header["header_bytes"],
+                        shape=(header["n_records"], header["record_samples"]))
+    starts = np.cumsum([0] + [signal["samples_per_record"] for signal in signals])
+    selected = leads if target_lead is None else [leads[target_lead - 1]]
+    if len({signals[idx]["samples_per_record"] for idx in selected}) > 1:
+        raise ValueError(f"Signals of {file_name} have different sampling rates; select one lead")
+
+    # (leads, n_records, samples_per_record), physical units
+    data = np.stack([records[:, starts[idx]:starts[idx + 1]] * signals[idx]["gain"] + signals[idx]["offset"]
+                     for idx in selected])
+    del records
+    timestamps = _segment_times(header["start"], header["n_records"], header["record_seconds"])
+    if target_lead is None:
+        segments = list(data.transpose(1, 0, 2))
+    else:
+        segments = list(data[0])
+    logger.info(f"EDF {file_name}: {len(leads)} signals, {header['n_records']} records of "
+                f"{header['record_seconds']:g} s, {signals[selected[0]]['sampling_rate']:g} Hz")
+    return segments, timestamps
+
+
+def edf_sampling_rate(file_path, target_lead=None):
+    """Sampling rate (Hz) of one lead, or of all leads (target_lead None; must be equal), from the header."""
+    header = read_edf_header(file_path)
+    leads = header["leads"]
+    _check_lead(target_lead, len(leads), os.path.basename(file_path))
+    selected = leads if target_lead is None else [leads[target_lead - 1]]
+    rates = {header["signals"][idx]["sampling_rate"] for idx in selected}
+    if len(rates) > 1:
+        raise ValueError(f"Signals of {os.path.basename(file_path)} have different sampling rates; select one lead")
+    return rates.pop() if rates else None
+
+
+def edf_time_span(file_path):
+    """(first, last) segment start as epoch seconds, from the header only."""
+    header = read_edf_header(file_path)
+    first = header["start"].timestamp()
+    return first, first + max(header["n_records"] - 1, 0) * header["record_seconds"]
+
+
+# ---------------------------------------------------------------- WFDB (format 16 / 212)
+
+def is_wfdb_header(head):
+    """True if the first bytes look like a WFDB record line ('name nsig fs ...')."""
+    first_line = head.split(b'\n', 1)[0].strip()
+    parts = first_line.split()
+    return len(parts) >= 2 and not first_line.startswith((b'{', b'#')) and parts[1].isdigit() \
+        and re.match(rb'^[\w.-]+(/\d+)?$', parts[0]) is not None
+
+
+def read_wfdb_header(file_path):
+    """
+    Parse a WFDB .hea header (single-segment records).
+
+    Returns:
+        dict: sampling_rate, n_samples (or None), start (naive datetime or None) and
+        signals (list of dicts with file, format, byte_offset, gain, baseline, label).
+    """
+    with open(file_path, 'r', encoding='ascii', errors='replace') as f:
+        lines = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    if not lines:
+        raise ValueError(f"Empty WFDB header: {os.path.basename(file_path)}")
+
+    record = lines[0].split()
+    if '/' in record[0]:
+        raise ValueError(f"Multi-segment WFDB records are not supported: {os.path.basename(file_path)}")
+    n_signals = int(record[1])
+    sampling_rate = float(record[2].split('/')[0].split('(')[0]) if len(record) > 2 else 250.0
+    n_samples = int(record[3]) if len(record) > 3 else None
+    start = None
+    if len(record) > 5:
+        start = datetime.strptime(f"{record[5]} {record[4].split('.')[0]}", '%d/%m/%Y %H:%M:%S')
+    elif len(record) > 4:
+        logger.warning(f"WFDB header {os.path.basename(file_path)} has a base time but no base date")
+
+    signals = []
+    for line in lines[1:1 + n_signals]:
+        parts = line.split()
+        spec = parts[1]
+        fmt = int(_WFDB_FORMAT_RE.match(spec).group(1))
+        byte_offset = int(spec.split('+')[1]) if '+' in spec else 0
+        if 'x' in spec or ':' in spec:
+            raise ValueError(f"WFDB samples-per-frame/skew modifiers are not supported ({spec})")
+        gain_spec = parts[2] if len(parts) > 2 else '0'
+        gain = float(re.match(r'^[\d.eE+-]+', gain_spec).group(0)) or WFDB_DEFAULT_GAIN
+        adc_zero = int(parts[4]) if len(parts) > 4 else 0
+        baseline_match = re.search(r'\((-?\d+)\)', gain_spec)
+        signals.append({
+            "file": parts[0],
+            "format": fmt,
+            "byte_offset": byte_offset,
+            "gain": gain,
+            "baseline": int(baseline_match.group(1)) if baseline_match else adc_zero,
+            "label": ' '.join(parts[8:]) if len(parts) > 8 else f"signal {len(signals) + 1}"
+        })
+    if len(signals) != n_signals:
+        raise ValueError(f"WFDB header lists {len(signals)} of {n_signals} signals")
+    return {"sampling_rate": sampling_rate, "n_samples": n_samples, "start": start, "signals": signals}
+
+
+def _decode_212(raw):
+    """Unpack format 212 (two 12-bit two's complement samples in 3 bytes), vectorized."""
+    triplets = raw[:raw.size // 3 * 3].reshape(-1, 3).astype(np.int16)
+    samples = np.empty(2 * triplets.shape[0], dtype=np.int16)
+    samples[0::2] = triplets[:, 0] | ((triplets[:, 1] & 0x0F) << 8)
+    samples[1::2] = triplets[:, 2] | ((triplets[:, 1] & 0xF0) << 4)
+    samples[samples >= 2048] -= 4096
+    return samples
+
+
+def _read_wfdb_file_signals(dat_path, fmt, byte_offset, n_file_signals):
+    """Memory-map one .dat file as an (n_frames, n_file_signals) array of ADC values."""
+    if fmt == 16:
+        raw = np.memmap(dat_path, dtype='<i2', mode='r', offset=byte_offset)
+    elif fmt == 212:
+        raw = _decode_212(np.memmap(dat_path, dtype=np.uint8, mode='r', offset=byte_offset))
+    else:
+        raise ValueError(f"Unsupported WFDB format {fmt} (supported: {', '.join(map(str, WFDB_FORMATS))})")
+    n_frames = raw.size // n_file_signals
+    return raw[:n_frames * n_file_signals].reshape(n_frames, n_file_signals)
+
+
+def read_wfdb(file_path, target_lead=None, segment_seconds=1.0):
+    """
+    Read one signal (or all signals) of a WFDB record (.hea + format 16/212 .dat files).
+
+    Format 16 data is memory-mapped and the selected signal is a strided column view;
+    format 212 is unpacked with vectorized bit operations. Each .dat file is mapped and
+    decoded once, whatever number of its interleaved signals is read. Samples are converted
+    to physical units ((adc - baseline) / gain) and split into `segment_seconds` segments.
+
+    Parameters:
+        file_path (str): .hea header file (the .dat files are resolved next to it).
+        target_lead (int or None): Signal number (1-based, header order); None = all signals.
+        segment_seconds (float): Length of the returned segments.
+
+    Returns:
+        tuple: (signal_segments (list of np.array float64), timestamps (list of datetime))
+    """
+    file_name = os.path.basename(file_path)
+    header = read_wfdb_header(file_path)
+    signals = header["signals"]
+    _check_lead(target_lead, len(signals), file_name)
+    selected = range(len(signals)) if target_lead is None else [target_lead - 1]
+
+    folder = os.path.dirname(file_path)
+    file_signals = {}  # .dat file -> header indices of its (interleaved) signals
+    for idx, signal in enumerate(signals):
+        file_signals.setdefault(signal["file"], []).append(idx)
+
+    file_frames = {}  # .dat file -> its decoded frames, shared by the signals read from it
+    leads = []
+    for idx in selected:
+        signal = signals[idx]
+        members = file_signals[signal["file"]]
+        frames = file_frames.get(signal["file"])
+        if frames is None:
+            # Format and byte offset of a file are given with each of its signals (the first one is used)
+            first = signals[members[0]]
+            frames = file_frames[signal["file"]] = _read_wfdb_file_signals(
+                os.path.join(folder, signal["file"]), first["format"], first["byte_offset"], len(members))
+        column = frames[:header["n_samples"], members.index(idx)]
+        leads.append((column - signal["baseline"]) / signal["gain"])
+    n_samples = min(lead.size for lead in leads)
+    data = np.stack([lead[:n_samples] for lead in leads])
+
+    start = header["start"]
+    if start is None:
+        # No base date/time: assume the record ended when the .hea file was last written
+        start = datetime.fromtimestamp(os.path.getmtime(file_path) - n_samples / header["sampling_rate"])
+        logger.warning(f"WFDB {file_name}: no base date/time in header; using file time {start}")
+
+    segment_samples = max(int(round(segment_seconds * header["sampling_rate"])), 1)
+    n_segments = -(-n_samples // segment_samples)
+    timestamps = _segment_times(start, n_segments, segment_samples / header["sampling_rate"])
+    bounds = np.arange(segment_samples, n_samples, segment_samples)
+    source = data if target_lead is None else data[0]
+    segments = np.split(source, bounds, axis=-1)
+    logger.info(f"WFDB {file_name}: {len(signals)} signals, {n_samples} samples at {header['sampling_rate']:g} Hz")
+    return segments, timestamps
+
+
+def wfdb_sampling_rate(file_path, target_lead=None):
+    """Sampling rate (Hz) of a WFDB record, from the header (shared by all signals)."""
+    header = read_wfdb_header(file_path)
+    _check_lead(target_lead, len(header["signals"]), os.path.basename(file_path))
+    return header["sampling_rate"]
+
+
+def wfdb_time_span(file_path):
+    """(first, last) segment start as epoch seconds (sample count from the header or .dat size)."""
+    header = read_wfdb_header(file_path)
+    n_samples = header["n_samples"]
+    if n_samples is None or header["start"] is None:
+        timestamps = read_wfdb(file_path, 1)[1]
+        return (timestamps[0].timestamp(), timestamps[-1].timestamp()) if timestamps else None
+    first = header["start"].timestamp()
+    return first, first + max(int(np.ceil(n_samples / header["sampling_rate"])) - 1, 0)
@@ -0,0 +1,400 @@
+import os
+import zlib
+import queue
+import logging
+import zipfile
+import threading
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# Logical path of a member inside a zip bundle: "<bundle>.zip::<member>"
+ARCHIVE_MEMBER_SEP = "::"
+
+ECG_FILE_SUFFIXES = ('.txt', '.txt.gz', '.txt.zst', '.zst')
+ZIP_SUFFIX = '.zip'
+
+READ_BLOCK_SIZE = 1 << 20  # Compressed bytes read per decompression step
+MAX_PENDING_BLOCKS = 8  # Decompressed blocks buffered between reader thread and parser
+# Inputs decompressed on background threads at the same time (each buffers up to MAX_PENDING_BLOCKS
+# blocks); further inputs, e.g. in a k-way merge over many files, are decompressed inline
+MAX_DECODE_THREADS = 4
+_decode_slots = threading.BoundedSemaphore(MAX_DECODE_THREADS)
+
+# Start of each independently decompressible gzip member / zstd frame:
+# compressed byte offset + offset of its first byte in the decompressed stream
+FRAME_INDEX_DTYPE = np.dtype([('compressed_offset', '<i8'), ('offset', '<i8')])
+
+
+def split_member_path(path):
+    """Return (file on disk, zip member name or None) of a logical input path."""
+    if ARCHIVE_MEMBER_SEP in path:
+        archive, member = path.split(ARCHIVE_MEMBER_SEP, 1)
+        return archive, member
+    return path, None
+
+
+def compression_of(path):
+    """Compression of an input path: 'zip', 'gzip', 'zstd' or None (plain text)."""
+    archive, member = split_member_path(path)
+    if member is not None:
+        return 'zip'
+    lower = archive.lower()
+    if lower.endswith('.gz'):
+        return 'gzip'
+    if lower.endswith(('.zst', '.zstd')):
+        return 'zstd'
+    return None
+
+
+def file_cache_key(path):
+    """Cache key (path, size, mtime, member) of a plain, compressed or zip-member input."""
+    archive, member = split_member_path(path)
+    stat = os.stat(archive)
+    return os.path.abspath(archive), stat.st_size, stat.st_mtime, member
+
+
+def scan_input_files(folder_path, extra_suffixes=()):
+    """
+    Raw ECG inputs of a folder with the stat of the file holding them (one os.scandir pass).
+
+    Parameters:
+        folder_path (str): Input folder.
+        extra_suffixes (tuple): Further lower-case suffixes to list (e.g. binary formats).
+
+    Returns:
+        list: (logical path, os.stat_result) sorted by path; zip members share the stat of their bundle.
+        Corrupt zip bundles are logged and skipped.
+    """
+    suffixes = ECG_FILE_SUFFIXES + tuple(extra_suffixes)
+    inputs = []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            lower = entry.name.lower()
+            if lower.endswith(suffixes):
+                inputs.append((entry.path, entry.stat()))
+            elif lower.endswith(ZIP_SUFFIX):
+                stat = entry.stat()
+                try:
+                    with zipfile.ZipFile(entry.path) as bundle:
+                        members = sorted(name for name in bundle.namelist() if name.lower().endswith('.txt'))
+                except zipfile.BadZipFile as e:
+                    logger.warning(f"  Warning: Skipped corrupt zip bundle {entry.name}: {str(e)}")
+                    continue
+                inputs.extend((entry.path + ARCHIVE_MEMBER_SEP + name, stat) for name in members)
+    inputs.sort(key=lambda item: item[0])
+    return inputs
+
+
+def list_input_files(folder_path, extra_suffixes=()):
+    """
+    Sorted raw ECG inputs of a folder: plain/.gz/.zst files and the .txt members of zip bundles.
+
+    Parameters:
+        folder_path (str): Input folder.
+        extra_suffixes (tuple): Further lower-case suffixes to list (e.g. binary formats).
+
+    Returns:
+        list: Logical input paths (zip members as "<bundle>.zip::<member>").
+    """
+    return [path for path, _ in scan_input_files(folder_path, extra_suffixes)]
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("Reading .zst files requires zstandard (Tip: `pip install zstandard`)") from e
+    return zstandard
+
+
+def _new_decompressor(compression):
+    if compression == 'gzip':
+        return zlib.decompressobj(wbits=31)  # 31: gzip header + trailer
+    return _zstd().ZstdDecompressor().decompressobj()
+
+
+def _decompression_errors(compression):
+    return (zlib.error,) if compression == 'gzip' else (_zstd().ZstdError,)
+
+
+def iter_decompressed_blocks(path, compressed_offset=0):
+    """
+    Decompress a gzip/zstd file starting at a member/frame boundary.
+
+    Every gzip member or zstd frame is decompressed with a fresh decompressor, so
+    decoding can start at any frame recorded in a frame index.
+
+    Yields:
+        tuple: (frame_compressed_offset or None, decompressed bytes); the offset is set
+        on the first block of every frame.
+    """
+    compression = compression_of(path)
+    errors = _decompression_errors(compression)
+    with open(path, 'rb') as f:
+        f.seek(compressed_offset)
+        position = compressed_offset  # Compressed offset after the bytes read so far
+        decompressor = None
+        pending = b''
+        while True:
+            if not pending:
+                pending = f.read(READ_BLOCK_SIZE)
+                if not pending:
+                    break
+                position += len(pending)
+            if decompressor is None:
+                pending = pending.lstrip(b'\0')  # Zero padding between/after frames
+                if not pending:
+                    continue
+                frame_start = position - len(pending)
+                decompressor = _new_decompressor(compression)
+                first_block = True
+            try:
+                block = decompressor.decompress(pending)
+            except errors as e:
+                raise OSError(f"Corrupt {compression} data in {os.path.basename(path)} "
+                              f"(frame at byte {frame_start}): {e}") from e
+            yield (frame_start if first_block else None), block
+            first_block = False
+            if decompressor.eof:
+                pending = decompressor.unused_data
+                decompressor = None
+            else:
+                pending = b''
+
+
+def iter_in_thread(make_iter, max_pending=MAX_PENDING_BLOCKS):
+    """
+    Run an iterator on a background thread, handing items over through a bounded queue.
+
+    Decompression (zlib/zstd release the GIL) then overlaps with parsing in the
+    consuming thread. Exceptions are re-raised in the consumer; closing the
+    consumer stops the producer. At most MAX_DECODE_THREADS iterators run on
+    threads at once; when all slots are taken the iterator runs inline in the
+    consumer (never waits for a slot, so a k-way merge cannot deadlock).
+    """
+    if not _decode_slots.acquire(blocking=False):
+        yield from make_iter()
+        return
+
+    items = queue.Queue(max_pending)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in make_iter():
+                if not put(item):
+                    return
+            put(done)
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            _decode_slots.release()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    try:
+        thread.start()
+    except BaseException:
+        _decode_slots.release()
+        raise
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+class _ProducerError:
+    def __init__(self, error):
+        self.error = error
+
+
+def _iter_member_blocks(path):
+    archive, member = split_member_path(path)
+    with zipfile.ZipFile(archive) as bundle, bundle.open(member) as f:
+        first = True
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            yield (0 if first else None), block
+            first = False
+
+
+def iter_line_offsets(path, frames=None):
+    """
+    Stream the lines of a compressed input with their offsets in the decompressed stream.
+
+    Decompression runs on a separate thread (iter_in_thread).
+
+    Parameters:
+        path (str): gzip/zstd file or zip member path.
+        frames (list, optional): Filled with (compressed_offset, offset) frame starts.
+
+    Yields:
+        tuple: (offset, line bytes including the newline)
+    """
+    compression = compression_of(path)
+    if compression == 'zip':
+        make_blocks = lambda: _iter_member_blocks(path)
+    else:
+        make_blocks = lambda: iter_decompressed_blocks(path)
+
+    offset = 0  # Decompressed offset of the start of `carry`
+    carry = b''
+    for frame_start, block in iter_in_thread(make_blocks):
+        if frame_start is not None and frames is not None:
+            frames.append((frame_start, offset + len(carry)))
+        if not block:
+            continue
+        lines = (carry + block).split(b'\n')
+        carry = lines.pop()
+        for line in lines:
+            yield offset, line + b'\n'
+            offset += len(line) + 1
+    if carry:
+        yield offset, carry
+
+
+def iter_lines(path):
+    """Lines of a plain (str) or compressed (bytes, threaded decompression) ECG input."""
+    if compression_of(path) is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from f
+        return
+    for _, line in iter_line_offsets(path):
+        yield line
+
+
+def _frame_before(frames, start):
+    """(compressed offset, decompressed offset) of the last frame (FRAME_INDEX_DTYPE) at or before `start`."""
+    if frames is None or not len(frames):
+        return 0, 0
+    frame = max(int(np.searchsorted(frames['offset'], start, side='right')) - 1, 0)
+    return int(frames['compressed_offset'][frame]), int(frames['offset'][frame])
+
+
+def iter_lines_from(path, start, frames=None):
+    """
+    Lines (bytes) of an input from decompressed byte offset `start` (a line start) to the end.
+
+    Plain files and zip members are seeked directly; gzip/zstd inputs decode from the
+    last frame at or before `start` on a separate thread and skip to `start`.
+    """
+    compression = compression_of(path)
+    if compression is None:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            yield from f
+        return
+    if compression == 'zip':
+        archive, member = split_member_path(path)
+        with zipfile.ZipFile(archive) as bundle, bundle.open(member) as f:
+            f.seek(start)
+            yield from f
+        return
+
+    compressed_offset, position = _frame_before(frames, start)
+    skip = start - position
+    carry = b''
+    for _, block in iter_in_thread(lambda: iter_decompressed_blocks(path, compressed_offset)):
+        if skip:
+            if len(block) <= skip:
+                skip -= len(block)
+                continue
+            block = block[skip:]
+            skip = 0
+        lines = (carry + block).split(b'\n')
+        carry = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+    if carry:
+        yield carry
+
+
+def read_byte_range(path, start, stop, frames=None):
+    """
+    Return decompressed bytes [start, stop) of an input.
+
+    gzip/zstd inputs start decoding at the last frame beginning at or before
+    `start` (frame index from iter_line_offsets); zip members are seeked inside
+    the member stream; plain files are read directly.
+    """
+    compression = compression_of(path)
+    if compression is None:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return f.read(stop - start)
+    if compression == 'zip':
+        archive, member = split_member_path(path)
+        with zipfile.ZipFile(archive) as bundle, bundle.open(member) as f:
+            f.seek(start)
+            return f.read(stop - start)
+
+    compressed_offset, position = _frame_before(frames, start)
+    parts = []
+    for _, block in iter_decompressed_blocks(path, compressed_offset):
+        block_end = position + len(block)
+        if block_end > start:
+            parts.append(block[max(start - position, 0):stop - position])
+        position = block_end
+        if position >= stop:
+            break
+    return b''.join(parts)
+
+
+def compress_seekable(src_path, dst_path, frame_bytes=1 << 22, level=6):
+    """
+    Compress a raw ECG text file as independent gzip members / zstd frames.
+
+    Frames hold whole lines of about `frame_bytes` each, so window reads through
+    the frame index decode at most one frame before the requested lines.
+
+    Parameters:
+        src_path (str): Plain text input.
+        dst_path (str): Output path ending in .gz or .zst.
+        frame_bytes (int): Uncompressed bytes per frame.
+        level (int): Compression level.
+
+    Returns:
+        int: Number of frames written.
+    """
+    compression = compression_of(dst_path)
+    if compression == 'gzip':
+        import gzip
+        compress = lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+    elif compression == 'zstd':
+        compressor = _zstd().ZstdCompressor(level=level)
+        compress = compressor.compress
+    else:
+        raise ValueError(f"Unsupported output compression: {dst_path} (.gz or .zst)")
+
+    frames = 0
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        while True:
+            data = src.read(frame_bytes)
+            if not data:
+                break
+            data += src.readline()  # Frames end on line boundaries
+            dst.write(compress(data))
+            frames += 1
+    return frames
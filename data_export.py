@@ -1,24 +1,37 @@
 import json
 import os
 from datetime import datetime
+import numpy as np
 
+from hr_series import HRSeries, as_hr_arrays
 
-def export_to_json(combined_timestamps, combined_heart_rates, hr_stats=None, export_path="ecg_hr_results.json"):
+
+def export_to_json(combined_timestamps, combined_heart_rates=None, hr_stats=None, export_path="ecg_hr_results.json",
+                   quality_scores=None, rollups=None, best_leads=None):
     """
     Export analysis results + time-domain stats to JSON file (English parameters).
 
     Parameters:
-        combined_timestamps (list): Combined timestamps from all files.
-        combined_heart_rates (list): Combined heart rates from all files.
+        combined_timestamps (list/np.array/HRSeries): Combined timestamps (or a HRSeries) from all files.
+        combined_heart_rates (list/np.array): Combined heart rates from all files (None for a HRSeries).
         hr_stats (dict, optional): HR time-domain statistics. Defaults to None.
         export_path (str): Path to save JSON file.
+        quality_scores (list/np.array, optional): Per-point signal quality (taken from a HRSeries if None).
+        rollups (dict, optional): Hourly/daily/day-night stats tables (HRRollup.to_dict()).
+        best_leads (list/np.array, optional): Per-point best lead of multi-lead detection, 0 for
+            single-lead points (taken from a HRSeries if None).
 
     Returns:
         bool: True if export successful, False otherwise.
     """
     try:
+        if quality_scores is None and isinstance(combined_timestamps, HRSeries):
+            quality_scores = combined_timestamps.quality
+        if best_leads is None and isinstance(combined_timestamps, HRSeries):
+            best_leads = combined_timestamps.best_lead
+        combined_timestamps, combined_heart_rates = as_hr_arrays(combined_timestamps, combined_heart_rates)
         readable_timestamps = [datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-                               for ts in combined_timestamps]
+                               for ts in combined_timestamps.tolist()]
 
         export_data = {
             "analysis_info": {
@@ -27,14 +40,31 @@ def export_to_json(combined_timestamps, combined_heart_rates, hr_stats=None, exp
             },
             "heart_rate_time_domain": {
                 "timestamps": readable_timestamps,
-                "heart_rates_bpm": [round(hr, 2) for hr in combined_heart_rates]
+                "heart_rates_bpm": np.round(combined_heart_rates.astype(np.float64), 2).tolist()
             }
         }
 
+        # Per-minute signal quality next to each HR (null where unknown)
+        if quality_scores is not None:
+            quality_scores = np.asarray(quality_scores, dtype=np.float64)
+            if not np.isnan(quality_scores).all():
+                export_data["heart_rate_time_domain"]["quality_scores"] = [
+                    None if np.isnan(q) else q for q in np.round(quality_scores, 3).tolist()]
+
+        # Best lead of multi-lead minutes (null for single-lead minutes)
+        if best_leads is not None:
+            best_leads = np.asarray(best_leads, dtype=np.int64)
+            if best_leads.any():
+                export_data["heart_rate_time_domain"]["best_leads"] = [
+                    lead if lead else None for lead in best_leads.tolist()]
+
         # 新增：导出HR时域统计量
         if hr_stats and isinstance(hr_stats, dict):
             export_data["hr_time_domain_stats"] = hr_stats
 
+        if rollups:
+            export_data["hr_rollups"] = rollups
+
         os.makedirs(os.path.dirname(export_path), exist_ok=True)
 
         with open(export_path, 'w', encoding='utf-8') as f:
@@ -1,17 +1,166 @@
 import os
+import re
 import json
+import heapq
+import functools
+import logging
+from operator import itemgetter
+from collections import namedtuple
 from datetime import datetime
 import numpy as np
 
+from diagnostics import FileDiagnostics
+from compressed_io import (
+    FRAME_INDEX_DTYPE, compression_of, file_cache_key, iter_in_thread, iter_lines, iter_lines_from,
+    iter_line_offsets, list_input_files, read_byte_range
+)
+from binary_ecg import (
+    EDF_SUFFIXES, WFDB_SUFFIXES, is_edf, is_wfdb_header, read_edf, read_wfdb, edf_sampling_rate, edf_time_span,
+    wfdb_sampling_rate, wfdb_time_span
+)
 
-def read_single_file_lead_data(file_path, target_lead=4, total_leads=9):
+
+logger = logging.getLogger(__name__)
+
+# Per-line offset index of a raw ECG text file: recordTime + byte range of the line
+OFFSET_INDEX_DTYPE = np.dtype([('record_ts', '<f8'), ('offset', '<i8'), ('length', '<i8')])
+_RECORD_TIME_RE = re.compile(rb'"recordTime"\s*:\s*(-?\d+(?:\.\d+)?)')
+OFFSET_INDEX_CACHE_FILES = 64  # Offset indexes kept in memory (least recently used are evicted)
+
+# Binary ECG formats (read without the JSON-lines parser), see register_format_reader
+FormatReader = namedtuple('FormatReader', ['name', 'suffixes', 'sniff', 'read', 'time_span', 'sampling_rate'])
+FORMAT_SNIFF_BYTES = 256
+_format_readers = []
+
+
+def register_format_reader(name, suffixes, read, sniff=None, time_span=None, sampling_rate=None):
+    """
+    Register a binary ECG input format.
+
+    Parameters:
+        name (str): Format name.
+        suffixes (tuple): Lower-case file suffixes of the format.
+        read (callable): read(path, target_lead) -> (signal_segments, datetime timestamps), the
+            structure of read_single_file_lead_data; target_lead None = all leads ((leads, n) segments).
+        sniff (callable, optional): sniff(first FORMAT_SNIFF_BYTES bytes) -> bool, for files without a known suffix.
+        time_span (callable, optional): time_span(path) -> (first_ts, last_ts) without reading the samples.
+        sampling_rate (callable, optional): sampling_rate(path, target_lead) -> rate in Hz from the file
+            header; the analysis then uses it instead of the configured rate (see resolve_sampling_rate).
+    """
+    _format_readers.append(FormatReader(name, tuple(suffixes), sniff, read, time_span, sampling_rate))
+
+
+def detect_format_reader(file_path):
+    """
+    Binary format reader of an input, by file suffix, else by sniffing the header bytes.
+
+    Returns:
+        FormatReader or None: None for JSON-lines text inputs (plain or compressed).
+    """
+    lower = file_path.lower()
+    for reader in _format_readers:
+        if lower.endswith(reader.suffixes):
+            return reader
+    if compression_of(file_path) is not None or not os.path.isfile(file_path):
+        return None
+    with open(file_path, 'rb') as f:
+        head = f.read(FORMAT_SNIFF_BYTES)
+    if head.lstrip()[:1] == b'{':  # JSON-lines record
+        return None
+    for reader in _format_readers:
+        if reader.sniff is not None and reader.sniff(head):
+            return reader
+    return None
+
+
+def format_reader_suffixes():
+    """File suffixes of all registered binary formats."""
+    return tuple(suffix for reader in _format_readers for suffix in reader.suffixes)
+
+
+register_format_reader("edf", EDF_SUFFIXES, read_edf, is_edf, edf_time_span, edf_sampling_rate)
+register_format_reader("wfdb", WFDB_SUFFIXES, read_wfdb, is_wfdb_header, wfdb_time_span, wfdb_sampling_rate)
+
+
+def get_file_sampling_rate(file_path, target_lead=None):
     """
-    Read single raw ECG file's selected lead data and timestamps (original logic unchanged).
+    Sampling rate stored in the header of a binary input (target_lead None = all leads).
+
+    Returns:
+        float or None: Rate in Hz, None for JSON-lines text inputs (no rate in the file).
+    """
+    reader = detect_format_reader(file_path)
+    if reader is None or reader.sampling_rate is None:
+        return None
+    return reader.sampling_rate(file_path, target_lead)
+
+
+def resolve_sampling_rate(file_paths, default_rate, target_lead=None):
+    """
+    Sampling rate to analyze a set of inputs with.
+
+    Binary inputs carry their rate in the header, which overrides the configured
+    rate; text inputs have no rate and use default_rate. Inputs analyzed together
+    (one run, one stream filter) must share one rate.
+
+    Parameters:
+        file_paths (list): Input files of the run.
+        default_rate (int): Configured sampling rate (GUI/CLI), used for text inputs.
+        target_lead (int, optional): Selected lead number (1-based), None = all leads.
+
+    Returns:
+        int or float: Sampling rate in Hz.
+
+    Raises:
+        ValueError: If the inputs have different rates (or text inputs are mixed with
+            binary inputs of another rate than default_rate).
+    """
+    rates = {}
+    has_text = False
+    for path in file_paths:
+        rate = get_file_sampling_rate(path, target_lead)
+        if rate is None:
+            has_text = True
+        else:
+            rates.setdefault(float(rate), os.path.basename(path))
+    if not rates:
+        return default_rate
+    if has_text:
+        rates.setdefault(float(default_rate), "text inputs (configured rate)")
+    if len(rates) > 1:
+        listed = ", ".join(f"{rate:g} Hz ({name})" for rate, name in sorted(rates.items()))
+        raise ValueError(f"Inputs have different sampling rates: {listed}. Analyze them separately.")
+    rate = next(iter(rates))
+    return int(rate) if rate.is_integer() else rate
+
+
+def _read_binary_file(reader, file_path, target_lead):
+    """Read a binary ECG input with its format reader (errors are logged, file skipped)."""
+    file_name = os.path.basename(file_path)
+    try:
+        file_signal_segments, file_timestamps = reader.read(file_path, target_lead)
+    except Exception as e:
+        logger.error(f'Error reading {reader.name.upper()} file {file_name}: {e}. Skipped file.')
+        return [], []
+    logger.info(f'Processed file: {file_name}')
+    logger.info(f'  Extracted {len(file_signal_segments)} valid signal segments')
+    return file_signal_segments, file_timestamps
+
+
+def read_single_file_lead_data(file_path, target_lead=4, total_leads=9, diagnostics=None):
+    """
+    Read single raw ECG file's selected lead data and timestamps.
+
+    Malformed lines are skipped and aggregated per category in a FileDiagnostics
+    object, which is logged once per file instead of once per line. Binary inputs
+    (EDF, WFDB; see detect_format_reader) are read by their format reader, with
+    the lead count taken from the file header.
 
     Parameters:
         file_path (str): Path to single ECG text file.
         target_lead (int): Selected lead number (1-based).
         total_leads (int): Total number of leads in data.
+        diagnostics (FileDiagnostics, optional): Collector for skipped lines (created if None).
 
     Returns:
         tuple: (file_signal_segments, file_timestamps)
@@ -19,80 +168,468 @@ def read_single_file_lead_data(file_path, target_lead=4, total_leads=9):
     file_signal_segments = []
     file_timestamps = []
     lead_index = target_lead - 1
+    file_name = os.path.basename(file_path)
+    if diagnostics is None:
+        diagnostics = FileDiagnostics(file_name)
+
+    reader = detect_format_reader(file_path)
+    if reader is not None:
+        return _read_binary_file(reader, file_path, target_lead)
+
+    # A bad lead index fails every line the same way, so reject it once up front
+    if lead_index < 0 or lead_index >= total_leads:
+        logger.error(f'Error: Lead {target_lead} out of range (1-{total_leads}). Skipped file {file_name}.')
+        return [], []
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line_str in f:
-                try:
-                    data_line = json.loads(line_str)
-                    record_time = datetime.fromtimestamp(data_line['recordTime'])
-                    file_timestamps.append(record_time)
-
-                    if lead_index < 0 or lead_index >= total_leads:
-                        raise IndexError(f"Lead {target_lead} out of range (1-{total_leads})")
-
-                    wave_data = data_line['data']['waveDataList'][lead_index]['waveDataVoList']
-                    signal_values = [float(item['sample']) for item in wave_data]
-                    file_signal_segments.append(signal_values)
-
-                except json.JSONDecodeError as e:
-                    print(f'  Warning: JSON decode error in {os.path.basename(file_path)}: {e}. Skipped line.')
-                except (KeyError, IndexError) as e:
-                    print(f'  Warning: Data error in {os.path.basename(file_path)}: {e}. Skipped line.')
-                except Exception as e:
-                    print(f'  Warning: Unexpected error in {os.path.basename(file_path)}: {e}. Skipped line.')
+        # Compressed inputs (.gz/.zst/zip member) are decompressed on a separate thread
+        for line_no, line_str in enumerate(iter_lines(file_path), 1):
+            try:
+                record_ts, signal_values = _parse_lead_line(line_str, lead_index)
+                file_timestamps.append(datetime.fromtimestamp(record_ts))
+                file_signal_segments.append(signal_values)
+
+            except json.JSONDecodeError as e:
+                diagnostics.warn('json_decode_error', e, line_no)
+            except (KeyError, IndexError) as e:
+                diagnostics.warn('data_error', repr(e), line_no)
+            except Exception as e:
+                diagnostics.warn('unexpected_error', repr(e), line_no)
 
     except Exception as e:
-        print(f'Error reading file {os.path.basename(file_path)}: {e}. Skipped file.')
+        logger.error(f'Error reading file {file_name}: {e}. Skipped file.')
         return [], []
 
-    print(f'Processed file: {os.path.basename(file_path)}')
-    print(f'  Extracted {len(file_signal_segments)} valid signal segments')
+    diagnostics.emit(logger)
+    logger.info(f'Processed file: {file_name}')
+    logger.info(f'  Extracted {len(file_signal_segments)} valid signal segments')
     return file_signal_segments, file_timestamps
 
 
+def _parse_lead_line(line_str, lead_index):
+    """Parse one JSON line into (recordTime epoch, sample list) of the selected lead."""
+    data_line = json.loads(line_str)
+    record_ts = float(data_line['recordTime'])
+    wave_data = data_line['data']['waveDataList'][lead_index]['waveDataVoList']
+    signal_values = [float(item['sample']) for item in wave_data]
+    return record_ts, signal_values
+
+
+def _parse_all_leads_line(line_str, total_leads):
+    """Parse one JSON line into (recordTime epoch, (total_leads, n) sample array) of all leads."""
+    data_line = json.loads(line_str)
+    record_ts = float(data_line['recordTime'])
+    wave_data_list = data_line['data']['waveDataList']
+    if len(wave_data_list) < total_leads:
+        raise IndexError(f"{len(wave_data_list)} leads in record, {total_leads} expected")
+    lead_values = [[float(item['sample']) for item in wave_data_list[idx]['waveDataVoList']]
+                   for idx in range(total_leads)]
+    if len({len(values) for values in lead_values}) > 1:
+        raise ValueError("Leads have different segment lengths")
+    return record_ts, np.array(lead_values, dtype=np.float64)
+
+
+def iter_file_records(file_path, target_lead=4, total_leads=9, diagnostics=None, start_ts=None, end_ts=None,
+                      start_offset=0, frames=None):
+    """
+    Stream one raw ECG file as (recordTime, samples) records (file order, one line in memory).
+
+    With a time range, reading starts at `start_offset` (a line start, e.g. from a
+    catalog's sparse offset index), records before start_ts are skipped by their
+    recordTime alone (no JSON decode), and reading stops at the first record at or
+    after end_ts (records inside a file are expected in time order).
+
+    Parameters:
+        file_path (str): Path to single ECG text file.
+        target_lead (int or None): Selected lead number (1-based); None = all leads.
+        total_leads (int): Total number of leads in data.
+        diagnostics (FileDiagnostics, optional): Collector for skipped lines (created if None).
+        start_ts (float, optional): Only records with recordTime >= start_ts.
+        end_ts (float, optional): Only records with recordTime < end_ts.
+        start_offset (int): Byte offset (decompressed stream) to start reading at.
+        frames (np.array, optional): Frame index (FRAME_INDEX_DTYPE) of a gzip/zstd input, used to seek.
+
+    Yields:
+        tuple: (record_ts (float epoch), samples (np.array float64)); samples has shape
+        (n,) for one lead or (total_leads, n) when target_lead is None.
+    """
+    file_name = os.path.basename(file_path)
+    lo = -np.inf if start_ts is None else start_ts
+    hi = np.inf if end_ts is None else end_ts
+    reader = detect_format_reader(file_path)
+    if reader is not None:
+        for segment, seg_time in zip(*_read_binary_file(reader, file_path, target_lead)):
+            record_ts = seg_time.timestamp()
+            if lo <= record_ts < hi:
+                yield record_ts, np.asarray(segment, dtype=np.float64)
+        return
+
+    if diagnostics is None:
+        diagnostics = FileDiagnostics(file_name)
+    if target_lead is None:
+        parse_line = lambda line_str: _parse_all_leads_line(line_str, total_leads)
+    else:
+        lead_index = target_lead - 1
+        if lead_index < 0 or lead_index >= total_leads:
+            logger.error(f'Error: Lead {target_lead} out of range (1-{total_leads}). Skipped file {file_name}.')
+            return
+        parse_line = lambda line_str: _parse_lead_line(line_str, lead_index)
+
+    ranged = start_ts is not None or end_ts is not None or start_offset
+    # Line numbers are counted from start_offset
+    lines = iter_lines_from(file_path, start_offset, frames) if ranged else iter_lines(file_path)
+    try:
+        for line_no, line_str in enumerate(lines, 1):
+            if ranged:
+                line_ts = _line_record_time(line_str)
+                if line_ts is not None:
+                    if line_ts >= hi:
+                        break
+                    if line_ts < lo:
+                        continue
+            try:
+                record_ts, signal_values = parse_line(line_str)
+            except json.JSONDecodeError as e:
+                diagnostics.warn('json_decode_error', e, line_no)
+                continue
+            except (KeyError, IndexError, ValueError) as e:
+                diagnostics.warn('data_error', repr(e), line_no)
+                continue
+            except Exception as e:
+                diagnostics.warn('unexpected_error', repr(e), line_no)
+                continue
+            yield record_ts, np.asarray(signal_values, dtype=np.float64)
+    except OSError as e:
+        logger.error(f'Error reading file {file_name}: {e}. Skipped file.')
+    finally:
+        diagnostics.emit(logger)
+
+
+def iter_merged_records(file_paths, target_lead=4, total_leads=9, merge_stats=None, open_records=None,
+                        start_times=None, read_ahead=0):
+    """
+    K-way merge of all files' records by recordTime, dropping duplicated records.
+
+    Files are opened lazily in start-time order: a file is only opened (and its
+    decompression thread started) once the merge reaches its first recordTime, and
+    it is closed when exhausted. Open files are therefore the ones overlapping the
+    current merge position, and memory holds one pending record per open file.
+    Records inside a file are expected in time order. Records with the same
+    recordTime as the previously emitted one (e.g. overlapping files) are skipped;
+    the earlier file in `file_paths` wins.
+
+    With `read_ahead`, every open file is read and parsed on a background thread
+    (compressed_io.iter_in_thread) up to `read_ahead` records ahead of the merge, so
+    file I/O overlaps with the analysis consuming the stream (plain text inputs too).
+
+    Parameters:
+        file_paths (list): Raw ECG file paths.
+        target_lead (int or None): Selected lead number (1-based); None = all leads.
+        total_leads (int): Total number of leads in data.
+        merge_stats (dict, optional): Filled with "records" and "duplicates" counters.
+        open_records (callable, optional): open_records(path) -> record iterator of one file
+            (default: iter_file_records over the whole file).
+        start_times (list, optional): First recordTime of every file (e.g. from the dataset
+            catalog), None for files without records; read with get_file_start_time if omitted.
+        read_ahead (int): Records parsed ahead per open file on a background thread (0 = inline).
+
+    Yields:
+        tuple: (record_ts (float epoch), samples (np.array float64)) in time order.
+    """
+    if merge_stats is None:
+        merge_stats = {}
+    merge_stats.update(records=0, duplicates=0)
+
+    if open_records is None:
+        open_records = lambda path: iter_file_records(path, target_lead, total_leads)
+    if read_ahead > 0:
+        open_file_records = open_records
+        open_records = lambda path: iter_in_thread(lambda: open_file_records(path), read_ahead)
+    if start_times is None:
+        start_times = [get_file_start_time(path) for path in file_paths]
+    # Files not opened yet, latest start first (popped from the end); files without records are skipped
+    pending = sorted(((start_ts, idx) for idx, start_ts in enumerate(start_times) if start_ts is not None),
+                     reverse=True)
+    heap = []  # (record_ts, file index, samples): one pending record per open file, ties go to the earlier file
+    streams = {}  # file index -> record iterator of an open file
+
+    def push_next(idx):
+        record = next(streams[idx], None)
+        if record is None:
+            _close_stream(streams.pop(idx))
+        else:
+            heapq.heappush(heap, (record[0], idx, record[1]))
+
+    last_ts = None
+    try:
+        while heap or pending:
+            # Open every file starting at or before the next record (all of them on a tie)
+            while pending and (not heap or pending[-1][0] <= heap[0][0]):
+                _, idx = pending.pop()
+                streams[idx] = iter(open_records(file_paths[idx]))
+                push_next(idx)
+            if not heap:
+                continue
+            record_ts, idx, samples = heapq.heappop(heap)
+            push_next(idx)
+            if record_ts == last_ts:
+                merge_stats['duplicates'] += 1
+                continue
+            last_ts = record_ts
+            merge_stats['records'] += 1
+            yield record_ts, samples
+    finally:
+        for stream in streams.values():
+            _close_stream(stream)
+
+    if merge_stats['duplicates']:
+        logger.info(f"Skipped {merge_stats['duplicates']} duplicated records across files")
+
+
+def _close_stream(stream):
+    close = getattr(stream, 'close', None)
+    if close is not None:
+        close()
+
+
+def get_file_start_time(file_path):
+    """
+    First recordTime of an input, reading only up to its first record (header of binary inputs).
+
+    Returns:
+        float or None: Epoch seconds, None if the input has no record.
+    """
+    if detect_format_reader(file_path) is not None:
+        span = get_file_time_span(file_path)
+        return span[0] if span is not None else None
+    lines = iter_lines_from(file_path, 0)
+    try:
+        for line in lines:
+            record_ts = _line_record_time(line)
+            if record_ts is not None:
+                return record_ts
+    except OSError as e:
+        logger.error(f'Error reading file {os.path.basename(file_path)}: {e}. Skipped file.')
+    finally:
+        lines.close()
+    return None
+
+
+def _line_record_time(line_bytes):
+    """Extract recordTime from a raw JSON line without decoding the whole record."""
+    match = _RECORD_TIME_RE.search(line_bytes)
+    return float(match.group(1)) if match else None
+
+
+def get_file_time_span(file_path, chunk_size=1 << 16):
+    """
+    Return (first recordTime, last recordTime) of a raw ECG text file.
+
+    Only the first and the last line are read (the last one by seeking backwards
+    from the end of the file). Compressed inputs cannot be read backwards; their
+    span comes from the (cached) offset index.
+
+    Returns:
+        tuple or None: (first_ts, last_ts), None if no recordTime was found.
+    """
+    reader = detect_format_reader(file_path)
+    if reader is not None and reader.time_span is not None:
+        return reader.time_span(file_path)
+    if reader is not None or compression_of(file_path) is not None:
+        index = build_record_offset_index(file_path)
+        if not len(index):
+            return None
+        return float(index['record_ts'][0]), float(index['record_ts'][-1])
+
+    with open(file_path, 'rb') as f:
+        first_ts = None
+        for line in f:
+            first_ts = _line_record_time(line)
+            if first_ts is not None:
+                break
+        if first_ts is None:
+            return None
+
+        end = f.seek(0, os.SEEK_END)
+        tail = b''
+        pos = end
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            lines = tail.rstrip(b'\r\n').split(b'\n')
+            # The last complete line is known once a newline precedes it (or file start)
+            if len(lines) > 1 or pos == 0:
+                for line in reversed(lines if pos == 0 else lines[1:]):
+                    last_ts = _line_record_time(line)
+                    if last_ts is not None:
+                        return first_ts, last_ts
+    return first_ts, first_ts
+
+
+def build_record_offset_index(file_path):
+    """
+    Build (or reuse) the per-line offset index of a raw ECG text file.
+
+    The file is scanned once in binary mode and only the recordTime field of each
+    line is extracted; the result is cached per (path, size, mtime). For gzip/zstd
+    inputs offsets refer to the decompressed stream, and the start of every gzip
+    member / zstd frame is recorded as well (see get_frame_index), so window reads
+    decode from the nearest frame instead of the start of the file.
+
+    Returns:
+        np.array: OFFSET_INDEX_DTYPE entries sorted by recordTime.
+    """
+    return _cached_offset_index(file_path)[0]
+
+
+def get_frame_index(file_path):
+    """Frame index (FRAME_INDEX_DTYPE) of a gzip/zstd input, built along with its offset index."""
+    return _cached_offset_index(file_path)[1]
+
+
+def _cached_offset_index(file_path):
+    return _offset_index_of(file_cache_key(file_path), file_path)
+
+
+@functools.lru_cache(maxsize=OFFSET_INDEX_CACHE_FILES)
+def _offset_index_of(key, file_path):
+    """(offset index, frame index of compressed inputs) of a file, cached per file_cache_key."""
+    entries = []
+    frames = []
+    reader = detect_format_reader(file_path)
+    if reader is not None:
+        # Binary inputs: one entry per segment (offset/length unused, windows go through the reader)
+        entries = [(seg_time.timestamp(), 0, 0) for seg_time in reader.read(file_path, 1)[1]]
+    elif compression_of(file_path) is None:
+        offset = 0
+        with open(file_path, 'rb') as f:
+            for line in f:
+                record_ts = _line_record_time(line)
+                if record_ts is not None:
+                    entries.append((record_ts, offset, len(line)))
+                offset += len(line)
+    else:
+        for offset, line in iter_line_offsets(file_path, frames):
+            record_ts = _line_record_time(line)
+            if record_ts is not None:
+                entries.append((record_ts, offset, len(line)))
+    index = np.array(entries, dtype=OFFSET_INDEX_DTYPE)
+    index = index[np.argsort(index['record_ts'], kind='stable')]
+    return index, np.array(frames, dtype=FRAME_INDEX_DTYPE)
+
+
+def read_lead_window(file_path, start_ts, end_ts, target_lead=4, total_leads=9, offset_index=None):
+    """
+    Decode only the lines of a raw ECG file that cover [start_ts, end_ts).
+
+    The record starting before start_ts is included, since its samples may reach into
+    the window. Lines are located through the offset index and read with one seek.
+
+    Parameters:
+        file_path (str): Path to single ECG text file.
+        start_ts (float): Window start (epoch seconds).
+        end_ts (float): Window end (epoch seconds).
+        target_lead (int): Selected lead number (1-based).
+        total_leads (int): Total number of leads in data.
+        offset_index (np.array, optional): Index from build_record_offset_index.
+
+    Returns:
+        tuple: (record_timestamps (np.array epoch), signal_segments (list of np.array))
+    """
+    # Binary inputs check the lead against their own header, not the configured total_leads
+    reader = detect_format_reader(file_path)
+    if reader is not None:
+        segments, seg_times = reader.read(file_path, target_lead)
+        record_times = np.array([seg_time.timestamp() for seg_time in seg_times], dtype=np.float64)
+        i0 = max(int(np.searchsorted(record_times, start_ts, side='right')) - 1, 0)
+        i1 = int(np.searchsorted(record_times, end_ts, side='left'))
+        return record_times[i0:i1], [np.asarray(segment, dtype=np.float64) for segment in segments[i0:i1]]
+    lead_index = target_lead - 1
+    if lead_index < 0 or lead_index >= total_leads:
+        raise IndexError(f"Lead {target_lead} out of range (1-{total_leads})")
+    if offset_index is None:
+        offset_index = build_record_offset_index(file_path)
+
+    record_times = offset_index['record_ts']
+    i0 = max(int(np.searchsorted(record_times, start_ts, side='right')) - 1, 0)
+    i1 = int(np.searchsorted(record_times, end_ts, side='left'))
+    selected = offset_index[i0:i1]
+    if not len(selected):
+        return np.empty(0, dtype=np.float64), []
+
+    base = int(selected['offset'].min())
+    stop = int((selected['offset'] + selected['length']).max())
+    frames = get_frame_index(file_path) if compression_of(file_path) in ('gzip', 'zstd') else None
+    blob = read_byte_range(file_path, base, stop, frames)
+
+    diagnostics = FileDiagnostics(os.path.basename(file_path))
+    timestamps = []
+    segments = []
+    for entry_ts, offset, length in selected.tolist():
+        line = blob[offset - base:offset - base + length]
+        try:
+            record_ts, signal_values = _parse_lead_line(line, lead_index)
+        except Exception as e:
+            diagnostics.warn('window_decode_error', repr(e))
+            continue
+        timestamps.append(record_ts)
+        segments.append(np.asarray(signal_values, dtype=np.float64))
+    diagnostics.emit(logger)
+    return np.array(timestamps, dtype=np.float64), segments
+
+
 def get_ecg_file_list(folder_path):
-    """Get sorted list of raw ECG txt files (original logic unchanged)."""
-    ecg_files = []
-    for filename in sorted(os.listdir(folder_path)):
-        if filename.endswith(".txt"):
-            ecg_files.append(os.path.join(folder_path, filename))
-    print(f"Found {len(ecg_files)} raw ECG files in directory")
+    """
+    Get sorted list of raw ECG inputs: .txt, .txt.gz, .zst files, the .txt members of
+    .zip bundles (as "<bundle>.zip::<member>" paths) and binary EDF/WFDB (.hea) records.
+    Text inputs are read with the same line parser; compressed data is streamed, never
+    extracted to disk.
+    """
+    ecg_files = list_input_files(folder_path, format_reader_suffixes())
+    logger.info(f"Found {len(ecg_files)} raw ECG files in directory")
     return ecg_files
 
 
-def read_hr_json_file(file_path):
+def read_hr_json_file(file_path, diagnostics=None):
     """
     Read JSON format heart rate file (timestamp + HR value).
 
     Parameters:
         file_path (str): Path to JSON HR file.
+        diagnostics (FileDiagnostics, optional): Collector for skipped entries (created if None).
 
     Returns:
         tuple: (timestamps, heart_rates)
     """
     timestamps = []
     heart_rates = []
+    file_name = os.path.basename(file_path)
+    if diagnostics is None:
+        diagnostics = FileDiagnostics(file_name)
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
             # Standard JSON structure: {"timestamps": [...], "heart_rates_bpm": [...]}
             if "timestamps" in data and "heart_rates_bpm" in data:
-                for ts_str, hr in zip(data["timestamps"], data["heart_rates_bpm"]):
+                for idx, (ts_str, hr) in enumerate(zip(data["timestamps"], data["heart_rates_bpm"])):
                     try:
                         ts = datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S').timestamp()
+                        hr = float(hr)
                         timestamps.append(ts)
-                        heart_rates.append(float(hr))
+                        heart_rates.append(hr)
                     except Exception as e:
-                        print(f'  Warning: Invalid data in {os.path.basename(file_path)}: {e}. Skipped entry.')
+                        diagnostics.warn('invalid_entry', f'entry {idx}: {e}')
             else:
-                print(f'  Warning: Invalid JSON structure in {os.path.basename(file_path)}. Skipped file.')
+                logger.warning(f'  Warning: Invalid JSON structure in {file_name}. Skipped file.')
     except Exception as e:
-        print(f'Error reading JSON file {os.path.basename(file_path)}: {e}. Skipped file.')
+        logger.error(f'Error reading JSON file {file_name}: {e}. Skipped file.')
         return [], []
 
-    print(f'Processed JSON HR file: {os.path.basename(file_path)}')
-    print(f'  Extracted {len(heart_rates)} valid HR data points')
+    diagnostics.emit(logger)
+    logger.info(f'Processed JSON HR file: {file_name}')
+    logger.info(f'  Extracted {len(heart_rates)} valid HR data points')
     return timestamps, heart_rates
 
 
@@ -102,5 +639,5 @@ def get_hr_json_file_list(folder_path):
     for filename in sorted(os.listdir(folder_path)):
         if filename.endswith(".json"):
             json_files.append(os.path.join(folder_path, filename))
-    print(f"Found {len(json_files)} JSON HR files in directory")
+    logger.info(f"Found {len(json_files)} JSON HR files in directory")
     return json_files
\ No newline at end of file
@@ -0,0 +1,239 @@
+import os
+import json
+import bisect
+import logging
+import argparse
+from datetime import datetime
+import numpy as np
+
+from compressed_io import FRAME_INDEX_DTYPE, compression_of, scan_input_files
+from data_read import (
+    build_record_offset_index, detect_format_reader, format_reader_suffixes, get_file_time_span,
+    get_frame_index, iter_file_records, iter_merged_records
+)
+
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE_NAME = ".ecg_catalog.json"  # Stored in the data folder by default
+CATALOG_VERSION = 1
+CATALOG_INDEX_STRIDE = 60  # Records between sparse offset index entries (~1 min of 1 s records)
+
+
+def _file_format(path):
+    """Format name of an input: binary reader name, compression or 'text'."""
+    reader = detect_format_reader(path)
+    if reader is not None:
+        return reader.name
+    return compression_of(path) or "text"
+
+
+class DatasetCatalog:
+    """
+    Persistent catalog of the raw ECG inputs of a folder, for range-scoped analysis.
+
+    Every input gets one entry: size and mtime of the file holding it, first/last
+    recordTime, record count and a sparse (recordTime, byte offset) index with
+    one entry every ``index_stride`` records (plus the frame index of gzip/zstd
+    inputs). ``refresh`` lists the folder with one os.scandir pass and only
+    re-reads inputs whose size or mtime changed; the catalog is saved as JSON
+    next to the data. A time-range analysis then opens only the overlapping
+    files and starts reading each one near the range start.
+
+    Parameters:
+        folder_path (str): Data folder.
+        catalog_path (str, optional): Catalog file (default: CATALOG_FILE_NAME in the folder).
+        index_stride (int): Records between sparse offset index entries.
+    """
+
+    def __init__(self, folder_path, catalog_path=None, index_stride=CATALOG_INDEX_STRIDE):
+        if index_stride < 1:
+            raise ValueError(f"Index stride must be >= 1 (got {index_stride})")
+        self.folder_path = folder_path
+        self.catalog_path = catalog_path or os.path.join(folder_path, CATALOG_FILE_NAME)
+        self.index_stride = index_stride
+        self.entries = {}  # Path relative to the folder -> entry dict
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"DatasetCatalog({self.folder_path!r}, files={len(self.entries)})"
+
+    @classmethod
+    def open(cls, folder_path, catalog_path=None, index_stride=CATALOG_INDEX_STRIDE, refresh=True):
+        """Load the saved catalog of a folder (if any) and bring it up to date."""
+        catalog = cls(folder_path, catalog_path, index_stride)
+        catalog.load()
+        if refresh:
+            catalog.refresh()
+        return catalog
+
+    def load(self):
+        """Load entries from the catalog file (missing, unreadable or older catalogs are ignored)."""
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable catalog {self.catalog_path}: {str(e)}")
+            return False
+        if saved.get("version") != CATALOG_VERSION or saved.get("index_stride") != self.index_stride:
+            logger.info(f"Catalog {self.catalog_path} has another version/stride, rebuilding")
+            return False
+        self.entries = saved.get("files", {})
+        return True
+
+    def save(self):
+        """Write the catalog atomically (a read-only folder only logs a warning)."""
+        payload = {"version": CATALOG_VERSION, "index_stride": self.index_stride, "files": self.entries}
+        tmp_path = self.catalog_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, separators=(',', ':'))
+            os.replace(tmp_path, self.catalog_path)
+        except OSError as e:
+            logger.warning(f"Could not save catalog {self.catalog_path}: {str(e)}")
+            return False
+        return True
+
+    def _build_entry(self, path, stat):
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime, "format": _file_format(path),
+                 "first_ts": None, "last_ts": None, "records": 0, "index": [], "frames": []}
+        if detect_format_reader(path) is not None:
+            # Binary records are read through their reader (no byte offsets to seek to)
+            span = get_file_time_span(path)
+            entry["records"] = len(build_record_offset_index(path))
+        else:
+            index = build_record_offset_index(path)
+            span = (float(index['record_ts'][0]), float(index['record_ts'][-1])) if len(index) else None
+            entry["records"] = len(index)
+            sparse = index[::self.index_stride]
+            entry["index"] = [[float(ts), int(offset)] for ts, offset in zip(sparse['record_ts'], sparse['offset'])]
+            entry["frames"] = get_frame_index(path).tolist()
+        if span is not None:
+            entry["first_ts"], entry["last_ts"] = span
+        return entry
+
+    def refresh(self, save=True):
+        """
+        Rescan the folder: new or changed inputs are (re)indexed, unchanged ones reused,
+        removed ones dropped.
+
+        Returns:
+            dict: Counts of 'reused', 'indexed' and 'removed' entries.
+        """
+        counts = {"reused": 0, "indexed": 0, "removed": 0}
+        entries = {}
+        for path, stat in scan_input_files(self.folder_path, format_reader_suffixes()):
+            key = os.path.relpath(path, self.folder_path)
+            entry = self.entries.get(key)
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                counts["reused"] += 1
+            else:
+                try:
+                    entry = self._build_entry(path, stat)
+                except Exception as e:
+                    logger.warning(f"  Warning: Could not index {key}: {str(e)}")
+                    continue
+                counts["indexed"] += 1
+            entries[key] = entry
+        counts["removed"] = len(set(self.entries) - set(entries))
+        changed = counts["indexed"] or counts["removed"] or not os.path.exists(self.catalog_path)
+        self.entries = entries
+        if save and changed:
+            self.save()
+        return counts
+
+    def path_of(self, key):
+        return os.path.join(self.folder_path, key)
+
+    def files(self):
+        """All catalogued input paths (sorted)."""
+        return [self.path_of(key) for key in sorted(self.entries)]
+
+    def time_span(self):
+        """(first, last) recordTime over all inputs, None if no input has records."""
+        spans = [(e["first_ts"], e["last_ts"]) for e in self.entries.values() if e["first_ts"] is not None]
+        if not spans:
+            return None
+        return min(first for first, _ in spans), max(last for _, last in spans)
+
+    def files_in_range(self, start_ts=None, end_ts=None):
+        """
+        Input paths with records in [start_ts, end_ts) (None = open end), in time order.
+
+        Only catalog entries are checked; no input is opened.
+        """
+        selected = []
+        for key, entry in self.entries.items():
+            if entry["first_ts"] is None:
+                continue
+            if end_ts is not None and entry["first_ts"] >= end_ts:
+                continue
+            if start_ts is not None and entry["last_ts"] < start_ts:
+                continue
+            selected.append((entry["first_ts"], key))
+        return [self.path_of(key) for _, key in sorted(selected)]
+
+    def _entry(self, path):
+        return self.entries[os.path.relpath(path, self.folder_path)]
+
+    def start_times(self, paths):
+        """First recordTime of catalogued inputs (None for inputs without records), for iter_merged_records."""
+        return [self._entry(path)["first_ts"] for path in paths]
+
+    def seek_offset(self, path, start_ts):
+        """
+        Byte offset (decompressed stream) to start reading an input at so that no record
+        at or after start_ts is missed: the last sparse index entry before start_ts.
+        """
+        index = self._entry(path)["index"]
+        if start_ts is None or not index:
+            return 0
+        pos = bisect.bisect_left([ts for ts, _ in index], start_ts)
+        return index[pos - 1][1] if pos else 0
+
+    def iter_range_records(self, path, start_ts=None, end_ts=None, target_lead=4, total_leads=9, diagnostics=None):
+        """Records of one input with recordTime in [start_ts, end_ts), read from near the range start."""
+        entry = self._entry(path)
+        frames = np.array([tuple(frame) for frame in entry["frames"]], dtype=FRAME_INDEX_DTYPE)
+        return iter_file_records(path, target_lead, total_leads, diagnostics, start_ts=start_ts, end_ts=end_ts,
+                                 start_offset=self.seek_offset(path, start_ts), frames=frames)
+
+    def iter_range(self, start_ts=None, end_ts=None, target_lead=4, total_leads=9, merge_stats=None):
+        """
+        Time-ordered records of all inputs in [start_ts, end_ts) (k-way merge, duplicates dropped),
+        opening only the overlapping inputs.
+        """
+        paths = self.files_in_range(start_ts, end_ts)
+        return iter_merged_records(
+            paths, target_lead, total_leads, merge_stats=merge_stats,
+            open_records=lambda path: self.iter_range_records(path, start_ts, end_ts, target_lead, total_leads),
+            start_times=self.start_times(paths))
+
+
+def _format_ts(ts):
+    return "-" if ts is None else datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build/refresh the dataset catalog of a raw ECG folder")
+    parser.add_argument("folder", help="Folder with raw ECG files")
+    parser.add_argument("--catalog", help=f"Catalog file (default: <folder>/{CATALOG_FILE_NAME})")
+    parser.add_argument("--start", help="List inputs overlapping [start, end) (YYYY-MM-DD HH:MM:SS)")
+    parser.add_argument("--end", help="End of the listed range (YYYY-MM-DD HH:MM:SS)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    catalog = DatasetCatalog(args.folder, args.catalog)
+    catalog.load()
+    counts = catalog.refresh()
+    logger.info(f"Catalog {catalog.catalog_path}: {len(catalog)} files "
+                f"({counts['indexed']} indexed, {counts['reused']} unchanged, {counts['removed']} removed)")
+    parse = lambda value: datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp() if value else None
+    for path in catalog.files_in_range(parse(args.start), parse(args.end)):
+        entry = catalog._entry(path)
+        logger.info(f"  {os.path.relpath(path, args.folder)}: {_format_ts(entry['first_ts'])} ~ "
+                    f"{_format_ts(entry['last_ts'])}, {entry['records']} records ({entry['format']})")
@@ -0,0 +1,48 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class FileDiagnostics:
+    """
+    Aggregate parse warnings of a single file by category.
+
+    Instead of one log line per malformed record, each category keeps a count and
+    the first few sample messages; ``emit`` writes one summary line per category.
+
+    Parameters:
+        file_name (str): File name shown in the summary.
+        max_samples (int): Number of sample messages kept per category.
+    """
+
+    def __init__(self, file_name, max_samples=3):
+        self.file_name = file_name
+        self.max_samples = max_samples
+        self.counts = {}
+        self.samples = {}
+
+    def warn(self, category, message, line_no=None):
+        """Record one warning of the given category (O(1), no I/O)."""
+        count = self.counts.get(category, 0)
+        self.counts[category] = count + 1
+        if count < self.max_samples:
+            prefix = f"line {line_no}: " if line_no is not None else ""
+            self.samples.setdefault(category, []).append(prefix + str(message))
+
+    @property
+    def total(self):
+        """Total number of warnings recorded."""
+        return sum(self.counts.values())
+
+    def summary(self):
+        """Return structured summary: {category: {"count": n, "samples": [...]}}."""
+        return {category: {"count": count, "samples": list(self.samples.get(category, []))}
+                for category, count in self.counts.items()}
+
+    def emit(self, log=None, level=logging.WARNING):
+        """Write one log line per category (count + samples)."""
+        log = log or logger
+        for category, count in self.counts.items():
+            samples = "; ".join(self.samples.get(category, []))
+            log.log(level, f"  Warning: {count} x {category} in {self.file_name} (e.g. {samples}). Skipped.")
@@ -5,86 +5,560 @@ from datetime import datetime, timedelta
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import time  # 新增：用于暂停逻辑
 
+from hr_series import as_hr_arrays, as_hr_values, epoch_to_local_datenum, local_minute_key
+from signal_quality import compute_window_quality
+from hr_stats import time_domain_stats, PNN_THRESHOLD_BPM
+
 
 # 【原有函数：analyze_single_file_hr、plot_combined_hr、plot_hr_time_line、create_plot_window 保持不变】
-def analyze_single_file_hr(signal_segments, timestamps, sampling_rate=250):
+def analyze_single_file_hr(signal_segments, timestamps, sampling_rate=250, quality_gate=False,
+                           return_quality=False, prefilter=None, return_peaks=False):
     """
-    Analyze heart rate for a single file (minute-wise, original logic unchanged).
+    Analyze heart rate for a single file (minute-wise).
+
+    Before detection, a batched signal-quality index is computed for all minutes at
+    once on the detection input (see signal_quality.compute_window_quality); minutes
+    failing it (flat line, clipping, electrode off, noise) are skipped when
+    quality_gate is True.
 
     Parameters:
         signal_segments (list): List of signal segments from single file.
         timestamps (list): List of timestamps corresponding to each segment.
         sampling_rate (int): Sampling rate in Hz.
+        quality_gate (bool): Skip detection for minutes failing the quality check.
+        return_quality (bool): Also return the per-minute quality score (0-1).
+        prefilter (ECGStreamFilter, optional): Filter applied to the segments (in order, state
+            carried over from previous calls) before R-peak detection and the quality check
+            (clipping is checked on the raw samples).
+        return_peaks (bool): Also return the R-peak sample indices of every minute (into the
+            minute's window, i.e. its segments joined).
 
     Returns:
-        tuple: (file_timestamps, file_heart_rates)
+        tuple: (file_timestamps, file_heart_rates), plus file_quality_scores if return_quality,
+        plus file_peaks if return_peaks.
     """
     if not signal_segments or not timestamps:
-        return [], []
+        return ([], []) + (([],) if return_quality else ()) + (([],) if return_peaks else ())
 
-    minute_signals = {}  # Key: (year, month, day, hour, minute), Value: merged signal
+    minute_signals = {}  # Key: (year, month, day, hour, minute), Value: segments of the minute
+    filtered_signals = {}  # Same keys, prefiltered signal (detection input)
     for segment, seg_time in zip(signal_segments, timestamps):
         minute_key = (seg_time.year, seg_time.month, seg_time.day, seg_time.hour, seg_time.minute)
         if minute_key not in minute_signals:
             minute_signals[minute_key] = []
-        minute_signals[minute_key].extend(segment)
+            filtered_signals[minute_key] = []
+        minute_signals[minute_key].append(segment)
+        if prefilter is not None:
+            filtered_signals[minute_key].append(prefilter.process(segment, seg_time.timestamp()))
+
+    minute_keys = sorted(minute_signals.keys())
+    # Segments (sample lists or arrays) are joined per minute in one call, not sample by sample
+    windows = [np.concatenate(minute_signals[minute_key]).astype(np.float64, copy=False) for minute_key in minute_keys]
+    detect_windows = None
+    if prefilter is not None:
+        detect_windows = [np.concatenate(filtered_signals[minute_key]) for minute_key in minute_keys]
+    file_timestamps, file_heart_rates, file_quality, _, file_peaks = _analyze_minute_windows(
+        minute_keys, windows, sampling_rate, quality_gate, detect_windows, return_peaks=True)
+
+    return (file_timestamps, file_heart_rates) + ((file_quality,) if return_quality else ()) + \
+        ((file_peaks,) if return_peaks else ())
+
+
+def analyze_raw_store_hr(raw_store, target_lead=4, quality_gate=False):
+    """
+    Minute-wise HR directly on a memory-mapped raw store (see raw_store.RawStore).
+
+    Each minute is a contiguous memmap slice, so no text parsing or list building is
+    needed; results match analyze_single_file_hr on the same records.
+
+    Parameters:
+        raw_store (RawStore): Opened raw store.
+        target_lead (int): Selected lead number (1-based).
+        quality_gate (bool): Skip detection for minutes failing the quality check.
+
+    Returns:
+        tuple: (timestamps, heart_rates, quality_scores)
+    """
+    lead_signal = raw_store.data[:, target_lead - 1]
+    minute_ranges = raw_store.minute_ranges()
+    minute_keys = [minute_key for minute_key, _, _ in minute_ranges]
+    windows = [lead_signal[start:stop] for _, start, stop in minute_ranges]
+    return _analyze_minute_windows(minute_keys, windows, raw_store.sampling_rate, quality_gate)[:3]
+
 
-    file_timestamps = []
-    file_heart_rates = []
+def _analyze_minute_windows(minute_keys, windows, sampling_rate, quality_gate=False, detect_windows=None,
+                            return_peaks=False):
+    """
+    Quality-check all minute windows in one batch, then detect HR on the passing ones.
+
+    `detect_windows` (same length as `windows`) optionally holds prefiltered signals
+    used for detection; the quality check scores the same detection input (clipping
+    on the raw windows).
 
-    for minute_key in sorted(minute_signals.keys()):
-        merged_signal = np.array(minute_signals[minute_key])
-        if len(merged_signal) < sampling_rate * 5:
+    Returns:
+        tuple: (timestamps, heart_rates, quality_scores, best_leads); best_leads holds the best
+        lead number (1-based) of (leads, n) minutes and 0 for single-lead windows. With
+        return_peaks, a fifth list holds the R-peak sample indices (into the window) of every minute.
+    """
+    if windows and np.ndim(windows[0]) == 2:
+        return _analyze_multilead_windows(minute_keys, windows, sampling_rate, quality_gate, detect_windows,
+                                          return_peaks)
+
+    timestamps = []
+    heart_rates = []
+    quality_scores = []
+    minute_peaks = []
+
+    # Windows under 5 s are never analyzed, so they are not quality-checked either
+    candidates = [idx for idx, window in enumerate(windows) if len(window) >= sampling_rate * 5]
+    if not candidates:
+        return (timestamps, heart_rates, quality_scores, []) + ((minute_peaks,) if return_peaks else ())
+    if detect_windows is None:
+        detect_windows = windows
+    quality = compute_window_quality([detect_windows[idx] for idx in candidates], sampling_rate,
+                                     raw_windows=[windows[idx] for idx in candidates])
+
+    for pos, idx in enumerate(candidates):
+        if quality_gate and not quality["passed"][pos]:
+            continue
+        detect_signal = detect_windows[idx]
+        peaks = _minute_peaks(np.asarray(detect_signal, dtype=np.float64), sampling_rate)
+        minute_avg_hr = _hr_from_peaks(peaks, sampling_rate) if peaks is not None else None
+        if minute_avg_hr is None:
             continue
+        timestamps.append(_minute_end_ts(minute_keys[idx]))
+        heart_rates.append(minute_avg_hr)
+        quality_scores.append(float(quality["quality_score"][pos]))
+        minute_peaks.append(peaks)
+    return (timestamps, heart_rates, quality_scores, [0] * len(timestamps)) + \
+        ((minute_peaks,) if return_peaks else ())
+
+
+def _analyze_multilead_windows(minute_keys, windows, sampling_rate, quality_gate=False, detect_windows=None,
+                               return_peaks=False):
+    """
+    Multi-lead variant of _analyze_minute_windows for (leads, n) minute windows.
 
+    The quality of every lead of every minute is computed in one batch; leads passing
+    the check vote on beats (detect_r_peaks_multilead) and the minute's quality is
+    that of its best lead, reported by its number (1-based, among all leads).
+
+    Returns:
+        tuple: (timestamps, heart_rates, quality_scores, best_leads), plus the fused R-peak
+        indices of every minute with return_peaks.
+    """
+    timestamps = []
+    heart_rates = []
+    quality_scores = []
+    best_leads = []
+    minute_peaks = []
+
+    candidates = [idx for idx, window in enumerate(windows) if window.shape[-1] >= sampling_rate * 5]
+    if not candidates:
+        return (timestamps, heart_rates, quality_scores, best_leads) + ((minute_peaks,) if return_peaks else ())
+    n_leads = windows[candidates[0]].shape[0]
+    if detect_windows is None:
+        detect_windows = windows
+    quality = compute_window_quality([lead_signal for idx in candidates for lead_signal in detect_windows[idx]],
+                                     sampling_rate,
+                                     raw_windows=[lead_signal for idx in candidates for lead_signal in windows[idx]])
+    lead_passed = quality["passed"].reshape(len(candidates), n_leads)
+    lead_scores = quality["quality_score"].reshape(len(candidates), n_leads)
+
+    for pos, idx in enumerate(candidates):
+        voters = lead_passed[pos] if quality_gate else np.ones(n_leads, dtype=bool)
+        if not voters.any():
+            continue
+        detect_signal = detect_windows[idx]
         try:
-            avg_signal = np.mean(merged_signal)
-            std_signal = np.std(merged_signal)
-            threshold = avg_signal + 1.5 * std_signal
-            peaks = np.where(merged_signal > threshold)[0]
+            peaks, best_voter = detect_r_peaks_multilead(detect_signal[voters], sampling_rate,
+                                                         lead_scores[pos][voters])
+            minute_avg_hr = _hr_from_peaks(peaks, sampling_rate)
+        except Exception:
+            minute_avg_hr = None
+        if minute_avg_hr is None:
+            continue
+        timestamps.append(_minute_end_ts(minute_keys[idx]))
+        heart_rates.append(minute_avg_hr)
+        quality_scores.append(float(lead_scores[pos][voters].max()))
+        best_leads.append(int(np.flatnonzero(voters)[best_voter]) + 1)
+        minute_peaks.append(peaks)
+    return (timestamps, heart_rates, quality_scores, best_leads) + ((minute_peaks,) if return_peaks else ())
 
-            min_distance = int(sampling_rate * 0.2)
-            filtered_peaks = []
-            for peak in peaks:
-                if not filtered_peaks or peak - filtered_peaks[-1] > min_distance:
-                    filtered_peaks.append(peak)
 
-            if len(filtered_peaks) < 2:
-                continue
+def _minute_end_ts(minute_key):
+    """Epoch timestamp reported for a minute (end of the minute)."""
+    return (datetime(*minute_key) + timedelta(minutes=1)).timestamp()
 
-            rr_intervals = np.diff(filtered_peaks) / sampling_rate
-            heart_rates = 60 / rr_intervals
-            minute_avg_hr = np.mean(heart_rates)
 
-            if np.isnan(minute_avg_hr) or minute_avg_hr < 30 or minute_avg_hr > 200:
-                continue
+def detect_r_peaks(signal, sampling_rate=250):
+    """
+    Detect R-peaks with the threshold detector (mean + 1.5*std, 200 ms refractory).
 
-            minute_time = datetime(*minute_key) + timedelta(minutes=1)
-            file_timestamps.append(minute_time.timestamp())
-            file_heart_rates.append(minute_avg_hr)
+    Parameters:
+        signal (np.array): Signal samples.
+        sampling_rate (int): Sampling rate in Hz.
 
-        except Exception as e:
-            continue
+    Returns:
+        np.array: Sample indices of detected peaks.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    if signal.size == 0:
+        return np.empty(0, dtype=np.int64)
+    return _detect_r_peaks_2d(signal[np.newaxis, :], sampling_rate)[0]
 
-    return file_timestamps, file_heart_rates
+
+def _detect_r_peaks_2d(signals, sampling_rate):
+    """
+    Threshold detector on a (leads, n) array: one vectorized pass for all leads.
+
+    Returns:
+        list: Peak index arrays, one per lead.
+    """
+    n_leads, n = signals.shape
+    thresholds = signals.mean(axis=1) + 1.5 * signals.std(axis=1)
+    # Row-major flat positions (lead * n + sample) are sorted lead by lead
+    flat = np.flatnonzero(signals > thresholds[:, np.newaxis])
+    kept = _refractory_filter(flat, int(sampling_rate * 0.2), n, n_leads)
+    bounds = np.searchsorted(kept, np.arange(n_leads + 1) * n)
+    return [kept[bounds[lead]:bounds[lead + 1]] - lead * n for lead in range(n_leads)]
 
 
-def plot_combined_hr(all_timestamps, all_heart_rates, save_path=None):
+def _refractory_filter(flat_peaks, min_distance, n, n_leads):
+    """
+    Keep a peak only if it is more than min_distance after the previously kept one (per lead).
+
+    All leads advance in lockstep: each step binary-searches the next kept peak of
+    every lead at once, so the Python loop runs once per beat, not once per
+    above-threshold sample or per lead.
+
+    Parameters:
+        flat_peaks (np.array): Sorted candidate positions lead * n + sample.
+        min_distance (int): Refractory distance in samples.
+        n (int): Samples per lead.
+        n_leads (int): Number of leads.
+
+    Returns:
+        np.array: Sorted kept flat positions.
+    """
+    if not len(flat_peaks):
+        return np.empty(0, dtype=np.int64)
+    starts = np.searchsorted(flat_peaks, np.arange(n_leads) * n)
+    ends = np.searchsorted(flat_peaks, np.arange(1, n_leads + 1) * n)
+    has_peaks = starts < ends
+    current = flat_peaks[starts[has_peaks]]
+    lead_end = (np.flatnonzero(has_peaks) + 1) * n
+    kept = [current]
+    last = len(flat_peaks) - 1
+    while current.size:
+        nxt = np.searchsorted(flat_peaks, current + min_distance, side='right')
+        candidate = flat_peaks[np.minimum(nxt, last)]
+        valid = (nxt <= last) & (candidate < lead_end)
+        current = candidate[valid]
+        lead_end = lead_end[valid]
+        kept.append(current)
+    return np.sort(np.concatenate(kept)).astype(np.int64)
+
+
+def detect_r_peaks_multilead(signals, sampling_rate=250, lead_scores=None, tolerance_s=0.05, min_votes=None):
+    """
+    Fused R-peak detection over all leads of a (leads, n) array.
+
+    Candidates of every lead come from one vectorized detector pass; candidates of
+    different leads within `tolerance_s` of each other form one beat, which is kept
+    if at least `min_votes` leads agree. A kept beat is placed at the candidate of
+    the best lead (highest score) in its cluster.
+
+    Parameters:
+        signals (np.array): (leads, n) samples of the voting leads.
+        sampling_rate (int): Sampling rate in Hz.
+        lead_scores (np.array, optional): Per-lead quality scores (default: equal).
+        tolerance_s (float): Max distance between candidates of the same beat.
+        min_votes (int, optional): Leads needed per beat (default: majority of leads).
+
+    Returns:
+        tuple: (fused peak indices (np.array), best lead index (int))
+    """
+    signals = np.asarray(signals, dtype=np.float64)
+    n_leads = signals.shape[0]
+    if lead_scores is None:
+        lead_scores = np.ones(n_leads)
+    best_lead = int(np.argmax(lead_scores))
+    if min_votes is None:
+        min_votes = n_leads // 2 + 1
+    if signals.shape[1] == 0:
+        return np.empty(0, dtype=np.int64), best_lead
+
+    lead_peaks = _detect_r_peaks_2d(signals, sampling_rate)
+    positions = np.concatenate(lead_peaks)
+    if not len(positions):
+        return np.empty(0, dtype=np.int64), best_lead
+    leads = np.repeat(np.arange(n_leads), [len(peaks) for peaks in lead_peaks])
+
+    order = np.argsort(positions, kind='stable')
+    positions, leads = positions[order], leads[order]
+    cluster = np.concatenate([[0], np.cumsum(np.diff(positions) > tolerance_s * sampling_rate)])
+
+    # Votes = distinct leads per cluster
+    unique_pairs = np.unique(cluster * n_leads + leads)
+    votes = np.bincount(unique_pairs // n_leads, minlength=cluster[-1] + 1)
+
+    # Representative = candidate of the highest-scoring lead in each cluster
+    pick = np.lexsort((-np.asarray(lead_scores, dtype=np.float64)[leads], cluster))
+    first = np.ones(len(pick), dtype=bool)
+    first[1:] = cluster[pick][1:] != cluster[pick][:-1]
+    representative = positions[pick][first]
+
+    fused = np.sort(representative[votes >= min_votes])
+    return fused, best_lead
+
+
+def _hr_from_peaks(filtered_peaks, sampling_rate):
+    """Average HR of a minute from its peak indices (None if < 2 peaks or implausible)."""
+    if len(filtered_peaks) < 2:
+        return None
+
+    rr_intervals = np.diff(filtered_peaks) / sampling_rate
+    heart_rates = 60 / rr_intervals
+    minute_avg_hr = np.mean(heart_rates)
+
+    if np.isnan(minute_avg_hr) or minute_avg_hr < 30 or minute_avg_hr > 200:
+        return None
+    return minute_avg_hr
+
+
+def _minute_peaks(merged_signal, sampling_rate):
+    """R-peak indices of one minute of signal (None if < 5 s of signal or detection fails)."""
+    if len(merged_signal) < sampling_rate * 5:
+        return None
+    try:
+        return detect_r_peaks(merged_signal, sampling_rate)
+    except Exception:
+        return None
+
+
+class MinuteHRStream:
+    """
+    Streaming minute-wise HR over time-ordered (recordTime, samples) records.
+
+    Records may hold one lead (n,) or all leads (leads, n); the latter are analyzed
+    with fused multi-lead detection. Only the samples of the current minute are
+    buffered. A minute is analyzed when the first record of a later minute arrives
+    (or on flush), so minutes split across file boundaries are stitched back together
+    when records come from a merged stream (see data_read.iter_merged_records).
+    Records older than the current minute are dropped and counted in ``late_records``.
+
+    Parameters:
+        sampling_rate (int): Sampling rate in Hz.
+        quality_gate (bool): Skip detection for minutes failing the quality check.
+        prefilter (ECGStreamFilter, optional): Streaming filter applied before detection.
+        return_peaks (bool): Append the minute's R-peak sample indices (into its records
+            joined) to every result.
+    """
+
+    def __init__(self, sampling_rate=250, quality_gate=False, prefilter=None, return_peaks=False):
+        self.sampling_rate = sampling_rate
+        self.quality_gate = quality_gate
+        self.prefilter = prefilter
+        self.return_peaks = return_peaks
+        self.late_records = 0
+        self._minute = None
+        self._chunks = []
+        self._filtered_chunks = []
+
+    def feed(self, record_ts, samples):
+        """
+        Add one record.
+
+        Returns:
+            list: Completed (minute_ts, minute_avg_hr, quality_score, best_lead) results (empty or
+            one item); best_lead is the lead number of a multi-lead minute, 0 for single-lead records.
+        """
+        minute_key = local_minute_key(record_ts)
+        if self._minute is None:
+            self._minute = minute_key
+        elif minute_key != self._minute:
+            if minute_key < self._minute:
+                self.late_records += 1
+                return []
+            completed = self.flush()
+            self._minute = minute_key
+            self._append(record_ts, samples)
+            return completed
+        self._append(record_ts, samples)
+        return []
+
+    def _append(self, record_ts, samples):
+        self._chunks.append(samples)
+        if self.prefilter is not None:
+            self._filtered_chunks.append(self.prefilter.process(samples, record_ts))
+
+    def flush(self):
+        """Analyze and clear the buffered minute."""
+        completed = []
+        if self._chunks:
+            detect_windows = [np.concatenate(self._filtered_chunks, axis=-1)] if self.prefilter is not None else None
+            completed = list(zip(*_analyze_minute_windows(
+                [self._minute], [np.concatenate(self._chunks, axis=-1)], self.sampling_rate, self.quality_gate,
+                detect_windows, self.return_peaks)))
+        self._chunks = []
+        self._filtered_chunks = []
+        return completed
+
+
+def iter_minute_hr(records, sampling_rate=250, quality_gate=False, prefilter=None, return_peaks=False):
+    """
+    Minute-wise HR over a time-ordered record stream (e.g. data_read.iter_merged_records).
+
+    Parameters:
+        records (iterable): (record_ts, samples) tuples in time order.
+        sampling_rate (int): Sampling rate in Hz.
+        quality_gate (bool): Skip detection for minutes failing the quality check.
+        prefilter (ECGStreamFilter, optional): Streaming filter applied before detection.
+        return_peaks (bool): Also yield the minute's R-peak sample indices.
+
+    Yields:
+        tuple: (minute_ts, minute_avg_hr, quality_score, best_lead); best_lead is the lead
+        number (1-based) of multi-lead records, 0 for single-lead records. With return_peaks,
+        the peak indices follow as a fifth item.
+    """
+    stream = MinuteHRStream(sampling_rate, quality_gate, prefilter, return_peaks)
+    for record_ts, samples in records:
+        yield from stream.feed(record_ts, samples)
+    yield from stream.flush()
+
+
+class ECGStreamFilter:
+    """
+    Causal preprocessing chain (high-pass, mains notch, band-pass) for streamed segments.
+
+    The filters are second-order sections run with scipy.signal.sosfilt; the filter
+    state is carried from one ``process`` call to the next, so consecutive
+    waveDataVoList segments (and files of a merged stream) are filtered as one
+    continuous signal without edge artifacts. All leads are filtered at once when a
+    (leads, n) array is given. The state is re-initialized (to the steady state of
+    the first sample) at the start and after a time gap longer than ``max_gap_s``.
+
+    Parameters:
+        sampling_rate (int): Sampling rate in Hz.
+        highpass_hz (float or None): Baseline-wander high-pass cutoff.
+        notch_hz (float or None): Mains frequency to notch out (50/60 Hz).
+        band_hz (tuple or None): (low, high) band-pass of the QRS energy band.
+        order (int): Butterworth order of the high-pass/band-pass.
+        notch_q (float): Quality factor of the notch.
+        max_gap_s (float): Gap between segments (beyond their own duration) that resets the state.
+    """
+
+    def __init__(self, sampling_rate=250, highpass_hz=0.5, notch_hz=50.0, band_hz=(5.0, 15.0), order=2,
+                 notch_q=30.0, max_gap_s=1.0):
+        try:
+            from scipy import signal as sp_signal
+        except ImportError as e:
+            raise ImportError("ECGStreamFilter requires scipy (Tip: `pip install scipy`)") from e
+        self._sosfilt = sp_signal.sosfilt
+        self._sosfiltfilt = sp_signal.sosfiltfilt
+        self.sampling_rate = sampling_rate
+        self.max_gap_s = max_gap_s
+
+        nyquist = sampling_rate / 2.0
+        sections = []
+        if highpass_hz:
+            sections.append(sp_signal.butter(order, highpass_hz, btype='highpass', fs=sampling_rate, output='sos'))
+        if notch_hz and notch_hz < nyquist:
+            b, a = sp_signal.iirnotch(notch_hz, notch_q, fs=sampling_rate)
+            sections.append(sp_signal.tf2sos(b, a))
+        if band_hz:
+            low, high = band_hz[0], min(band_hz[1], 0.99 * nyquist)
+            sections.append(sp_signal.butter(order, [low, high], btype='bandpass', fs=sampling_rate, output='sos'))
+        if not sections:
+            raise ValueError("ECGStreamFilter needs at least one filter stage")
+        self.sos = np.vstack(sections)
+        self._zi_unit = sp_signal.sosfilt_zi(self.sos)  # (n_sections, 2) steady state for a unit step
+        self.reset()
+
+    def reset(self):
+        """Forget the carried state (next segment starts a new stream)."""
+        self._zi = None
+        self._next_ts = None
+
+    def process(self, samples, record_ts=None):
+        """
+        Filter the next segment of the stream.
+
+        Parameters:
+            samples (np.array): (n,) samples of one lead or (leads, n) samples of all leads.
+            record_ts (float, optional): Segment start (epoch); used to detect gaps.
+
+        Returns:
+            np.array: Filtered samples, same shape as the input (float64).
+        """
+        x = np.asarray(samples, dtype=np.float64)
+        if x.shape[-1] == 0:
+            return x
+        if record_ts is not None and self._next_ts is not None and \
+                abs(record_ts - self._next_ts) > self.max_gap_s:
+            self.reset()
+        if self._zi is None or self._zi.shape[1:-1] != x.shape[:-1]:
+            # Steady state for the first sample of each lead: no start-up transient
+            first = x[..., 0]
+            self._zi = self._zi_unit.reshape((self._zi_unit.shape[0],) + (1,) * first.ndim + (2,)) \
+                * first[np.newaxis, ..., np.newaxis]
+        y, self._zi = self._sosfilt(self.sos, x, axis=-1, zi=self._zi)
+        if record_ts is not None:
+            self._next_ts = record_ts + x.shape[-1] / self.sampling_rate
+        return y
+
+    def apply_zero_phase(self, samples):
+        """Zero-phase (forward-backward) filtering of a complete window, no carried state."""
+        x = np.asarray(samples, dtype=np.float64)
+        return self._sosfiltfilt(self.sos, x, axis=-1)
+
+
+def benchmark_stream_filter(sampling_rate=250, n_leads=9, seconds=600, segment_s=1.0, **filter_kwargs):
+    """
+    Measure ECGStreamFilter throughput on synthetic segments.
+
+    Parameters:
+        sampling_rate (int): Sampling rate in Hz.
+        n_leads (int): Leads per segment (filtered together as a 2-D array).
+        seconds (int): Signal duration to filter.
+        segment_s (float): Segment duration per process() call.
+
+    Returns:
+        dict: samples (leads x samples), elapsed_s and samples_per_s.
+    """
+    stream_filter = ECGStreamFilter(sampling_rate, **filter_kwargs)
+    segment_len = int(sampling_rate * segment_s)
+    rng = np.random.default_rng(0)
+    segment = rng.normal(0, 100, size=(n_leads, segment_len))
+    n_segments = int(seconds / segment_s)
+
+    start = time.perf_counter()
+    for idx in range(n_segments):
+        stream_filter.process(segment, idx * segment_s)
+    elapsed = time.perf_counter() - start
+
+    total = n_leads * segment_len * n_segments
+    return {"samples": total, "elapsed_s": elapsed, "samples_per_s": total / elapsed if elapsed else float('inf')}
+
+
+def plot_combined_hr(all_timestamps, all_heart_rates=None, save_path=None):
     """
     Plot HR vs Time scatter plot (main UI plot, higher transparency).
 
     Parameters:
-        all_timestamps (list): Combined timestamps from all files.
-        all_heart_rates (list): Combined HR values from all files.
+        all_timestamps (list/np.array/HRSeries): Combined timestamps (or a HRSeries) from all files.
+        all_heart_rates (list/np.array): Combined HR values from all files (None for a HRSeries).
         save_path (str): Path to save plot (None = don't save).
 
     Returns:
         matplotlib.figure.Figure: Generated figure object.
     """
-    if not all_timestamps or not all_heart_rates:
+    all_timestamps, all_heart_rates = as_hr_arrays(all_timestamps, all_heart_rates)
+    if all_timestamps.size == 0 or all_heart_rates.size == 0:
         raise ValueError("No valid heart rate data to plot")
 
-    times = [datetime.fromtimestamp(ts) for ts in all_timestamps]
+    times = epoch_to_local_datenum(all_timestamps)
     fig, ax = plt.subplots(figsize=(12, 4), dpi=100)
 
     # Increase transparency (alpha=0.4)
@@ -109,22 +583,23 @@ def plot_combined_hr(all_timestamps, all_heart_rates, save_path=None):
     return fig
 
 
-def plot_hr_time_line(all_timestamps, all_heart_rates, save_path=None):
+def plot_hr_time_line(all_timestamps, all_heart_rates=None, save_path=None):
     """
     Plot HR vs Time line plot (new chart).
 
     Parameters:
-        all_timestamps (list): Combined timestamps from all files.
-        all_heart_rates (list): Combined HR values from all files.
+        all_timestamps (list/np.array/HRSeries): Combined timestamps (or a HRSeries) from all files.
+        all_heart_rates (list/np.array): Combined HR values from all files (None for a HRSeries).
         save_path (str): Path to save plot (None = don't save).
 
     Returns:
         matplotlib.figure.Figure: Generated figure object.
     """
-    if not all_timestamps or not all_heart_rates:
+    all_timestamps, all_heart_rates = as_hr_arrays(all_timestamps, all_heart_rates)
+    if all_timestamps.size == 0 or all_heart_rates.size == 0:
         raise ValueError("No valid heart rate data to plot")
 
-    times = [datetime.fromtimestamp(ts) for ts in all_timestamps]
+    times = epoch_to_local_datenum(all_timestamps)
     fig, ax = plt.subplots(figsize=(12, 4), dpi=100)
 
     ax.plot(times, all_heart_rates, color='darkblue', linewidth=1.5, alpha=0.8, label='Minute Avg HR')
@@ -152,6 +627,9 @@ def create_plot_window(fig, title):
     """
     Create a new Tkinter window with plot and navigation toolbar (zoom/pan).
 
+    The window owns the figure: it must not be shown in another window, and it is
+    closed when the window is destroyed.
+
     Parameters:
         fig (matplotlib.figure.Figure): Plot figure.
         title (str): Window title.
@@ -168,6 +646,8 @@ def create_plot_window(fig, title):
     toolbar.update()
 
     canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    # <Destroy> also fires for the child widgets; release the figure once, with the window
+    window.bind('<Destroy>', lambda event: plt.close(fig) if event.widget is window else None)
     return window
 
 
@@ -177,37 +657,23 @@ def calculate_hr_time_domain_stats(heart_rates):
     Calculate HR time-domain statistical metrics (all English parameters).
 
     Parameters:
-        heart_rates (list/np.array): Combined heart rate values.
+        heart_rates (list/np.array/HRSeries): Combined heart rate values.
 
     Returns:
         dict: Time-domain stats with English keys.
     """
-    if not heart_rates or len(heart_rates) < 2:
+    hr_array = as_hr_values(heart_rates).astype(np.float64)
+    if hr_array.size < 2:
         return {}
 
-    hr_array = np.array(heart_rates)
     hr_diff = np.diff(hr_array)  # 相邻HR差值
 
-    # 核心统计量（全部英文命名）
-    stats = {
-        "mean_hr": np.mean(hr_array),  # 均值
-        "median_hr": np.median(hr_array),  # 中位数
-        "std_hr": np.std(hr_array, ddof=1),  # 标准差 (SDNN 等价)
-        "var_hr": np.var(hr_array, ddof=1),  # 方差
-        "min_hr": np.min(hr_array),  # 最小值
-        "max_hr": np.max(hr_array),  # 最大值
-        "range_hr": np.max(hr_array) - np.min(hr_array),  # 极差
-        "rmssd": np.sqrt(np.mean(np.square(hr_diff))),  # 相邻HR差值均方根
-        "cv_sd": np.sqrt(np.mean(np.square(hr_diff))) / np.mean(hr_array),  # CVSD (RMSSD/均值)
-        "cv_nn": np.std(hr_array, ddof=1) / np.mean(hr_array),  # CVNN (SDNN/均值)
-        "pnn50": 100 * np.sum(np.abs(hr_diff) > 5) / len(hr_diff)  # 相邻HR差值>5BPM的占比
-    }
-
-    # 保留2位小数
-    for key in stats:
-        stats[key] = round(stats[key], 2)
-
-    return stats
+    # Each moment is computed once and shared by the derived metrics
+    mean_hr = hr_array.mean()
+    var_hr = np.square(hr_array - mean_hr).sum() / (hr_array.size - 1)
+    return time_domain_stats(hr_array.size, mean_hr, var_hr, hr_array.min(), hr_array.max(),
+                             np.median(hr_array), hr_diff.size, np.dot(hr_diff, hr_diff),
+                             np.count_nonzero(np.abs(hr_diff) > PNN_THRESHOLD_BPM))
 
 
 # Need to import tkinter here (since used in create_plot_window)
@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+import importlib.util
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_TYPES = ('A', 'B', 'C')
+
+# Styles of the default event types; other types get one from AUTO_EVENT_STYLES
+DEFAULT_EVENT_STYLES = {
+    'A': {'color': 'red', 'linestyle': '--', 'marker': 'o'},
+    'B': {'color': 'blue', 'linestyle': '-.', 'marker': 's'},
+    'C': {'color': 'green', 'linestyle': '-', 'marker': '^'}
+}
+AUTO_EVENT_STYLES = [
+    {'color': 'purple', 'linestyle': ':', 'marker': 'D'},
+    {'color': 'orange', 'linestyle': '--', 'marker': 'v'},
+    {'color': 'brown', 'linestyle': '-.', 'marker': 'P'},
+    {'color': 'teal', 'linestyle': '-', 'marker': '*'},
+    {'color': 'magenta', 'linestyle': ':', 'marker': 'X'}
+]
+
+EVENT_FILE_TYPES = ('.xlsx', '.xls', '.csv', '.parquet')
+
+
+class EventIndex:
+    """
+    Events grouped by type, each group a sorted float64 array of epoch timestamps.
+
+    Events are stored type by type in one array (types in first-seen order, times
+    sorted within each type), so the events of a type in a time window are a
+    binary search plus a zero-copy slice.
+
+    Parameters:
+        timestamps (array-like): Event epoch timestamps.
+        event_types (array-like): Event type of each timestamp (same length).
+    """
+
+    def __init__(self, timestamps, event_types):
+        ts = np.asarray(timestamps, dtype=np.float64)
+        types = np.asarray(event_types, dtype=object).astype(str)
+        if ts.shape != types.shape:
+            raise ValueError(f"Event timestamp/type length mismatch ({len(ts)} vs {len(types)})")
+
+        unique, first_seen, codes = np.unique(types, return_index=True, return_inverse=True)
+        # Renumber type codes in first-seen order (stable, file order of types)
+        rank = np.empty(len(unique), dtype=np.int64)
+        rank[np.argsort(first_seen, kind='stable')] = np.arange(len(unique))
+        codes = rank[codes]
+
+        order = np.lexsort((ts, codes))
+        self.types = [str(t) for t in unique[np.argsort(first_seen, kind='stable')]]
+        self.timestamps = ts[order]
+        self.bounds = np.searchsorted(codes[order], np.arange(len(self.types) + 1))
+        self.timestamps.flags.writeable = False
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __bool__(self):
+        return len(self.timestamps) > 0
+
+    def __repr__(self):
+        return f"EventIndex(events={len(self)}, types={self.types})"
+
+    def times(self, event_type):
+        """Sorted timestamps of one event type (empty if unknown)."""
+        if event_type not in self.types:
+            return self.timestamps[:0]
+        code = self.types.index(event_type)
+        return self.timestamps[self.bounds[code]:self.bounds[code + 1]]
+
+    def counts(self):
+        """Number of events per type."""
+        return {event_type: int(self.bounds[code + 1] - self.bounds[code])
+                for code, event_type in enumerate(self.types)}
+
+    def window(self, start_ts=None, end_ts=None, event_type=None):
+        """
+        Events with start_ts <= timestamp <= end_ts (O(log n) per type).
+
+        Returns:
+            np.array or dict: Timestamps of `event_type`, or {type: timestamps} for all types.
+        """
+        lo = -np.inf if start_ts is None else start_ts
+        hi = np.inf if end_ts is None else end_ts
+        if event_type is not None:
+            times = self.times(event_type)
+            return times[np.searchsorted(times, lo, side='left'):np.searchsorted(times, hi, side='right')]
+        return {t: self.window(lo, hi, t) for t in self.types}
+
+
+def event_styles_for(event_types, styles=None):
+    """Style dict for each event type (configured styles first, then AUTO_EVENT_STYLES in turn)."""
+    styles = dict(DEFAULT_EVENT_STYLES if styles is None else styles)
+    auto = iter(AUTO_EVENT_STYLES * (len(event_types) // len(AUTO_EVENT_STYLES) + 1))
+    for event_type in event_types:
+        if event_type not in styles:
+            styles[event_type] = next(auto)
+    return styles
+
+
+def _read_event_table(file_path):
+    """Read the first two columns (time, type) of an xlsx/xls/csv/parquet file."""
+    import pandas as pd
+
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.csv':
+        # Explicit dtypes: no per-column type inference on large files
+        return pd.read_csv(file_path, usecols=[0, 1], names=['event_time', 'event_type'], header=0,
+                           dtype={'event_type': str}, skipinitialspace=True)
+    if ext == '.parquet':
+        df = pd.read_parquet(file_path)
+        df = df.iloc[:, :2]
+        df.columns = ['event_time', 'event_type']
+        return df
+    if ext in ('.xlsx', '.xls'):
+        # The Rust calamine reader is much faster than openpyxl on large sheets
+        engine = 'calamine' if importlib.util.find_spec('python_calamine') else None
+        return pd.read_excel(file_path, usecols=[0, 1], names=['event_time', 'event_type'], engine=engine)
+    raise ValueError(f"Unsupported event file type: {ext} (supported: {', '.join(EVENT_FILE_TYPES)})")
+
+
+def event_times_to_epoch(times):
+    """
+    Convert an event time column to epoch seconds (vectorized).
+
+    Naive times are read like ``pd.Timestamp.timestamp()`` (as UTC), tz-aware
+    times by their offset; unparseable times become NaN.
+
+    Parameters:
+        times (pd.Series): Time column (datetime64, strings or Excel datetimes).
+
+    Returns:
+        np.array: float64 epoch seconds.
+    """
+    import pandas as pd
+
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        # Parsed as UTC: naive strings keep their wall time, mixed offsets are converted
+        times = pd.to_datetime(times, errors='coerce', utc=True)  # 无效时间会转为NaT
+    if getattr(times.dt, 'tz', None) is not None:
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+    epoch = (times - pd.Timestamp('1970-01-01')) / pd.Timedelta(seconds=1)
+    return epoch.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def load_event_file(file_path, event_types=DEFAULT_EVENT_TYPES):
+    """
+    Load events (col A: time, col B: event type) from an xlsx/xls, CSV or Parquet file.
+
+    Parameters:
+        file_path (str): Event file path.
+        event_types (iterable, optional): Types to keep (None = all types in the file).
+
+    Returns:
+        EventIndex: Sorted events grouped by type.
+    """
+    start = time.perf_counter()
+    df = _read_event_table(file_path)
+    ts = event_times_to_epoch(df['event_time'])
+    types = df['event_type'].astype(str).str.strip().to_numpy(dtype=object)
+
+    keep = ~np.isnan(ts)  # 过滤无效时间
+    if event_types is not None:
+        keep &= np.isin(types, [str(t) for t in event_types])
+    index = EventIndex(ts[keep], types[keep])
+    logger.info(f"Loaded {len(index)} of {len(df)} events from {os.path.basename(file_path)} "
+                f"in {time.perf_counter() - start:.2f} s")
+    return index
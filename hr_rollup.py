@@ -0,0 +1,301 @@
+import numpy as np
+import matplotlib.dates as mdates
+
+from hr_series import as_hr_arrays, epoch_to_local_datenum
+from hr_stats import PNN_THRESHOLD_BPM
+
+
+# Rollup levels (key -> description); keys/labels are in local time
+ROLLUP_LEVELS = {
+    "hour": "Hourly",
+    "day": "Daily",
+    "period": "Day/Night per day",
+    "hour_of_day": "Hour of day (all days)",
+    "day_night": "Day vs night (all days)"
+}
+
+DEFAULT_DAY_START_HOUR = 8  # Day period: [day_start, night_start), night: the rest
+DEFAULT_NIGHT_START_HOUR = 22
+
+# Levels pooling points of many recording runs: successive differences (RMSSD, pNN50) are
+# only taken between points of the same run (hour or day/night period), never across runs
+_RUN_LEVELS = {"hour_of_day": "hour", "day_night": "period"}
+
+# Per-group columns of a rollup table (mergeable moments, like HRStatsAccumulator);
+# first_run/last_run: run key (see _RUN_LEVELS) of the first/last value of the group
+_STAT_COLUMNS = ('count', 'mean', 'm2', 'min', 'max', 'first', 'last', 'diff_count', 'diff_sq_sum', 'diff_over',
+                 'first_run', 'last_run')
+_INT_COLUMNS = ('count', 'diff_count', 'diff_over', 'first_run', 'last_run')
+_EMPTY_VALUES = {'min': np.inf, 'max': -np.inf, 'first': np.nan, 'last': np.nan}
+
+
+def _empty_columns(size):
+    return {name: np.full(size, _EMPTY_VALUES.get(name, 0), dtype=np.int64 if name in _INT_COLUMNS else np.float64)
+            for name in _STAT_COLUMNS}
+
+
+def _group_columns(keys, values, runs=None):
+    """
+    Per-group moments of values sorted by (key, time) in one vectorized pass.
+
+    runs (np.array, optional): Run key of every value; successive differences are only
+    taken inside a run (default: the group key, i.e. inside the group).
+    """
+    if runs is None:
+        runs = keys
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, keys.size])
+    group = np.repeat(np.arange(starts.size), counts)
+    mean = np.add.reduceat(values, starts) / counts
+
+    # Successive differences inside each group and run (time order)
+    same_group = (keys[1:] == keys[:-1]) & (runs[1:] == runs[:-1])
+    diffs = np.diff(values)[same_group]
+    diff_group = group[1:][same_group]
+
+    columns = {
+        'count': counts.astype(np.int64),
+        'mean': mean,
+        'm2': np.bincount(group, np.square(values - mean[group]), minlength=starts.size),
+        'min': np.minimum.reduceat(values, starts),
+        'max': np.maximum.reduceat(values, starts),
+        'first': values[starts],
+        'last': values[starts + counts - 1],
+        'diff_count': np.bincount(diff_group, minlength=starts.size).astype(np.int64),
+        'diff_sq_sum': np.bincount(diff_group, np.square(diffs), minlength=starts.size),
+        'diff_over': np.bincount(diff_group, np.abs(diffs) > PNN_THRESHOLD_BPM, minlength=starts.size).astype(np.int64),
+        'first_run': runs[starts].astype(np.int64),
+        'last_run': runs[starts + counts - 1].astype(np.int64)
+    }
+    return keys[starts], columns
+
+
+class RollupTable:
+    """
+    HR stats of one rollup level: sorted int64 group keys + mergeable per-group moments.
+
+    ``merge`` folds in the groups of a new batch (Chan's parallel update per group,
+    vectorized over groups); values of the batch are treated as following the
+    values already in the table, like HRStatsAccumulator.merge.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.columns = _empty_columns(0)
+
+    def __len__(self):
+        return self.keys.size
+
+    def merge(self, keys, columns):
+        union = np.union1d(self.keys, keys)
+        merged = _empty_columns(union.size)
+        old = np.searchsorted(union, self.keys)
+        for name in _STAT_COLUMNS:
+            merged[name][old] = self.columns[name]
+
+        new = np.searchsorted(union, keys)
+        count_a = merged['count'][new]
+        count_b = columns['count']
+        total = count_a + count_b
+        delta = columns['mean'] - merged['mean'][new]
+        seen = count_a > 0
+        # Difference between the last value already in a group and the first new value (same run only)
+        joined = seen & (merged['last_run'][new] == columns['first_run'])
+        cross = np.where(joined, columns['first'] - merged['last'][new], 0.0)
+
+        merged['mean'][new] += delta * count_b / total
+        merged['m2'][new] += columns['m2'] + delta * delta * count_a * count_b / total
+        merged['count'][new] = total
+        merged['min'][new] = np.minimum(merged['min'][new], columns['min'])
+        merged['max'][new] = np.maximum(merged['max'][new], columns['max'])
+        merged['first'][new] = np.where(seen, merged['first'][new], columns['first'])
+        merged['last'][new] = columns['last']
+        merged['first_run'][new] = np.where(seen, merged['first_run'][new], columns['first_run'])
+        merged['last_run'][new] = columns['last_run']
+        merged['diff_count'][new] += columns['diff_count'] + joined
+        merged['diff_sq_sum'][new] += columns['diff_sq_sum'] + np.square(cross)
+        merged['diff_over'][new] += columns['diff_over'] + (joined & (np.abs(cross) > PNN_THRESHOLD_BPM))
+
+        self.keys = union
+        self.columns = merged
+
+    def to_state(self):
+        """Keys and columns as plain lists (exact; see HRRollup.to_state)."""
+        return {"keys": self.keys.tolist(), **{name: values.tolist() for name, values in self.columns.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        table = cls()
+        table.keys = np.asarray(state["keys"], dtype=np.int64)
+        table.columns = {name: np.asarray(state[name], dtype=values.dtype)
+                         for name, values in _empty_columns(len(table.keys)).items()}
+        return table
+
+    def stats(self):
+        """Per-group stat arrays: count, mean_hr, std_hr, min_hr, max_hr, rmssd, pnn50 (NaN where undefined)."""
+        c = self.columns
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.where(c['count'] > 1, c['m2'] / (c['count'] - 1), np.nan))
+            rmssd = np.sqrt(np.where(c['diff_count'] > 0, c['diff_sq_sum'] / c['diff_count'], np.nan))
+            pnn50 = np.where(c['diff_count'] > 0, 100 * c['diff_over'] / c['diff_count'], np.nan)
+        return {"count": c['count'], "mean_hr": c['mean'], "std_hr": std, "min_hr": c['min'], "max_hr": c['max'],
+                "rmssd": rmssd, "pnn50": pnn50}
+
+
+class HRRollup:
+    """
+    Rollup cube of HR stats by hour, day, day/night period, hour of day and day vs night.
+
+    Every ``update`` computes the group keys of all levels for the new points and
+    folds them in with one sort + reduceat/bincount pass per level; lookups are a
+    binary search in a small table. Feed batches in time order (e.g. per analyzed
+    file) so successive-difference stats (RMSSD, pNN50) follow the recording. The
+    pooled levels (hour of day, day vs night) only difference points of the same
+    hour / period, so a group holding single points of many days reports None.
+
+    Parameters:
+        day_start_hour (int): Local hour the day period starts.
+        night_start_hour (int): Local hour the night period starts (night runs into the next morning
+            and belongs to the date it started on).
+    """
+
+    def __init__(self, day_start_hour=DEFAULT_DAY_START_HOUR, night_start_hour=DEFAULT_NIGHT_START_HOUR):
+        if not 0 <= day_start_hour < night_start_hour <= 24:
+            raise ValueError(f"Invalid day/night hours: day starts {day_start_hour}, night starts {night_start_hour}")
+        self.day_start_hour = day_start_hour
+        self.night_start_hour = night_start_hour
+        self.tables = {level: RollupTable() for level in ROLLUP_LEVELS}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"HRRollup(points={self.count}, " + \
+            ", ".join(f"{level}={len(table)}" for level, table in self.tables.items()) + ")"
+
+    def _group_keys(self, timestamps):
+        """Group key of each timestamp for every level (local time)."""
+        local_hours = epoch_to_local_datenum(timestamps) * 24.0
+        hour = np.floor(local_hours).astype(np.int64)
+        # Periods are counted from day start, so a night stays one group across midnight
+        shifted = local_hours - self.day_start_hour
+        period_day = np.floor(shifted / 24.0).astype(np.int64)
+        is_night = (shifted - period_day * 24.0 >= self.night_start_hour - self.day_start_hour).astype(np.int64)
+        return {
+            "hour": hour,
+            "day": np.floor_divide(hour, 24),
+            "period": period_day * 2 + is_night,
+            "hour_of_day": np.mod(hour, 24),
+            "day_night": is_night
+        }
+
+    def update(self, timestamps, heart_rates=None):
+        """
+        Fold new HR points into every level (incremental; O(batch log batch + groups)).
+
+        Parameters:
+            timestamps (list/np.array/HRSeries): Epoch timestamps (or a HRSeries).
+            heart_rates (list/np.array): HR values (None for a HRSeries).
+        """
+        ts, hr = as_hr_arrays(timestamps, heart_rates)
+        hr = hr.astype(np.float64)
+        valid = ~np.isnan(hr)
+        ts, hr = ts[valid], hr[valid]
+        if not ts.size:
+            return self
+        group_keys = self._group_keys(ts)
+        for level, keys in group_keys.items():
+            order = np.lexsort((ts, keys))
+            runs = group_keys[_RUN_LEVELS[level]][order] if level in _RUN_LEVELS else None
+            self.tables[level].merge(*_group_columns(keys[order], hr[order], runs))
+        self.count += ts.size
+        return self
+
+    @classmethod
+    def from_series(cls, timestamps, heart_rates=None, **kwargs):
+        return cls(**kwargs).update(timestamps, heart_rates)
+
+    def merge(self, other):
+        """
+        Fold another rollup (same day/night hours) into this one; its points follow this one's.
+
+        Returns:
+            HRRollup: self
+        """
+        if (other.day_start_hour, other.night_start_hour) != (self.day_start_hour, self.night_start_hour):
+            raise ValueError("Cannot merge rollups with different day/night hours")
+        for level, table in other.tables.items():
+            if len(table):
+                self.tables[level].merge(table.keys, table.columns)
+        self.count += other.count
+        return self
+
+    def to_state(self):
+        """Exact rollup state as plain JSON types (partial-result shards, see from_state)."""
+        return {
+            "day_start_hour": self.day_start_hour,
+            "night_start_hour": self.night_start_hour,
+            "count": self.count,
+            "tables": {level: table.to_state() for level, table in self.tables.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rollup restored from to_state() output."""
+        rollup = cls(state["day_start_hour"], state["night_start_hour"])
+        rollup.count = int(state["count"])
+        rollup.tables = {level: RollupTable.from_state(state["tables"][level]) for level in ROLLUP_LEVELS}
+        return rollup
+
+    def _label(self, level, key):
+        if level == "hour":
+            return mdates.num2date(key / 24.0).strftime('%Y-%m-%d %H:00')
+        if level == "day":
+            return mdates.num2date(key).strftime('%Y-%m-%d')
+        if level == "period":
+            date = mdates.num2date(key // 2).strftime('%Y-%m-%d')
+            return f"{date} {'night' if key % 2 else 'day'}"
+        if level == "hour_of_day":
+            return f"{key:02d}:00"
+        return "night" if key else "day"
+
+    def rows(self, level, indices=None):
+        """
+        Stats rows of one level in key (time) order.
+
+        Parameters:
+            level (str): One of ROLLUP_LEVELS.
+            indices (list, optional): Row positions to return (default: all).
+
+        Returns:
+            list: Dicts with 'group' label, 'count' and mean/std/min/max HR, RMSSD, pNN50 (2 decimals, None if undefined).
+        """
+        table = self.tables[level]
+        selection = slice(None) if indices is None else np.asarray(indices, dtype=np.int64)
+        stats = {name: values[selection] for name, values in table.stats().items()}
+        rows = []
+        for idx, key in enumerate(table.keys[selection].tolist()):
+            row = {"group": self._label(level, key), "count": int(stats["count"][idx])}
+            for name in ("mean_hr", "std_hr", "min_hr", "max_hr", "rmssd", "pnn50"):
+                value = float(stats[name][idx])
+                row[name] = None if np.isnan(value) else round(value, 2)
+            rows.append(row)
+        return rows
+
+    def lookup(self, level, timestamp):
+        """Stats row of the group containing an epoch timestamp (None if the group has no data)."""
+        key = self._group_keys(np.array([timestamp], dtype=np.float64))[level][0]
+        table = self.tables[level]
+        idx = int(np.searchsorted(table.keys, key))
+        if idx == len(table) or table.keys[idx] != key:
+            return None
+        return self.rows(level, [idx])[0]
+
+    def to_dict(self):
+        """All levels as {level: rows} plus the day/night configuration (JSON export)."""
+        return {
+            "day_start_hour": self.day_start_hour,
+            "night_start_hour": self.night_start_hour,
+            "levels": {level: self.rows(level) for level in ROLLUP_LEVELS}
+        }
@@ -0,0 +1,231 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.lines import Line2D
+
+from hr_series import HRSeries, as_hr_arrays, epoch_to_local_datenum
+
+
+DEFAULT_EVENT_STYLE = {'color': 'black', 'linestyle': '-', 'marker': 'x'}
+EVENT_MARKER_Y = 0.95  # Event markers near the top of the axes (axes coordinates)
+
+
+class HRScatterView:
+    """
+    Persistent HR vs Time scatter (main GUI plot) updated in place.
+
+    The figure and its artists are created once. New HR points are converted and
+    appended to a growing offsets buffer (``set_offsets``), the global-average line
+    is moved with ``set_ydata``, and event overlays are animated artists redrawn by
+    blitting over the cached background, so importing events does not re-render
+    the HR points. ``refresh`` does a full redraw only when the points, limits or
+    legend changed. The view follows the data extent until the user zooms or pans
+    (``is_zoomed``); it then stays put until the user returns to it (toolbar Home).
+    Call ``close`` to release the figure.
+
+    Parameters:
+        figsize (tuple): Figure size in inches.
+        dpi (int): Figure resolution.
+    """
+
+    def __init__(self, figsize=(12, 4), dpi=100):
+        self.fig, self.ax = plt.subplots(figsize=figsize, dpi=dpi)
+        ax = self.ax
+
+        self.scatter = ax.scatter(np.empty(0), np.empty(0), color='crimson', s=15, alpha=0.4, label='Minute Avg HR',
+                                  picker=True, pickradius=5, gid='hr_scatter')
+        self.avg_line = ax.axhline(y=0, color='navy', linestyle='--', linewidth=2, visible=False)
+
+        ax.set_title('Heart Rate vs Time (Scatter Plot with Events)', fontsize=12, pad=10)
+        ax.set_xlabel('Time', fontsize=10)
+        ax.set_ylabel('Heart Rate (BPM)', fontsize=10)
+        ax.xaxis_date()
+        # Auto locator: a fixed hourly locator generates thousands of ticks on multi-day data
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
+        ax.tick_params(axis='x', labelrotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment('right')
+        ax.grid(alpha=0.5, linestyle='--')
+
+        self._offsets = np.empty((0, 2), dtype=np.float64)  # Growing (datenum, HR) buffer
+        self._size = 0
+        self._hr_sum = 0.0
+        self._ts_min, self._ts_max = np.inf, -np.inf  # Plotted epoch range (event window)
+        self._source = None  # HRSeries plotted so far (appends are detected by length)
+        self._events = {}  # event type -> (vertical lines Line2D, markers Line2D)
+        self._background = None
+        self._dirty = True  # Full redraw needed (points, limits, legend)
+        self._overlay_dirty = False  # Event overlays changed (blit is enough)
+        self._draw_cid = None
+        self._layout_done = False
+        self._applied_limits = None  # (xlim, ylim) last set from the data extent
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def needs_full_redraw(self):
+        """True if the next refresh redraws everything (points, limits or legend changed)."""
+        return self._dirty or self._background is None
+
+    @property
+    def is_zoomed(self):
+        """True if the view differs from the data-extent limits last set (user zoom/pan)."""
+        if self._applied_limits is None:
+            return False
+        return not np.allclose(self.ax.get_xlim() + self.ax.get_ylim(), sum(self._applied_limits, ()), rtol=0, atol=1e-9)
+
+    def attach(self, canvas):
+        """Connect to the canvas the figure is shown on (call after creating e.g. FigureCanvasTkAgg)."""
+        if self._draw_cid is not None:
+            self.fig.canvas.mpl_disconnect(self._draw_cid)
+        self._draw_cid = canvas.mpl_connect('draw_event', self._on_draw)
+
+    # ------------------------------------------------------------ HR points
+
+    def set_series(self, timestamps, heart_rates=None):
+        """
+        Show a HR series. If it is the HRSeries shown before and has only grown, just the
+        new points are converted and appended; otherwise the offsets are rebuilt.
+        """
+        if isinstance(timestamps, HRSeries) and timestamps is self._source and len(timestamps) >= self._size:
+            if len(timestamps) > self._size:
+                self._append(timestamps.timestamps[self._size:], timestamps.heart_rates[self._size:])
+            return
+        ts, hr = as_hr_arrays(timestamps, heart_rates)
+        self._size = 0
+        self._hr_sum = 0.0
+        self._ts_min, self._ts_max = np.inf, -np.inf
+        self._source = timestamps if isinstance(timestamps, HRSeries) else None
+        self._append(ts, hr)
+
+    def _append(self, timestamps, heart_rates):
+        count = len(timestamps)
+        if self._size + count > len(self._offsets):
+            grown = np.empty((max(2 * len(self._offsets), self._size + count, 1024), 2), dtype=np.float64)
+            grown[:self._size] = self._offsets[:self._size]
+            self._offsets = grown
+        new = self._offsets[self._size:self._size + count]
+        new[:, 0] = epoch_to_local_datenum(timestamps)
+        new[:, 1] = heart_rates
+        self._size += count
+        self._hr_sum += float(np.sum(new[:, 1]))
+        if count:
+            self._ts_min = min(self._ts_min, float(np.min(timestamps)))
+            self._ts_max = max(self._ts_max, float(np.max(timestamps)))
+
+        self.scatter.set_offsets(self._offsets[:self._size])
+        if self._size:
+            global_avg = self._hr_sum / self._size
+            self.avg_line.set_ydata([global_avg, global_avg])
+            self.avg_line.set_label(f'Global Avg: {global_avg:.1f} BPM')
+        self.avg_line.set_visible(self._size > 0)
+        self._update_limits()
+        self._update_legend()
+        self._dirty = True
+
+    def _update_limits(self):
+        # Keep the user's zoom: the data-extent view is only applied while it is shown
+        if not self._size or self.is_zoomed:
+            return
+        points = self._offsets[:self._size]
+        (x_min, y_min), (x_max, y_max) = np.nanmin(points, axis=0), np.nanmax(points, axis=0)
+        x_pad = max((x_max - x_min) * 0.02, 1 / 1440.0)
+        y_pad = max((y_max - y_min) * 0.05, 1.0)
+        self.ax.set_xlim(x_min - x_pad, x_max + x_pad)
+        self.ax.set_ylim(y_min - y_pad, y_max + y_pad)
+        self._applied_limits = (self.ax.get_xlim(), self.ax.get_ylim())
+
+    # ------------------------------------------------------------ events
+
+    def set_events(self, event_data, event_styles=None):
+        """
+        Show events (EventIndex) inside the plotted time range: one vertical-line
+        collection + one marker scatter per type, updated in place.
+        """
+        # Only events inside the plotted time range (binary search per type)
+        window = event_data.window(self._ts_min, self._ts_max) if event_data and self._size else {}
+        styles = event_styles or {}
+        transform = self.ax.get_xaxis_transform()  # x in data, y in axes coordinates
+        shown = set()
+        for event_type, event_ts in window.items():
+            if not len(event_ts):
+                continue
+            shown.add(event_type)
+            style = styles.get(event_type, DEFAULT_EVENT_STYLE)
+            x = epoch_to_local_datenum(event_ts)
+            # All vertical lines of a type as one NaN-separated path (no per-event artists/paths)
+            line_x = np.repeat(x, 3)
+            line_x[2::3] = np.nan
+            line_y = np.tile([0.0, 1.0, np.nan], len(x))
+            marker_y = np.full(len(x), EVENT_MARKER_Y)
+            if event_type not in self._events:
+                lines = Line2D(line_x, line_y, transform=transform, color=style['color'],
+                               linestyle=style['linestyle'], linewidth=1.5, alpha=0.8, animated=True)
+                markers = Line2D(x, marker_y, transform=transform, color=style['color'], linestyle='none',
+                                 marker=style['marker'], markersize=7, label=f'Event {event_type}', animated=True)
+                # add_artist: overlays do not change the data limits
+                self.ax.add_artist(lines)
+                self.ax.add_artist(markers)
+                self._events[event_type] = (lines, markers)
+                self._dirty = True  # New legend entry
+            else:
+                lines, markers = self._events[event_type]
+                lines.set_data(line_x, line_y)
+                markers.set_data(x, marker_y)
+        for event_type in list(self._events):
+            if event_type not in shown:
+                for artist in self._events.pop(event_type):
+                    artist.remove()
+                self._dirty = True
+        self._overlay_dirty = True
+        self._update_legend()
+
+    def _update_legend(self):
+        handles = [self.scatter] + ([self.avg_line] if self._size else []) + \
+            [markers for _, markers in self._events.values()]
+        if self._size:
+            # Fixed location: loc='best' scans every HR point on each redraw
+            self.ax.legend(handles, [handle.get_label() for handle in handles], fontsize=10, loc='upper right')
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
+
+    # ------------------------------------------------------------ drawing
+
+    def _overlay_artists(self):
+        return [artist for pair in self._events.values() for artist in pair]
+
+    def _on_draw(self, event):
+        # After every full draw: cache the background without overlays, then draw them on top
+        canvas = self.fig.canvas
+        if hasattr(canvas, 'copy_from_bbox'):
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self._overlay_artists():
+            self.ax.draw_artist(artist)
+
+    def refresh(self):
+        """Redraw: full redraw if points/limits/legend changed, else blit the event overlays."""
+        canvas = self.fig.canvas
+        if self.needs_full_redraw:
+            if self._size and not self._layout_done:
+                self.fig.tight_layout()
+                self._layout_done = True
+            self._dirty = self._overlay_dirty = False
+            canvas.draw_idle()
+        elif self._overlay_dirty:
+            self._overlay_dirty = False
+            canvas.restore_region(self._background)
+            for artist in self._overlay_artists():
+                self.ax.draw_artist(artist)
+            canvas.blit(self.fig.bbox)
+
+    def clear(self):
+        """Remove all points and events (artists and figure are kept); the next data resets the view."""
+        self._applied_limits = None
+        self.set_series(np.empty(0), np.empty(0))
+        self.set_events(None)
+
+    def close(self):
+        """Close the figure (releases it from pyplot)."""
+        plt.close(self.fig)
@@ -0,0 +1,327 @@
+import itertools
+from datetime import datetime
+import numpy as np
+import matplotlib.dates as mdates
+
+
+# Data-version stamps are unique across all series, so (kind, version) keys of
+# caches never collide between a cleared/replaced series and its successor
+_version_counter = itertools.count(1)
+
+
+class HRSeries:
+    """
+    Compact heart rate time series (float64 epoch timestamps + float32 HR).
+
+    Points are stored in growable NumPy buffers whose capacity grows in whole
+    chunks (at least doubling), so appends are amortized O(1) and ``timestamps`` /
+    ``heart_rates`` are zero-copy views of the filled part (~16 bytes per point
+    instead of two Python lists of float objects). A float32 per-point signal
+    quality score (NaN if unknown) and the int16 best lead of multi-lead detection
+    (lead number, 0 for single-lead results) are kept alongside. ``version`` changes on every
+    mutation (cache key for derived figures/statistics). A sorted ``time_slice``
+    shares its parent's buffers read-only; whichever of the two is modified in a
+    way that would touch the shared part moves to its own buffers first.
+
+    Parameters:
+        timestamps (array-like, optional): Initial epoch timestamps (seconds).
+        heart_rates (array-like, optional): Initial HR values (BPM), same length.
+        quality (array-like, optional): Initial quality scores (0-1), same length.
+        best_lead (array-like, optional): Initial best lead numbers (0 = single lead), same length.
+    """
+
+    __slots__ = ('_ts', '_hr', '_q', '_lead', '_size', '_sorted', '_version', '_shared')
+
+    CHUNK_SIZE = 4096  # Capacity granularity (points)
+
+    def __init__(self, timestamps=None, heart_rates=None, quality=None, best_lead=None):
+        self._ts = np.empty(0, dtype=np.float64)
+        self._hr = np.empty(0, dtype=np.float32)
+        self._q = np.empty(0, dtype=np.float32)
+        self._lead = np.empty(0, dtype=np.int16)
+        self._size = 0
+        self._sorted = True
+        self._version = next(_version_counter)
+        self._shared = False  # Buffers are (partly) viewed by another series
+        if timestamps is not None:
+            self.extend(timestamps, heart_rates, quality, best_lead)
+
+    @classmethod
+    def _wrap(cls, timestamps, heart_rates, quality, best_lead, is_sorted, shared=False):
+        """Build a series directly on existing arrays (no copy)."""
+        series = cls()
+        series._ts = timestamps
+        series._hr = heart_rates
+        series._q = quality
+        series._lead = best_lead
+        series._size = len(timestamps)
+        series._sorted = is_sorted
+        series._shared = shared
+        return series
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __repr__(self):
+        return f"HRSeries(points={self._size}, sorted={self._sorted})"
+
+    def __reduce__(self):
+        # Pickle only the filled part of the buffers (process pools, shards)
+        return _rebuild_series, (self.timestamps.copy(), self.heart_rates.copy(), self.quality.copy(),
+                                 self.best_lead.copy(), self._sorted)
+
+    @property
+    def timestamps(self):
+        """Read-only float64 view of epoch timestamps."""
+        view = self._ts[:self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def heart_rates(self):
+        """Read-only float32 view of HR values."""
+        view = self._hr[:self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def quality(self):
+        """Read-only float32 view of per-point quality scores (NaN = unknown)."""
+        view = self._q[:self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def best_lead(self):
+        """Read-only int16 view of the best lead per point (lead number, 0 = single-lead detection)."""
+        view = self._lead[:self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def is_sorted(self):
+        """True if timestamps are non-decreasing."""
+        return self._sorted
+
+    @property
+    def version(self):
+        """Data-version stamp; changes whenever the points change."""
+        return self._version
+
+    @property
+    def nbytes(self):
+        """Allocated buffer size in bytes."""
+        return self._ts.nbytes + self._hr.nbytes + self._q.nbytes + self._lead.nbytes
+
+    def _reserve(self, extra):
+        """Grow buffers (whole chunks, at least doubling) to fit `extra` more points."""
+        needed = self._size + extra
+        capacity = len(self._ts)
+        if needed <= capacity and self._ts.flags.writeable:
+            return
+        # A read-only slice never writes into (or grows over) its parent's buffers
+        new_capacity = max(needed, 2 * capacity)
+        new_capacity = -(-new_capacity // self.CHUNK_SIZE) * self.CHUNK_SIZE
+        self._move_to(new_capacity)
+
+    def _move_to(self, new_capacity):
+        """Copy the filled part into fresh buffers of `new_capacity` points."""
+        new_ts = np.empty(new_capacity, dtype=np.float64)
+        new_hr = np.empty(new_capacity, dtype=np.float32)
+        new_q = np.empty(new_capacity, dtype=np.float32)
+        new_lead = np.empty(new_capacity, dtype=np.int16)
+        new_ts[:self._size] = self._ts[:self._size]
+        new_hr[:self._size] = self._hr[:self._size]
+        new_q[:self._size] = self._q[:self._size]
+        new_lead[:self._size] = self._lead[:self._size]
+        self._ts = new_ts
+        self._hr = new_hr
+        self._q = new_q
+        self._lead = new_lead
+        self._shared = False
+
+    def append(self, timestamp, heart_rate, quality=np.nan, best_lead=0):
+        """Append one point (amortized O(1))."""
+        self._reserve(1)
+        if self._size and timestamp < self._ts[self._size - 1]:
+            self._sorted = False
+        self._ts[self._size] = timestamp
+        self._hr[self._size] = heart_rate
+        self._q[self._size] = quality
+        self._lead[self._size] = best_lead
+        self._size += 1
+        self._version = next(_version_counter)
+
+    def extend(self, timestamps, heart_rates=None, quality=None, best_lead=None):
+        """
+        Append many points at once.
+
+        Parameters:
+            timestamps (array-like or HRSeries): Epoch timestamps, or a series to append.
+            heart_rates (array-like): HR values (ignored if `timestamps` is a HRSeries).
+            quality (array-like, optional): Quality scores (NaN if None).
+            best_lead (array-like, optional): Best lead numbers (0 if None).
+        """
+        if isinstance(timestamps, HRSeries):
+            quality = timestamps.quality
+            best_lead = timestamps.best_lead
+        ts, hr = as_hr_arrays(timestamps, heart_rates)
+        n = len(ts)
+        if n != len(hr) or any(column is not None and len(column) != n for column in (quality, best_lead)):
+            raise ValueError(f"Timestamp/HR/quality/lead length mismatch ({n} vs {len(hr)})")
+        if n == 0:
+            return
+        self._reserve(n)
+        if self._sorted:
+            if self._size and ts[0] < self._ts[self._size - 1]:
+                self._sorted = False
+            elif n > 1 and np.any(np.diff(ts) < 0):
+                self._sorted = False
+        self._ts[self._size:self._size + n] = ts
+        self._hr[self._size:self._size + n] = hr
+        self._q[self._size:self._size + n] = np.nan if quality is None else quality
+        self._lead[self._size:self._size + n] = 0 if best_lead is None else best_lead
+        self._size += n
+        self._version = next(_version_counter)
+
+    def clear(self):
+        """Remove all points (keeps allocated capacity unless slices still share it)."""
+        if self._shared:
+            self._ts = np.empty(0, dtype=np.float64)
+            self._hr = np.empty(0, dtype=np.float32)
+            self._q = np.empty(0, dtype=np.float32)
+            self._lead = np.empty(0, dtype=np.int16)
+            self._shared = False
+        self._size = 0
+        self._sorted = True
+        self._version = next(_version_counter)
+
+    def copy(self):
+        """Return an independent compact copy."""
+        return HRSeries._wrap(self.timestamps.copy(), self.heart_rates.copy(), self.quality.copy(),
+                              self.best_lead.copy(), self._sorted)
+
+    def sort(self):
+        """Sort points by timestamp in place (stable)."""
+        if self._sorted:
+            return
+        if self._shared:
+            self._move_to(len(self._ts))
+        order = np.argsort(self._ts[:self._size], kind='stable')
+        self._ts[:self._size] = self._ts[:self._size][order]
+        self._hr[:self._size] = self._hr[:self._size][order]
+        self._q[:self._size] = self._q[:self._size][order]
+        self._lead[:self._size] = self._lead[:self._size][order]
+        self._sorted = True
+        self._version = next(_version_counter)
+
+    def merged(self, other):
+        """
+        Return a new time-sorted series containing the points of both series.
+
+        Both inputs are sorted first if needed; points of `self` come before points
+        of `other` with equal timestamps.
+        """
+        a = self if self._sorted else self.copy()
+        b = other if other.is_sorted else other.copy()
+        a.sort()
+        b.sort()
+        a_ts, b_ts = a.timestamps, b.timestamps
+        # Final position of each point = own index + number of points of the other series before it
+        pos_a = np.arange(len(a_ts)) + np.searchsorted(b_ts, a_ts, side='left')
+        pos_b = np.arange(len(b_ts)) + np.searchsorted(a_ts, b_ts, side='right')
+        total = len(a_ts) + len(b_ts)
+        ts = np.empty(total, dtype=np.float64)
+        hr = np.empty(total, dtype=np.float32)
+        q = np.empty(total, dtype=np.float32)
+        lead = np.empty(total, dtype=np.int16)
+        ts[pos_a], hr[pos_a], q[pos_a], lead[pos_a] = a_ts, a.heart_rates, a.quality, a.best_lead
+        ts[pos_b], hr[pos_b], q[pos_b], lead[pos_b] = b_ts, b.heart_rates, b.quality, b.best_lead
+        return HRSeries._wrap(ts, hr, q, lead, True)
+
+    def time_slice(self, start_ts=None, end_ts=None):
+        """
+        Return the points with start_ts <= timestamp <= end_ts.
+
+        On a sorted series this is a binary search plus zero-copy read-only views
+        (copied on the first modification of either series); otherwise a boolean
+        mask (copy) is used. Either way the slice and `self` are independent.
+
+        Returns:
+            HRSeries: Series covering the selected time range.
+        """
+        ts = self.timestamps
+        lo = -np.inf if start_ts is None else start_ts
+        hi = np.inf if end_ts is None else end_ts
+        if self._sorted:
+            i0 = np.searchsorted(ts, lo, side='left')
+            i1 = np.searchsorted(ts, hi, side='right')
+            views = self._ts[i0:i1], self._hr[i0:i1], self._q[i0:i1], self._lead[i0:i1]
+            for view in views:
+                view.flags.writeable = False
+            self._shared = True
+            return HRSeries._wrap(*views, True, shared=True)
+        mask = (ts >= lo) & (ts <= hi)
+        return HRSeries._wrap(ts[mask], self.heart_rates[mask], self.quality[mask], self.best_lead[mask], False)
+
+    def time_range(self):
+        """Return (min_ts, max_ts) or None if empty."""
+        if not self._size:
+            return None
+        ts = self.timestamps
+        if self._sorted:
+            return float(ts[0]), float(ts[-1])
+        return float(ts.min()), float(ts.max())
+
+
+def _rebuild_series(timestamps, heart_rates, quality, best_lead, is_sorted):
+    return HRSeries._wrap(timestamps, heart_rates, quality, best_lead, is_sorted)
+
+
+def as_hr_arrays(timestamps, heart_rates=None):
+    """
+    Return (timestamps, heart_rates) as NumPy arrays.
+
+    A HRSeries is returned as zero-copy views; lists/arrays are converted once.
+    """
+    if isinstance(timestamps, HRSeries):
+        return timestamps.timestamps, timestamps.heart_rates
+    if heart_rates is None:
+        raise ValueError("heart_rates required when timestamps is not a HRSeries")
+    return np.asarray(timestamps, dtype=np.float64), np.asarray(heart_rates)
+
+
+def as_hr_values(heart_rates):
+    """Return HR values as a NumPy array (zero-copy view for a HRSeries)."""
+    if isinstance(heart_rates, HRSeries):
+        return heart_rates.heart_rates
+    return np.asarray(heart_rates)
+
+
+def epoch_to_local_datenum(timestamps):
+    """
+    Convert epoch timestamps to matplotlib date numbers in local time (vectorized).
+
+    Equivalent to ``mdates.date2num([datetime.fromtimestamp(ts) for ts in timestamps])``,
+    but the UTC offset is only looked up once per distinct 15-minute bucket.
+    """
+    ts = np.asarray(timestamps, dtype=np.float64)
+    if ts.size == 0:
+        return ts.copy()
+    buckets, inverse = np.unique(np.floor(ts / 900.0), return_inverse=True)
+    offsets = np.empty(len(buckets), dtype=np.float64)
+    for idx, bucket in enumerate(buckets):
+        bucket_ts = bucket * 900.0
+        local = datetime.fromtimestamp(bucket_ts)
+        offsets[idx] = (local - datetime(1970, 1, 1)).total_seconds() - bucket_ts
+    epoch_num = mdates.date2num(datetime(1970, 1, 1))
+    return epoch_num + (ts + offsets[inverse]) / 86400.0
+
+
+def local_minute_key(record_ts):
+    """Local-time minute key (year, month, day, hour, minute) of an epoch timestamp."""
+    t = datetime.fromtimestamp(record_ts)
+    return t.year, t.month, t.day, t.hour, t.minute
@@ -0,0 +1,364 @@
+import os
+import json
+import logging
+import argparse
+import numpy as np
+
+from data_read import get_ecg_file_list, iter_file_records, read_single_file_lead_data, resolve_sampling_rate
+from data_export import export_to_json
+from dataset_catalog import DatasetCatalog
+from ecg_analysis import ECGStreamFilter, analyze_single_file_hr, iter_minute_hr
+from hr_rollup import DEFAULT_DAY_START_HOUR, DEFAULT_NIGHT_START_HOUR, HRRollup
+from hr_series import HRSeries
+from hr_stats import HRStatsAccumulator
+
+
+logger = logging.getLogger(__name__)
+
+SHARD_VERSION = 3  # 2: rollup tables carry run keys; 3: per-minute R-peaks, best leads, stitched mode
+
+# "per-file": files analyzed independently ('Stitch minutes across files' unchecked);
+# "stitched": one time-ordered record stream over all files (the GUI default)
+SHARD_MODES = ("per-file", "stitched")
+# Records before a stitched shard's range run through the prefilter only, so its state at the
+# range start matches a single-machine run (the IIR transient decays within a few seconds)
+PREFILTER_WARMUP_S = 30.0
+
+# Analysis parameters stored in every shard; shards only merge if they all agree
+SHARD_PARAMS = ("mode", "target_lead", "total_leads", "sampling_rate", "quality_gate", "prefilter",
+                "day_start_hour", "night_start_hour")
+
+
+def select_shard_files(file_paths, shard_index, shard_count):
+    """
+    Contiguous slice of the (sorted) input files handled by one shard.
+
+    Parameters:
+        file_paths (list): All input files of the study, sorted.
+        shard_index (int): This shard (0-based).
+        shard_count (int): Number of shards (machines).
+
+    Returns:
+        list: Input files of the shard.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard_index} of {shard_count}")
+    total = len(file_paths)
+    return file_paths[shard_index * total // shard_count:(shard_index + 1) * total // shard_count]
+
+
+def select_shard_range(time_span, shard_index, shard_count):
+    """
+    Minute-aligned time range [start, end) of one stitched shard.
+
+    The study's time span is cut at minute boundaries into `shard_count` ranges of
+    (nearly) equal length, so no minute is split between shards.
+
+    Parameters:
+        time_span (tuple): (first, last) recordTime of the study (e.g. DatasetCatalog.time_span()).
+        shard_index (int): This shard (0-based).
+        shard_count (int): Number of shards (machines).
+
+    Returns:
+        tuple: (start_ts, end_ts) epoch seconds.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard_index} of {shard_count}")
+    first_minute = int(time_span[0] // 60)
+    n_minutes = int(time_span[1] // 60) - first_minute + 1
+    bounds = [60.0 * (first_minute + k * n_minutes // shard_count) for k in (shard_index, shard_index + 1)]
+    return bounds[0], bounds[1]
+
+
+def _make_prefilter(use_prefilter, sampling_rate):
+    if not use_prefilter:
+        return None
+    try:
+        return ECGStreamFilter(sampling_rate)
+    except ImportError as e:
+        logger.warning(f"Warning: {str(e)}. Detecting on unfiltered samples.")
+        return None
+
+
+def _result_entry(key, minutes, day_start_hour, night_start_hour):
+    """Shard entry of (minute_ts, hr, quality, best_lead, peaks) results."""
+    file_ts, file_hr, file_quality, best_leads, peaks = list(zip(*minutes)) or [()] * 5
+    # Same dtypes as the GUI results (AnalysisJob.publish)
+    file_ts = np.array(file_ts, dtype=np.float64)
+    file_hr = np.array(file_hr, dtype=np.float32)
+    file_quality = np.array(file_quality, dtype=np.float32)
+    rollup = HRRollup(day_start_hour, night_start_hour).update(file_ts, file_hr)
+    entry = dict(key)
+    entry.update({
+        "timestamps": file_ts.tolist(),
+        "heart_rates": file_hr.tolist(),
+        "quality": file_quality.tolist(),
+        "best_leads": [int(lead) for lead in best_leads],
+        "r_peaks": [np.asarray(minute_peaks, dtype=np.int64).tolist() for minute_peaks in peaks],
+        "stats": HRStatsAccumulator.from_values(file_hr).to_state(),
+        "rollup": rollup.to_state()
+    })
+    return entry
+
+
+def _shard_params(mode, target_lead, total_leads, sampling_rate, quality_gate, prefilter, day_start_hour,
+                  night_start_hour):
+    return {"mode": mode, "target_lead": target_lead, "total_leads": total_leads, "sampling_rate": sampling_rate,
+            "quality_gate": quality_gate, "prefilter": prefilter is not None,
+            "day_start_hour": day_start_hour, "night_start_hour": night_start_hour}
+
+
+def build_shard(file_paths, folder_path, target_lead=4, total_leads=9, sampling_rate=250, quality_gate=False,
+                use_prefilter=False, day_start_hour=DEFAULT_DAY_START_HOUR, night_start_hour=DEFAULT_NIGHT_START_HOUR):
+    """
+    Analyze input files into a per-file partial-result shard (plain dict, see write_shard).
+
+    Each file is analyzed on its own, exactly like the GUI per-file mode ("Stitch minutes
+    across files" unchecked), and stored with its minute-wise HR arrays, per-minute
+    quality scores, best leads and R-peak positions (sample indices into the minute's
+    samples, see shard_rr_intervals) and mergeable stats sketches (HRStatsAccumulator
+    and HRRollup state). The prefilter restarts for every file, so a file's result does
+    not depend on which shard analyzed it. See build_stitched_shard for the stitched mode.
+
+    Parameters:
+        file_paths (list): Input files of this shard.
+        folder_path (str): Study folder (file names are stored relative to it).
+        target_lead (int or None): Selected lead number (1-based); None = multi-lead fused detection.
+        total_leads (int): Total number of leads in data.
+        sampling_rate (int): Sampling rate in Hz (binary inputs use the rate of their header).
+        quality_gate (bool): Skip detection for minutes failing the quality check.
+        use_prefilter (bool): Filter the signal before R-peak detection.
+        day_start_hour (int): Rollup day period start (local hour).
+        night_start_hour (int): Rollup night period start (local hour).
+
+    Returns:
+        dict: Shard with "version", "params" and one "files" entry per input file.
+    """
+    sampling_rate = resolve_sampling_rate(file_paths, sampling_rate, target_lead)
+    prefilter = _make_prefilter(use_prefilter, sampling_rate)
+
+    files = []
+    for idx, path in enumerate(file_paths, 1):
+        name = os.path.relpath(path, folder_path)
+        logger.info(f"Processing file {idx}/{len(file_paths)}: {name}")
+        if prefilter is not None:
+            prefilter.reset()
+        if target_lead is None:
+            minutes = list(iter_minute_hr(list(iter_file_records(path, None, total_leads)), sampling_rate,
+                                          quality_gate, prefilter, return_peaks=True))
+        else:
+            signal_segments, timestamps = read_single_file_lead_data(path, target_lead, total_leads)
+            file_ts, file_hr, file_quality, peaks = analyze_single_file_hr(
+                signal_segments, timestamps, sampling_rate, quality_gate, return_quality=True, prefilter=prefilter,
+                return_peaks=True)
+            minutes = list(zip(file_ts, file_hr, file_quality, [0] * len(file_ts), peaks))
+        files.append(_result_entry({"file": name}, minutes, day_start_hour, night_start_hour))
+        logger.info(f"  Extracted {len(minutes)} valid HR points.")
+
+    params = _shard_params("per-file", target_lead, total_leads, sampling_rate, quality_gate, prefilter,
+                           day_start_hour, night_start_hour)
+    return {"version": SHARD_VERSION, "params": params, "files": files}
+
+
+def build_stitched_shard(catalog, start_ts, end_ts, target_lead=4, total_leads=9, sampling_rate=250,
+                         quality_gate=False, use_prefilter=False, day_start_hour=DEFAULT_DAY_START_HOUR,
+                         night_start_hour=DEFAULT_NIGHT_START_HOUR):
+    """
+    Analyze the minutes of one time range of a study into a stitched shard.
+
+    Reproduces the default GUI mode ("Stitch minutes across files"): the records of all
+    files overlapping [start_ts, end_ts) are read as one time-ordered stream (k-way
+    merge through the dataset catalog, duplicates dropped) and analyzed minute by
+    minute, so minutes split across files are stitched back together. Ranges are
+    minute-aligned (select_shard_range), so every minute belongs to exactly one shard.
+    With the prefilter, the PREFILTER_WARMUP_S seconds before the range only update
+    the filter state.
+
+    Parameters:
+        catalog (DatasetCatalog): Refreshed catalog of the study folder.
+        start_ts (float): Range start (epoch seconds, minute-aligned).
+        end_ts (float): Range end (exclusive, minute-aligned).
+        target_lead, total_leads, sampling_rate, quality_gate, use_prefilter, day_start_hour,
+        night_start_hour: As in build_shard.
+
+    Returns:
+        dict: Shard with "version", "params" and one "files" entry holding the range.
+    """
+    paths = catalog.files_in_range(start_ts, end_ts)
+    sampling_rate = resolve_sampling_rate(paths or catalog.files(), sampling_rate, target_lead)
+    prefilter = _make_prefilter(use_prefilter, sampling_rate)
+
+    warmup_ts = start_ts - PREFILTER_WARMUP_S if prefilter is not None else start_ts
+    merge_stats = {}
+    records = catalog.iter_range(warmup_ts, end_ts, target_lead, total_leads, merge_stats=merge_stats)
+
+    def range_records():
+        for record_ts, samples in records:
+            if record_ts < start_ts:
+                prefilter.process(samples, record_ts)
+                continue
+            yield record_ts, samples
+
+    logger.info(f"Analyzing {len(paths)} files overlapping the shard range (minutes stitched across files)")
+    minutes = list(iter_minute_hr(range_records(), sampling_rate, quality_gate, prefilter, return_peaks=True))
+    logger.info(f"  Merged {merge_stats.get('records', 0)} records, extracted {len(minutes)} valid HR points.")
+
+    params = _shard_params("stitched", target_lead, total_leads, sampling_rate, quality_gate, prefilter,
+                           day_start_hour, night_start_hour)
+    entry = _result_entry({"range": [start_ts, end_ts]}, minutes, day_start_hour, night_start_hour)
+    return {"version": SHARD_VERSION, "params": params, "files": [entry]}
+
+
+def write_shard(shard, shard_path):
+    """Write a shard as JSON (floats round-trip exactly)."""
+    with open(shard_path, 'w', encoding='utf-8') as f:
+        json.dump(shard, f, separators=(',', ':'))
+
+
+def read_shard(shard_path):
+    """Read a shard written by write_shard."""
+    with open(shard_path, 'r', encoding='utf-8') as f:
+        shard = json.load(f)
+    if shard.get("version") != SHARD_VERSION:
+        raise ValueError(f"Unsupported shard version in {shard_path}: {shard.get('version')}")
+    return shard
+
+
+def _entry_key(entry):
+    """Sort key of a shard entry: file name (per-file) or range start (stitched)."""
+    return entry["file"] if "file" in entry else entry["range"][0]
+
+
+def merge_shards(shards):
+    """
+    Combine shards into one shard holding all entries in input order (files sorted by name,
+    stitched ranges by start).
+
+    The result does not depend on how files were split or on the order of `shards`.
+    Shards must share the analysis parameters and must not contain the same file (or
+    overlapping ranges) twice.
+
+    Returns:
+        dict: Merged shard.
+    """
+    if not shards:
+        raise ValueError("No shards to merge")
+    params = shards[0]["params"]
+    files = {}
+    for shard in shards:
+        if shard["params"] != params:
+            mismatched = [name for name in SHARD_PARAMS if shard["params"].get(name) != params.get(name)]
+            raise ValueError(f"Shards were analyzed with different parameters: {', '.join(mismatched)}")
+        for entry in shard["files"]:
+            key = _entry_key(entry)
+            if key in files:
+                raise ValueError(f"File {entry.get('file', entry.get('range'))} appears in more than one shard")
+            files[key] = entry
+    entries = [files[key] for key in sorted(files)]
+    for previous, entry in zip(entries, entries[1:]):
+        if "range" in entry and entry["range"][0] < previous["range"][1]:
+            raise ValueError(f"Shard ranges {previous['range']} and {entry['range']} overlap")
+    return {"version": SHARD_VERSION, "params": params, "files": entries}
+
+
+def shard_results(shard):
+    """
+    Combined results of a (merged) shard without re-reading raw ECG.
+
+    HR arrays are concatenated in file order and the per-file sketches merged in the
+    same order, which is how the GUI accumulates results of a single-machine run.
+
+    Returns:
+        tuple: (HRSeries, HRStatsAccumulator, HRRollup)
+    """
+    params = shard["params"]
+    series = HRSeries()
+    stats_acc = HRStatsAccumulator()
+    rollup = HRRollup(params["day_start_hour"], params["night_start_hour"])
+    for entry in shard["files"]:
+        series.extend(entry["timestamps"], entry["heart_rates"], entry["quality"], entry["best_leads"])
+        stats_acc.merge(HRStatsAccumulator.from_state(entry["stats"]))
+        rollup.merge(HRRollup.from_state(entry["rollup"]))
+    return series, stats_acc, rollup
+
+
+def shard_rr_intervals(shard):
+    """
+    RR intervals (seconds) of every minute of a (merged) shard, in the order of shard_results.
+
+    Returns:
+        list: One np.array of RR intervals per minute (from its stored R-peak positions).
+    """
+    sampling_rate = shard["params"]["sampling_rate"]
+    return [np.diff(np.asarray(peaks, dtype=np.int64)) / sampling_rate
+            for entry in shard["files"] for peaks in entry["r_peaks"]]
+
+
+def export_shard_results(shard, export_path):
+    """Export the combined results of a shard like the GUI JSON export (global stats + rollups)."""
+    series, stats_acc, rollup = shard_results(shard)
+    best_leads = series.best_lead if shard["params"]["target_lead"] is None else None
+    return export_to_json(series, hr_stats=stats_acc.to_stats(), export_path=export_path, rollups=rollup.to_dict(),
+                          best_leads=best_leads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partial-result HR shards: analyze a slice of a study, merge shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser(
+        "analyze", help="Analyze one shard of a raw ECG folder",
+        description="Analyze one shard of a raw ECG folder. --mode stitched (the GUI default) splits the study "
+                    "into minute-aligned time ranges and stitches minutes across files; --mode per-file splits "
+                    "the file list and analyzes files one by one, like the GUI with 'Stitch minutes across "
+                    "files' unchecked. Results match a GUI run with the same mode, --prefilter, --quality-gate "
+                    "and detection settings.")
+    analyze.add_argument("folder", help="Folder with raw ECG files")
+    analyze.add_argument("shard_path", help="Output shard file (.json)")
+    analyze.add_argument("--shard-index", type=int, default=0, help="This shard (0-based)")
+    analyze.add_argument("--shard-count", type=int, default=1, help="Number of shards the study is split into")
+    analyze.add_argument("--mode", choices=SHARD_MODES, required=True,
+                         help="Must match 'Stitch minutes across files' of the GUI run (checked = stitched)")
+    analyze.add_argument("--catalog", help="Dataset catalog file of stitched mode (default: in the folder)")
+    analyze.add_argument("--target-lead", type=int, default=4)
+    analyze.add_argument("--multi-lead", action="store_true",
+                         help="Multi-lead fused detection (all leads vote) instead of --target-lead")
+    analyze.add_argument("--total-leads", type=int, default=9)
+    analyze.add_argument("--sampling-rate", type=int, default=250)
+    analyze.add_argument("--quality-gate", action="store_true", help="Skip minutes failing the signal-quality check")
+    analyze.add_argument("--prefilter", choices=("on", "off"), required=True,
+                         help="Filter before R-peak detection (must match 'Filter before detection' of the GUI run)")
+    analyze.add_argument("--day-start-hour", type=int, default=DEFAULT_DAY_START_HOUR)
+    analyze.add_argument("--night-start-hour", type=int, default=DEFAULT_NIGHT_START_HOUR)
+
+    merge = commands.add_parser("merge", help="Merge shards and export the combined results")
+    merge.add_argument("shards", nargs="+", help="Shard files")
+    merge.add_argument("--output", required=True, help="Result JSON (same layout as the GUI export)")
+    merge.add_argument("--shard-output", help="Also write the merged shard (for merging in stages)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.command == "analyze":
+        target_lead = None if args.multi_lead else args.target_lead
+        settings = (target_lead, args.total_leads, args.sampling_rate, args.quality_gate, args.prefilter == "on",
+                    args.day_start_hour, args.night_start_hour)
+        if args.mode == "stitched":
+            catalog = DatasetCatalog.open(args.folder, args.catalog)
+            time_span = catalog.time_span()
+            if time_span is None:
+                parser.error(f"No raw ECG records in {args.folder}")
+            start_ts, end_ts = select_shard_range(time_span, args.shard_index, args.shard_count)
+            logger.info(f"Shard {args.shard_index + 1}/{args.shard_count}: {start_ts:.0f} ~ {end_ts:.0f}")
+            shard = build_stitched_shard(catalog, start_ts, end_ts, *settings)
+        else:
+            shard_files = select_shard_files(get_ecg_file_list(args.folder), args.shard_index, args.shard_count)
+            logger.info(f"Shard {args.shard_index + 1}/{args.shard_count}: {len(shard_files)} files")
+            shard = build_shard(shard_files, args.folder, *settings)
+        write_shard(shard, args.shard_path)
+        logger.info(f"Shard written: {args.shard_path}")
+    else:
+        merged = merge_shards([read_shard(path) for path in args.shards])
+        logger.info(f"Merged {len(args.shards)} shards ({len(merged['files'])} files)")
+        if args.shard_output:
+            write_shard(merged, args.shard_output)
+        export_shard_results(merged, os.path.abspath(args.output))
@@ -0,0 +1,255 @@
+import numpy as np
+
+from hr_series import as_hr_values
+
+
+# Fixed-bin HR histogram used for the median/percentiles (values outside are clamped)
+HIST_MIN_BPM = 0.0
+HIST_MAX_BPM = 300.0
+HIST_BIN_BPM = 0.01
+
+PNN_THRESHOLD_BPM = 5  # pNN50 analogue: successive HR differences > 5 BPM
+
+
+def time_domain_stats(count, mean, var, min_hr, max_hr, median, diff_count, diff_sq_sum, diff_over):
+    """
+    Build the time-domain stats dict from precomputed moments (each computed once).
+
+    Parameters:
+        count (int): Number of HR values.
+        mean (float): Mean HR.
+        var (float): Sample variance (ddof=1).
+        min_hr (float): Minimum HR.
+        max_hr (float): Maximum HR.
+        median (float): Median HR.
+        diff_count (int): Number of successive differences.
+        diff_sq_sum (float): Sum of squared successive differences.
+        diff_over (int): Successive differences with |diff| > PNN_THRESHOLD_BPM.
+
+    Returns:
+        dict: Time-domain stats with English keys (2 decimals), {} if count < 2.
+    """
+    if count < 2:
+        return {}
+    std = np.sqrt(var)
+    rmssd = np.sqrt(diff_sq_sum / diff_count)
+
+    # 核心统计量（全部英文命名）
+    stats = {
+        "mean_hr": mean,  # 均值
+        "median_hr": median,  # 中位数
+        "std_hr": std,  # 标准差 (SDNN 等价)
+        "var_hr": var,  # 方差
+        "min_hr": min_hr,  # 最小值
+        "max_hr": max_hr,  # 最大值
+        "range_hr": max_hr - min_hr,  # 极差
+        "rmssd": rmssd,  # 相邻HR差值均方根
+        "cv_sd": rmssd / mean,  # CVSD (RMSSD/均值)
+        "cv_nn": std / mean,  # CVNN (SDNN/均值)
+        "pnn50": 100 * diff_over / diff_count  # 相邻HR差值>5BPM的占比
+    }
+
+    # 保留2位小数
+    for key in stats:
+        stats[key] = round(float(stats[key]), 2)
+
+    return stats
+
+
+class HRStatsAccumulator:
+    """
+    Single-pass, mergeable HR statistics (O(1) memory in the number of values).
+
+    Keeps Welford mean/M2, running min/max, successive-difference sums (RMSSD,
+    pNN50) and a fixed-bin histogram (HIST_BIN_BPM wide) for the median and
+    percentiles. Accumulators of different files, processes or machines combine
+    with ``merge`` (Chan's parallel update); counts, min/max, histogram and
+    difference counts merge exactly, so raw points never have to be shipped.
+
+    Successive differences follow update order; ``merge(other)`` treats the values
+    of `other` as coming after the values of this accumulator.
+    """
+
+    N_BINS = int(round((HIST_MAX_BPM - HIST_MIN_BPM) / HIST_BIN_BPM))
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.first = None  # First / last value in update order (for diffs across merges)
+        self.last = None
+        self.diff_count = 0
+        self.diff_sq_sum = 0.0
+        self.diff_over = 0
+        self.hist = np.zeros(self.N_BINS, dtype=np.int64)
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"HRStatsAccumulator(count={self.count}, mean={self.mean:.2f})"
+
+    @classmethod
+    def from_values(cls, heart_rates):
+        """Accumulator over an existing HR array / HRSeries."""
+        acc = cls()
+        acc.update_many(heart_rates)
+        return acc
+
+    def _bin_index(self, values):
+        idx = np.floor((np.asarray(values, dtype=np.float64) - HIST_MIN_BPM) / HIST_BIN_BPM)
+        return np.clip(idx, 0, self.N_BINS - 1).astype(np.int64)
+
+    def _add_diff(self, diff):
+        self.diff_count += 1
+        self.diff_sq_sum += diff * diff
+        self.diff_over += abs(diff) > PNN_THRESHOLD_BPM
+
+    def update(self, value):
+        """Add one HR value (O(1))."""
+        value = float(value)
+        if np.isnan(value):
+            return
+        if self.last is not None:
+            self._add_diff(value - self.last)
+        else:
+            self.first = value
+        self.last = value
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.hist[min(max(int((value - HIST_MIN_BPM) // HIST_BIN_BPM), 0), self.N_BINS - 1)] += 1
+
+    def update_many(self, heart_rates):
+        """Add HR values in time order (vectorized; equivalent to repeated update)."""
+        values = as_hr_values(heart_rates).astype(np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return self
+        self._merge_moments(values.size, values.mean(), np.square(values - values.mean()).sum(),
+                            values.min(), values.max())
+
+        diffs = np.diff(values)
+        if self.last is not None:
+            self._add_diff(values[0] - self.last)
+        else:
+            self.first = float(values[0])
+        self.last = float(values[-1])
+        self.diff_count += diffs.size
+        self.diff_sq_sum += float(np.dot(diffs, diffs))
+        self.diff_over += int(np.count_nonzero(np.abs(diffs) > PNN_THRESHOLD_BPM))
+
+        self.hist += np.bincount(self._bin_index(values), minlength=self.N_BINS)
+        return self
+
+    def _merge_moments(self, count, mean, m2, min_hr, max_hr):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, float(min_hr))
+        self.max = max(self.max, float(max_hr))
+
+    def merge(self, other):
+        """
+        Fold another accumulator into this one (other's values follow this one's).
+
+        The difference between this accumulator's last value and `other`'s first value
+        is counted as one successive difference, so accumulators must be merged in
+        time order of their values: merging out of order or across a gap adds a
+        difference that never occurred and changes RMSSD and pNN50. Count, mean,
+        variance, min/max and the histogram (median, percentiles) do not depend on
+        the order.
+
+        Returns:
+            HRStatsAccumulator: self
+        """
+        if not other.count:
+            return self
+        self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        if self.last is not None:
+            self._add_diff(other.first - self.last)
+        else:
+            self.first = other.first
+        self.last = other.last
+        self.diff_count += other.diff_count
+        self.diff_sq_sum += other.diff_sq_sum
+        self.diff_over += other.diff_over
+        self.hist += other.hist
+        return self
+
+    def copy(self):
+        """Independent copy (e.g. to merge without modifying the original)."""
+        acc = HRStatsAccumulator()
+        acc.__dict__.update(self.__dict__)
+        acc.hist = self.hist.copy()
+        return acc
+
+    def to_state(self):
+        """
+        Exact accumulator state as plain JSON types (histogram stored sparsely), e.g. for
+        partial-result shards merged on another machine (see from_state).
+        """
+        bins = np.flatnonzero(self.hist)
+        return {
+            "count": self.count, "mean": self.mean, "m2": self.m2,
+            "min": None if not self.count else self.min, "max": None if not self.count else self.max,
+            "first": self.first, "last": self.last,
+            "diff_count": self.diff_count, "diff_sq_sum": self.diff_sq_sum, "diff_over": int(self.diff_over),
+            "hist_bins": bins.tolist(), "hist_counts": self.hist[bins].tolist()
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Accumulator restored from to_state() output."""
+        acc = cls()
+        acc.count = int(state["count"])
+        acc.mean = float(state["mean"])
+        acc.m2 = float(state["m2"])
+        if acc.count:
+            acc.min = float(state["min"])
+            acc.max = float(state["max"])
+        acc.first = state["first"]
+        acc.last = state["last"]
+        acc.diff_count = int(state["diff_count"])
+        acc.diff_sq_sum = float(state["diff_sq_sum"])
+        acc.diff_over = int(state["diff_over"])
+        acc.hist[np.asarray(state["hist_bins"], dtype=np.int64)] = state["hist_counts"]
+        return acc
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1), NaN if fewer than 2 values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    def percentile(self, q):
+        """
+        Percentile from the histogram (linear interpolation like np.percentile).
+
+        Exact up to HIST_BIN_BPM: order statistics are read as bin centers, clamped
+        to the exact min/max.
+        """
+        if not self.count:
+            return float('nan')
+        position = q / 100.0 * (self.count - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, self.count - 1)
+        cumulative = np.cumsum(self.hist)
+        bins = np.searchsorted(cumulative, [lower, upper], side='right')
+        values = np.clip(HIST_MIN_BPM + (bins + 0.5) * HIST_BIN_BPM, self.min, self.max)
+        return float(values[0] + (position - lower) * (values[1] - values[0]))
+
+    def median(self):
+        return self.percentile(50)
+
+    def to_stats(self):
+        """Time-domain stats dict (same keys as calculate_hr_time_domain_stats)."""
+        return time_domain_stats(self.count, self.mean, self.variance, self.min, self.max, self.median(),
+                                 self.diff_count, self.diff_sq_sum, self.diff_over)
@@ -1,5 +1,13 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from matplotlib.patches import Ellipse
+
+from hr_series import as_hr_values
+
+
+# Above this many (HR(n), HR(n+1)) pairs the Poincare plot is drawn as a 2-D histogram
+POINCARE_DENSITY_THRESHOLD = 20000
 
 
 def plot_hr_histogram(all_heart_rates, save_path=None):
@@ -7,13 +15,14 @@ def plot_hr_histogram(all_heart_rates, save_path=None):
     Plot HR frequency distribution histogram (original logic unchanged).
 
     Parameters:
-        all_heart_rates (list): Combined HR values from all files.
+        all_heart_rates (list/np.array/HRSeries): Combined HR values from all files.
         save_path (str): Path to save plot (None = don't save).
 
     Returns:
         matplotlib.figure.Figure: Generated figure object.
     """
-    if not all_heart_rates:
+    all_heart_rates = as_hr_values(all_heart_rates)
+    if all_heart_rates.size == 0:
         raise ValueError("No valid heart rate data to plot")
 
     fig, ax = plt.subplots(figsize=(10, 4), dpi=100)
@@ -38,33 +47,91 @@ def plot_hr_histogram(all_heart_rates, save_path=None):
     return fig
 
 
-def plot_hr_poincare(all_heart_rates, save_path=None):
+def compute_poincare_sd(all_heart_rates):
+    """
+    Poincare descriptors of successive HR values (vectorized).
+
+    SD1 is the spread perpendicular to the identity line (short-term variability),
+    SD2 the spread along it (long-term variability).
+
+    Parameters:
+        all_heart_rates (list/np.array/HRSeries): HR values in time order.
+
+    Returns:
+        dict: sd1, sd2, sd1_sd2_ratio and the ellipse center (center_x, center_y).
     """
-    Plot HR Poincare scatter plot (HR(n) vs HR(n+1)).
+    hr_array = as_hr_values(all_heart_rates).astype(np.float64)
+    if hr_array.size < 3:
+        raise ValueError("At least 3 HR data points required for Poincare SD1/SD2")
+
+    hr_n, hr_n1 = hr_array[:-1], hr_array[1:]
+    sd1 = np.std(hr_n1 - hr_n, ddof=1) / np.sqrt(2)
+    sd2 = np.std(hr_n1 + hr_n, ddof=1) / np.sqrt(2)
+    return {
+        "sd1": float(sd1),
+        "sd2": float(sd2),
+        "sd1_sd2_ratio": float(sd1 / sd2) if sd2 > 0 else float('nan'),
+        "center_x": float(hr_n.mean()),
+        "center_y": float(hr_n1.mean())
+    }
+
+
+def plot_hr_poincare(all_heart_rates, save_path=None, density=None, bins=200):
+    """
+    Plot HR Poincare plot (HR(n) vs HR(n+1)) with the SD1/SD2 ellipse.
+
+    Above POINCARE_DENSITY_THRESHOLD pairs the points are not scattered one by one:
+    a precomputed 2-D histogram is drawn as a single image (log color scale), so
+    drawing cost no longer grows with the number of points.
 
     Parameters:
-        all_heart_rates (list): Combined HR values from all files.
+        all_heart_rates (list/np.array/HRSeries): Combined HR values from all files.
         save_path (str): Path to save plot (None = don't save).
+        density (bool, optional): Force density (True) or scatter (False) rendering; None = auto.
+        bins (int): Histogram bins per axis in density mode.
 
     Returns:
         matplotlib.figure.Figure: Generated figure object.
     """
-    if len(all_heart_rates) < 2:
+    hr_array = as_hr_values(all_heart_rates)
+    if hr_array.size < 2:
         raise ValueError("At least 2 HR data points required for Poincare plot")
 
-    hr_array = np.array(all_heart_rates)
     hr_n = hr_array[:-1]  # HR(n)
     hr_n1 = hr_array[1:]  # HR(n+1)
+    if density is None:
+        density = hr_n.size > POINCARE_DENSITY_THRESHOLD
 
     fig, ax = plt.subplots(figsize=(8, 8), dpi=100)
-    ax.scatter(hr_n, hr_n1, color='darkgreen', s=10, alpha=0.6, label='HR(n) vs HR(n+1)')
 
-    # Add identity line (HR(n) = HR(n+1))
-    min_hr = min(min(hr_n), min(hr_n1))
-    max_hr = max(max(hr_n), max(hr_n1))
+    # Identity line range (HR(n) and HR(n+1) share all but one value)
+    min_hr = float(hr_array.min())
+    max_hr = float(hr_array.max())
+
+    if density:
+        span = max(max_hr - min_hr, 1.0)
+        edges = np.linspace(min_hr, min_hr + span, bins + 1)
+        counts, _, _ = np.histogram2d(hr_n, hr_n1, bins=(edges, edges))
+        image = ax.imshow(np.ma.masked_equal(counts.T, 0), origin='lower', aspect='auto',
+                          extent=(edges[0], edges[-1], edges[0], edges[-1]),
+                          norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)), cmap='viridis',
+                          interpolation='nearest')
+        fig.colorbar(image, ax=ax, fraction=0.046, pad=0.04, label=f'Pairs per bin ({hr_n.size} total)')
+    else:
+        ax.scatter(hr_n, hr_n1, color='darkgreen', s=10, alpha=0.6, label='HR(n) vs HR(n+1)')
+
     ax.plot([min_hr, max_hr], [min_hr, max_hr], 'r--', linewidth=2, label='Identity Line (HR(n)=HR(n+1))')
 
-    ax.set_title('HR Poincare Scatter Plot', fontsize=12, pad=10)
+    # 【新增：SD1/SD2拟合椭圆】
+    if hr_array.size >= 3:
+        sd = compute_poincare_sd(hr_array)
+        ellipse = Ellipse((sd["center_x"], sd["center_y"]), width=2 * sd["sd2"], height=2 * sd["sd1"],
+                          angle=45, fill=False, edgecolor='orange', linewidth=2,
+                          label=f'SD1={sd["sd1"]:.2f}, SD2={sd["sd2"]:.2f}, '
+                                f'SD1/SD2={sd["sd1_sd2_ratio"]:.2f}')
+        ax.add_patch(ellipse)
+
+    ax.set_title('HR Poincare Density Plot' if density else 'HR Poincare Scatter Plot', fontsize=12, pad=10)
     ax.set_xlabel('HR(n) (BPM)', fontsize=10)
     ax.set_ylabel('HR(n+1) (BPM)', fontsize=10)
     ax.grid(alpha=0.5, linestyle='--')
@@ -76,4 +143,4 @@ def plot_hr_poincare(all_heart_rates, save_path=None):
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
         print(f"HR Poincare plot saved to: {save_path}")
 
-    return fig
\ No newline at end of file
+    return fig
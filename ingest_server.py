@@ -0,0 +1,385 @@
+import json
+import time
+import asyncio
+import logging
+import argparse
+import multiprocessing
+import numpy as np
+
+from data_read import _parse_lead_line, _parse_all_leads_line
+from compressed_io import iter_lines
+from diagnostics import FileDiagnostics
+from ecg_analysis import MinuteHRStream
+from hr_series import HRSeries
+from hr_stats import HRStatsAccumulator
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LINE_LIMIT = 1 << 23  # Max bytes of one JSON line (a 9-lead record is ~40 KB)
+COMMAND_MAX_BYTES = 1024  # Lines shorter than this may be hello/command messages
+
+
+class DeviceState:
+    """
+    Per-device analysis state: bounded record queue, streaming minute HR and stats.
+
+    Parameters:
+        device_id (str): Device identifier.
+        sampling_rate (int): Sampling rate in Hz.
+        quality_gate (bool): Skip detection for minutes failing the quality check.
+        queue_size (int): Records buffered before the device's connection stops being read.
+    """
+
+    def __init__(self, device_id, sampling_rate=250, quality_gate=False, queue_size=256):
+        self.device_id = device_id
+        self.queue = asyncio.Queue(queue_size)
+        self.stream = MinuteHRStream(sampling_rate, quality_gate)
+        self.series = HRSeries()
+        self.stats = HRStatsAccumulator()
+        self.diagnostics = FileDiagnostics(f"device {device_id}")
+        self.records = 0
+        self.last_record_ts = None
+        self.worker = None
+
+    def add_results(self, results):
+        for minute_ts, minute_hr, minute_quality, best_lead in results:
+            self.series.append(minute_ts, minute_hr, minute_quality, best_lead)
+            self.stats.update(minute_hr)
+
+    def summary(self):
+        """JSON-serializable status of the device."""
+        latest = None
+        if self.series:
+            latest = {
+                "timestamp": float(self.series.timestamps[-1]),
+                "heart_rate": round(float(self.series.heart_rates[-1]), 2),
+                "quality": None if np.isnan(self.series.quality[-1]) else round(float(self.series.quality[-1]), 3)
+            }
+        return {
+            "records": self.records,
+            "rejected_records": self.diagnostics.total,
+            "late_records": self.stream.late_records,
+            "queued_records": self.queue.qsize(),
+            "last_record_ts": self.last_record_ts,
+            "minutes": len(self.series),
+            "latest": latest,
+            "stats": self.stats.to_stats()
+        }
+
+
+class HRIngestServer:
+    """
+    Asyncio TCP server ingesting JSON-lines ECG records from many devices.
+
+    Protocol (one JSON object per line):
+
+    - ``{"deviceId": "bed-01"}``: names the device of the connection (default: peer address);
+    - records in the raw file format (``recordTime`` / ``data.waveDataList``), analyzed
+      with the same minute-wise streaming HR as the file path (MinuteHRStream);
+    - ``{"cmd": "status"}`` (optionally with ``deviceId``): answered with one JSON line
+      holding the latest HR and time-domain stats per device.
+
+    Each device has a bounded queue drained by its own task. A full queue suspends
+    reading from the connection, so TCP flow control pushes back on the sender
+    instead of memory growing.
+
+    Parameters:
+        host (str): Listen address (localhost by default).
+        port (int): Listen port (0 = any free port).
+        target_lead (int or None): Lead analyzed (1-based); None = multi-lead fused detection.
+        total_leads (int): Total number of leads in records.
+        sampling_rate (int): Sampling rate in Hz.
+        quality_gate (bool): Skip detection for minutes failing the quality check.
+        queue_size (int): Per-device record queue size.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, target_lead=4, total_leads=9, sampling_rate=250,
+                 quality_gate=False, queue_size=256):
+        if target_lead is not None and not (1 <= target_lead <= total_leads):
+            raise ValueError(f"Lead {target_lead} out of range (1-{total_leads})")
+        self.host = host
+        self.port = port
+        self.target_lead = target_lead
+        self.total_leads = total_leads
+        self.sampling_rate = sampling_rate
+        self.quality_gate = quality_gate
+        self.queue_size = queue_size
+        self.devices = {}
+        self._server = None
+
+    async def start(self):
+        """Start listening (the bound port is stored in ``port``)."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=LINE_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"HR ingest server listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """Serve until cancelled (Ctrl-C under asyncio.run); open minutes are flushed on the way out."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Stop accepting, finish queued records and flush every device's open minute."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for state in self.devices.values():
+            await state.queue.join()
+            state.worker.cancel()
+            state.add_results(state.stream.flush())
+            state.diagnostics.emit(logger)
+
+    async def drain(self):
+        """Wait until all queued records have been analyzed."""
+        for state in list(self.devices.values()):
+            await state.queue.join()
+
+    def status(self, device_id=None):
+        """Status of one device, or {device_id: status} of all devices."""
+        if device_id is not None:
+            state = self.devices.get(device_id)
+            return state.summary() if state is not None else None
+        return {device_id: state.summary() for device_id, state in self.devices.items()}
+
+    def _device(self, device_id):
+        state = self.devices.get(device_id)
+        if state is None:
+            state = DeviceState(device_id, self.sampling_rate, self.quality_gate, self.queue_size)
+            state.worker = asyncio.get_running_loop().create_task(self._device_worker(state))
+            self.devices[device_id] = state
+            logger.info(f"Device connected: {device_id}")
+        return state
+
+    def _parse_record(self, line):
+        if self.target_lead is None:
+            return _parse_all_leads_line(line, self.total_leads)
+        record_ts, signal_values = _parse_lead_line(line, self.target_lead - 1)
+        return record_ts, np.asarray(signal_values, dtype=np.float64)
+
+    async def _device_worker(self, state):
+        while True:
+            line = await state.queue.get()
+            try:
+                record_ts, samples = self._parse_record(line)
+                state.records += 1
+                state.last_record_ts = record_ts
+                state.add_results(state.stream.feed(record_ts, samples))
+            except Exception as e:
+                state.diagnostics.warn(type(e).__name__, repr(e))
+            finally:
+                state.queue.task_done()
+            # Records are CPU work on the loop: yield so other devices and connections progress
+            await asyncio.sleep(0)
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        device_id = f"{peer[0]}:{peer[1]}" if peer else "unknown"
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError) as e:
+                    logger.warning(f"Device {device_id}: line too long, closing connection ({e})")
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if len(line) < COMMAND_MAX_BYTES:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        message = None
+                    if isinstance(message, dict) and "cmd" in message:
+                        await self._answer(writer, message)
+                        continue
+                    if isinstance(message, dict) and "deviceId" in message and "recordTime" not in message:
+                        device_id = str(message["deviceId"])
+                        continue
+                # Backpressure: waits while the device's queue is full
+                await self._device(device_id).queue.put(line)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, writer, message):
+        if message["cmd"] == "status":
+            reply = {"devices": self.status()} if "deviceId" not in message else \
+                {"device": self.status(str(message["deviceId"]))}
+        else:
+            reply = {"error": f"unknown command: {message['cmd']}"}
+        writer.write((json.dumps(reply) + "\n").encode('utf-8'))
+        await writer.drain()
+
+
+async def send_records(lines, host=DEFAULT_HOST, port=DEFAULT_PORT, device_id=None, realtime=False):
+    """
+    Stand-in device client: send record lines (bytes or str) to an ingest server.
+
+    Parameters:
+        lines (iterable): JSON record lines.
+        device_id (str, optional): Sent as the connection's hello line.
+        realtime (bool): Pace records by their recordTime instead of sending as fast as possible.
+
+    Returns:
+        int: Number of records sent.
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    if device_id is not None:
+        writer.write((json.dumps({"deviceId": device_id}) + "\n").encode('utf-8'))
+    sent = 0
+    last_ts = None
+    for line in lines:
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+        if realtime:
+            record_ts = json.loads(line).get("recordTime")
+            if last_ts is not None and record_ts is not None and record_ts > last_ts:
+                await asyncio.sleep(record_ts - last_ts)
+            last_ts = record_ts
+        writer.write(line if line.endswith(b"\n") else line + b"\n")
+        await writer.drain()
+        sent += 1
+    writer.close()
+    await writer.wait_closed()
+    return sent
+
+
+async def query_status(host=DEFAULT_HOST, port=DEFAULT_PORT, device_id=None):
+    """Ask a running server for its status (all devices or one)."""
+    reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    command = {"cmd": "status"} if device_id is None else {"cmd": "status", "deviceId": device_id}
+    writer.write((json.dumps(command) + "\n").encode('utf-8'))
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return reply
+
+
+def synthetic_record_lines(start_ts, seconds, sampling_rate=250, total_leads=9, heart_rate=72, seed=0):
+    """One-second JSON record lines of a synthetic ECG-like signal (benchmark input)."""
+    rng = np.random.default_rng(seed)
+    period = sampling_rate * 60.0 / heart_rate
+    lines = []
+    for second in range(seconds):
+        n = np.arange(sampling_rate) + second * sampling_rate
+        signal = 1000 * np.exp(-((n % period) - 10) ** 2 / 8.0) + rng.normal(0, 20, sampling_rate)
+        wave = [{"sample": int(v)} for v in signal]
+        record = {"recordTime": start_ts + second,
+                  "data": {"waveDataList": [{"waveDataVoList": wave} for _ in range(total_leads)]}}
+        lines.append((json.dumps(record) + "\n").encode('utf-8'))
+    return lines
+
+
+def _run_bench_clients(port, n_devices, seconds, sampling_rate, total_leads):
+    """Client side of benchmark_ingest (separate process): n_devices concurrent senders."""
+    lines = synthetic_record_lines(1700000000, seconds, sampling_rate, total_leads)
+
+    async def run():
+        await asyncio.gather(*(send_records(lines, port=port, device_id=f"bench-{idx}")
+                               for idx in range(n_devices)))
+
+    asyncio.run(run())
+
+
+def benchmark_ingest(n_devices=20, seconds=300, target_lead=4, total_leads=9, sampling_rate=250, queue_size=64):
+    """
+    Measure sustained ingest throughput: n_devices stand-in clients send `seconds` of
+    records each, as fast as the server accepts them.
+
+    The clients run in a separate (spawned) process, so their JSON encoding and socket
+    writes do not count against the server. Timing starts with the first received
+    record and ends when every record has been analyzed. A real device produces one
+    record per second, so records per CPU second of the server process is the number
+    of devices one core sustains in real time (``devices_per_core``); ``records_per_s``
+    is the wall-clock rate, which also includes time the server waited for clients.
+
+    Returns:
+        dict: records, elapsed_s, server_cpu_s, records_per_s, devices_per_core and minutes_analyzed.
+    """
+    records = n_devices * seconds
+
+    async def run():
+        server = HRIngestServer(port=0, target_lead=target_lead, total_leads=total_leads,
+                                sampling_rate=sampling_rate, queue_size=queue_size)
+        await server.start()
+        clients = multiprocessing.get_context('spawn').Process(
+            target=_run_bench_clients, args=(server.port, n_devices, seconds, sampling_rate, total_leads),
+            daemon=True)
+        clients.start()
+
+        def processed():
+            return sum(state.records + state.diagnostics.total for state in server.devices.values())
+
+        def check_clients():
+            if clients.exitcode not in (None, 0):
+                raise RuntimeError(f"Benchmark clients failed (exit code {clients.exitcode})")
+
+        while not server.devices:
+            check_clients()
+            await asyncio.sleep(0.005)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        while processed() < records:
+            check_clients()
+            await asyncio.sleep(0.005)
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        await server.stop()
+        await asyncio.get_running_loop().run_in_executor(None, clients.join)
+        minutes = sum(len(state.series) for state in server.devices.values())
+        return elapsed, cpu, minutes
+
+    elapsed, cpu, minutes = asyncio.run(run())
+    return {"records": records, "elapsed_s": elapsed, "server_cpu_s": cpu, "records_per_s": records / elapsed,
+            "devices_per_core": records / cpu if cpu else float('inf'), "minutes_analyzed": minutes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live ECG ingest server (JSON-lines records over TCP)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the ingest server")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--target-lead", type=int, default=4, help="0 = multi-lead fused detection")
+    serve.add_argument("--total-leads", type=int, default=9)
+    serve.add_argument("--sampling-rate", type=int, default=250)
+    serve.add_argument("--quality-gate", action="store_true", help="Skip minutes failing the signal-quality check")
+    replay = sub.add_parser("replay", help="Send a raw ECG file to a running server (stand-in device)")
+    replay.add_argument("file")
+    replay.add_argument("--device", default=None)
+    replay.add_argument("--host", default=DEFAULT_HOST)
+    replay.add_argument("--port", type=int, default=DEFAULT_PORT)
+    replay.add_argument("--realtime", action="store_true")
+    status = sub.add_parser("status", help="Query a running server")
+    status.add_argument("--device", default=None)
+    status.add_argument("--host", default=DEFAULT_HOST)
+    status.add_argument("--port", type=int, default=DEFAULT_PORT)
+    bench = sub.add_parser("bench", help="Benchmark sustained devices per core")
+    bench.add_argument("--devices", type=int, default=20)
+    bench.add_argument("--seconds", type=int, default=300)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.command == "serve":
+        server = HRIngestServer(args.host, args.port, args.target_lead or None, args.total_leads, args.sampling_rate,
+                                args.quality_gate)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            # serve_forever has flushed every device's open minute; report the final results
+            logger.info("Ingest server stopped")
+            print(json.dumps({"devices": server.status()}, indent=2))
+    elif args.command == "replay":
+        count = asyncio.run(send_records(iter_lines(args.file), args.host, args.port, args.device, args.realtime))
+        logger.info(f"Sent {count} records")
+    elif args.command == "status":
+        print(json.dumps(asyncio.run(query_status(args.host, args.port, args.device)), indent=2))
+    else:
+        print(json.dumps(benchmark_ingest(args.devices, args.seconds), indent=2))
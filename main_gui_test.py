@@ -1,93 +1,52 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, simpledialog
 import threading
+import queue
+import logging
+import logging.handlers
+from collections import Counter
 import os
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from datetime import datetime
-import numpy as np
 import time
-import pandas as pd
-import matplotlib.dates as mdates
 
 # Import custom modules#
+from compressed_io import MAX_DECODE_THREADS
 from data_read import (
-    get_ecg_file_list, read_single_file_lead_data,
-    get_hr_json_file_list, read_hr_json_file
+    get_ecg_file_list, read_single_file_lead_data, iter_file_records, iter_merged_records,
+    get_hr_json_file_list, read_hr_json_file, resolve_sampling_rate
 )
 from ecg_analysis import (
-    analyze_single_file_hr, plot_hr_time_line,
+    analyze_single_file_hr, iter_minute_hr, ECGStreamFilter, plot_hr_time_line,
     create_plot_window, calculate_hr_time_domain_stats
 )
 from hrv_analysis import plot_hr_histogram, plot_hr_poincare
 from data_export import export_to_json
-
-
-# 【修改：扩展散点图函数，支持事件标注】
-def plot_combined_hr(all_timestamps, all_heart_rates, event_data=None, event_styles=None, save_path=None):
-    """Plot HR vs Time scatter plot with event annotations (vertical lines + markers)."""
-    if not all_timestamps or not all_heart_rates:
-        raise ValueError("No valid heart rate data to plot")
-
-    times = [datetime.fromtimestamp(ts) for ts in all_timestamps]
-    fig, ax = plt.subplots(figsize=(12, 4), dpi=100)
-
-    # 1. 绘制心率散点
-    ax.scatter(times, all_heart_rates, color='crimson', s=15, alpha=0.4, label='Minute Avg HR')
-    global_avg = np.mean(all_heart_rates)
-    ax.axhline(y=global_avg, color='navy', linestyle='--', linewidth=2, label=f'Global Avg: {global_avg:.1f} BPM')
-
-    # 2. 绘制事件垂直线+标记（不同事件对应不同样式）
-    if event_data and event_styles:
-        for event in event_data:
-            event_ts = event['event_ts']
-            event_type = event['event_type']
-            # 获取当前事件的样式（默认黑色样式）
-            style = event_styles.get(event_type, {
-                'color': 'black', 'linestyle': '-', 'marker': 'x'
-            })
-            # 转换事件时间为matplotlib可识别的格式
-            event_time = datetime.fromtimestamp(event_ts)
-            # 绘制垂直线
-            ax.axvline(
-                x=event_time,
-                color=style['color'],
-                linestyle=style['linestyle'],
-                linewidth=1.5,
-                alpha=0.8
-            )
-            # 绘制事件标记（在图的顶部区域）
-            y_max = ax.get_ylim()[1] * 0.95  # 避免超出坐标轴
-            ax.scatter(
-                event_time, y_max,
-                color=style['color'],
-                marker=style['marker'],
-                s=50,
-                label=f'Event {event_type}' if f'Event {event_type}' not in ax.get_legend_handles_labels()[1] else ""
-            )
-
-    # 图表配置
-    ax.set_title('Heart Rate vs Time (Scatter Plot with Events)', fontsize=12, pad=10)
-    ax.set_xlabel('Time', fontsize=10)
-    ax.set_ylabel('Heart Rate (BPM)', fontsize=10)
-    ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    plt.xticks(rotation=45, ha='right')
-    ax.grid(alpha=0.5, linestyle='--')
-    # 去重图例
-    handles, labels = ax.get_legend_handles_labels()
-    unique_legend = dict(zip(labels, handles))
-    ax.legend(unique_legend.values(), unique_legend.keys(), fontsize=10)
-    plt.tight_layout()
-
-    if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        print(f"HR Scatter plot saved to: {save_path}")
-
-    return fig
+from analysis_job import AnalysisJob, AnalysisCancelled, FileResult, JobFinished
+from hr_series import HRSeries
+from hr_stats import HRStatsAccumulator
+from waveform_viewer import WaveformViewer
+from plot_export import FigureCache, export_all_plots
+from prefetch import PrefetchReader, estimate_loaded_bytes
+from dataset_catalog import DatasetCatalog
+from hr_rollup import ROLLUP_LEVELS, HRRollup
+from hr_scatter_view import HRScatterView
+from event_index import DEFAULT_EVENT_TYPES, EVENT_FILE_TYPES, load_event_file, event_styles_for
 
 
 class ECGHeartRateGUI(tk.Tk):
+    LOG_DRAIN_INTERVAL_MS = 100  # Log queue polling interval
+    LOG_BATCH_SIZE = 500  # Max messages written per drain
+    LOG_MAX_LINES = 5000  # Oldest log lines are trimmed beyond this
+    RESULT_POLL_INTERVAL_MS = 200  # Job result queue polling interval
+    PLOT_REFRESH_INTERVAL_S = 1.0  # Min interval between progressive scatter redraws
+    MERGED_BATCH_MINUTES = 60  # Minutes per published batch when stitching across files
+    PREFETCH_DEPTH = 2  # Default files read ahead of the one being analyzed (per-file mode)
+    PREFETCH_MEMORY_MB = 512  # Default cap on parsed (in-memory) MB held by the prefetch / read-ahead stage
+    DAY_START_HOUR = 8  # Rollup day period: [DAY_START_HOUR, NIGHT_START_HOUR), night: the rest
+    NIGHT_START_HOUR = 22
+
     def __init__(self):
         super().__init__()
         self.title("ECG Heart Rate Analyzer (HRV + Event Annotation)")
@@ -100,24 +59,46 @@ class ECGHeartRateGUI(tk.Tk):
         self.sampling_rate = tk.IntVar(value=250)
         self.target_lead = tk.IntVar(value=4)
         self.input_type = tk.StringVar(value="raw_ecg")
+        self.merge_files = tk.BooleanVar(value=True)  # Stitch minutes / drop duplicates across files
+        self.use_prefilter = tk.BooleanVar(value=True)  # High-pass/notch/band-pass before detection
+        self.quality_gate = tk.BooleanVar(value=False)  # Skip minutes failing the signal-quality check
+        self.prefetch_depth = tk.IntVar(value=self.PREFETCH_DEPTH)  # Files read ahead (per-file mode)
+        self.prefetch_memory_mb = tk.IntVar(value=self.PREFETCH_MEMORY_MB)  # Read-ahead memory cap (both modes)
+        self.detection_mode = tk.StringVar(value="Single lead")  # Or "Multi-lead fused" (all leads vote)
+        self.range_start = tk.StringVar()  # Optional analysis time range (blank = whole folder)
+        self.range_end = tk.StringVar()
         self.is_analyzing = False
-        self.is_paused = tk.BooleanVar(value=False)
-        self.event_data = None  # 新增：存储事件数据（{event_ts:时间戳, event_type:事件类型}）
-        # 新增：事件样式配置（不同事件对应不同颜色、线样式、标记）
-        self.event_styles = {
-            'A': {'color': 'red', 'linestyle': '--', 'marker': 'o'},
-            'B': {'color': 'blue', 'linestyle': '-.', 'marker': 's'},
-            'C': {'color': 'green', 'linestyle': '-', 'marker': '^'}
-        }
+        self.job = None  # AnalysisJob of the running analysis (pause/resume/cancel + results)
+        self._last_plot_refresh = 0.0
+        self.event_data = None  # 新增：存储事件数据（EventIndex：按类型分组的有序时间戳）
+        # 新增：事件样式配置（不同事件对应不同颜色、线样式、标记；其他类型自动分配）
+        self.event_styles = event_styles_for(DEFAULT_EVENT_TYPES)
+        self.event_types = ",".join(DEFAULT_EVENT_TYPES)  # Event types kept on import (empty = all)
 
         # Store analysis results
-        self.combined_timestamps = []  # 存储timestamp（数值型）
-        self.combined_heart_rates = []
+        self.hr_series = HRSeries()  # 存储timestamp（数值型）+ HR（紧凑数组）
+        self.analysis_params = None  # Raw ECG parameters of the last analysis (for the waveform viewer)
+        self.hr_stats_acc = HRStatsAccumulator()  # Global stats updated as results stream in
+        self.hr_rollup = HRRollup(self.DAY_START_HOUR, self.NIGHT_START_HOUR)  # Hour/day/day-night stats cube
+        self.figure_cache = FigureCache()  # Line/histogram/Poincare figures of the current data version
+        self.scatter_view = None  # Main scatter plot (persistent artists, created on first display)
+        self.scatter_canvas = None
+        self.scatter_toolbar = None
         self.hr_global_stats = {}  # 全局统计量
         self.hr_range_stats = {}  # 时间段统计量
 
+        # Log messages (GUI + logging records from worker modules) are queued and
+        # drained in batches on a timer instead of one Tk callback per message
+        self.log_queue = queue.Queue()
+        self.log_handler = logging.handlers.QueueHandler(self.log_queue)
+        root_logger = logging.getLogger()
+        root_logger.addHandler(self.log_handler)
+        root_logger.setLevel(logging.INFO)
+
         # Create UI widgets
         self.create_widgets()
+        self.after(self.LOG_DRAIN_INTERVAL_MS, self._drain_log_queue)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def create_widgets(self):
         # 1. Top control frame
@@ -138,6 +119,14 @@ class ECGHeartRateGUI(tk.Tk):
         ttk.Radiobutton(input_frame, text="HR JSON Files (.json)", variable=self.input_type,
                         value="hr_json", command=self.update_param_visibility).grid(row=0, column=1, padx=5)
 
+        # Read-ahead settings (raw ECG and HR JSON inputs)
+        prefetch_frame = ttk.LabelFrame(control_frame, text="Read-Ahead", padding="5")
+        prefetch_frame.grid(row=0, column=4, padx=10, pady=5, sticky='w')
+        ttk.Label(prefetch_frame, text="Files:").grid(row=0, column=0, padx=5)
+        ttk.Entry(prefetch_frame, textvariable=self.prefetch_depth, width=5).grid(row=0, column=1, padx=5)
+        ttk.Label(prefetch_frame, text="Memory (MB):").grid(row=0, column=2, padx=5)
+        ttk.Entry(prefetch_frame, textvariable=self.prefetch_memory_mb, width=7).grid(row=0, column=3, padx=5)
+
         # Parameters frame (English labels)
         self.param_frame = ttk.LabelFrame(control_frame, text="ECG Parameters", padding="10")
         self.param_frame.grid(row=1, column=0, columnspan=4, padx=5, pady=5, sticky='ew')
@@ -155,6 +144,34 @@ class ECGHeartRateGUI(tk.Tk):
         self.sampling_rate_entry = ttk.Entry(self.param_frame, textvariable=self.sampling_rate, width=10)
         self.sampling_rate_entry.grid(row=0, column=5, padx=5, pady=5)
 
+        self.merge_files_check = ttk.Checkbutton(self.param_frame, text="Stitch minutes across files",
+                                                 variable=self.merge_files)
+        self.merge_files_check.grid(row=0, column=6, padx=10, pady=5, sticky='w')
+
+        self.prefilter_check = ttk.Checkbutton(self.param_frame, text="Filter before detection",
+                                               variable=self.use_prefilter)
+        self.prefilter_check.grid(row=0, column=7, padx=10, pady=5, sticky='w')
+
+        self.quality_gate_check = ttk.Checkbutton(self.param_frame, text="Skip low-quality minutes",
+                                                  variable=self.quality_gate)
+        self.quality_gate_check.grid(row=0, column=10, padx=10, pady=5, sticky='w')
+
+        ttk.Label(self.param_frame, text="Detection:").grid(row=0, column=8, padx=10, pady=5, sticky='w')
+        self.detection_combobox = ttk.Combobox(self.param_frame, textvariable=self.detection_mode,
+                                               values=["Single lead", "Multi-lead fused"], state='readonly',
+                                               width=16)
+        self.detection_combobox.grid(row=0, column=9, padx=5, pady=5)
+
+        # 【新增：分析时间范围（通过数据目录索引只读取重叠的文件）】
+        ttk.Label(self.param_frame, text="Range Start:").grid(row=1, column=0, padx=10, pady=5, sticky='w')
+        self.range_start_entry = ttk.Entry(self.param_frame, textvariable=self.range_start, width=20)
+        self.range_start_entry.grid(row=1, column=1, columnspan=2, padx=5, pady=5, sticky='w')
+        ttk.Label(self.param_frame, text="Range End:").grid(row=1, column=3, padx=10, pady=5, sticky='w')
+        self.range_end_entry = ttk.Entry(self.param_frame, textvariable=self.range_end, width=20)
+        self.range_end_entry.grid(row=1, column=4, columnspan=2, padx=5, pady=5, sticky='w')
+        ttk.Label(self.param_frame, text="(YYYY-MM-DD HH:MM:SS, blank = all data)").grid(
+            row=1, column=6, columnspan=4, padx=10, pady=5, sticky='w')
+
         # Operation buttons (新增：事件Excel导入按钮)
         btn_frame = ttk.Frame(control_frame)
         btn_frame.grid(row=2, column=0, columnspan=5, padx=5, pady=10, sticky='w')
@@ -165,32 +182,43 @@ class ECGHeartRateGUI(tk.Tk):
         self.pause_btn = ttk.Button(btn_frame, text="Pause", command=self.toggle_pause, state='disabled')
         self.pause_btn.grid(row=0, column=1, padx=5)
 
+        self.cancel_btn = ttk.Button(btn_frame, text="Cancel", command=self.cancel_analysis, state='disabled')
+        self.cancel_btn.grid(row=0, column=2, padx=5)
+
         self.clear_btn = ttk.Button(btn_frame, text="Clear Results", command=self.clear_results)
-        self.clear_btn.grid(row=0, column=2, padx=5)
+        self.clear_btn.grid(row=0, column=3, padx=5)
 
         self.range_stats_btn = ttk.Button(btn_frame, text="Calculate Time-Range Stats",
                                           command=self.open_time_range_dialog, state='disabled')
-        self.range_stats_btn.grid(row=0, column=3, padx=5)
+        self.range_stats_btn.grid(row=0, column=4, padx=5)
 
         self.export_btn = ttk.Button(btn_frame, text="Export JSON", command=self.export_data, state='disabled')
-        self.export_btn.grid(row=0, column=4, padx=5)
+        self.export_btn.grid(row=0, column=5, padx=5)
+
+        self.export_plots_btn = ttk.Button(btn_frame, text="Export All Plots", command=self.export_all_plots,
+                                           state='disabled')
+        self.export_plots_btn.grid(row=0, column=6, padx=5)
 
         self.line_plot_btn = ttk.Button(btn_frame, text="Show HR Line Plot", command=self.show_hr_line_plot,
                                         state='disabled')
-        self.line_plot_btn.grid(row=0, column=5, padx=5)
+        self.line_plot_btn.grid(row=0, column=7, padx=5)
 
         self.hist_plot_btn = ttk.Button(btn_frame, text="Show HR Histogram", command=self.show_hr_histogram,
                                         state='disabled')
-        self.hist_plot_btn.grid(row=0, column=6, padx=5)
+        self.hist_plot_btn.grid(row=0, column=8, padx=5)
 
         self.poincare_btn = ttk.Button(btn_frame, text="Show Poincare Plot", command=self.show_poincare_plot,
                                        state='disabled')
-        self.poincare_btn.grid(row=0, column=7, padx=5)
+        self.poincare_btn.grid(row=0, column=9, padx=5)
 
         # 新增：事件Excel导入按钮（初始禁用，分析完成后启用）
-        self.import_event_btn = ttk.Button(btn_frame, text="Import Event Excel",
+        self.import_event_btn = ttk.Button(btn_frame, text="Import Events",
                                            command=self.browse_event_excel, state='disabled')
-        self.import_event_btn.grid(row=0, column=8, padx=5)
+        self.import_event_btn.grid(row=0, column=10, padx=5)
+
+        self.rollup_btn = ttk.Button(btn_frame, text="Rollup Table", command=self.show_rollup_table,
+                                     state='disabled')
+        self.rollup_btn.grid(row=0, column=11, padx=5)
 
         # 2. Content frame (log + stats + main plot)
         content_frame = ttk.Frame(self, padding="10")
@@ -256,10 +284,22 @@ class ECGHeartRateGUI(tk.Tk):
             self.total_leads_entry.config(state='normal')
             self.lead_combobox.config(state='readonly')
             self.sampling_rate_entry.config(state='normal')
+            self.merge_files_check.config(state='normal')
+            self.prefilter_check.config(state='normal')
+            self.quality_gate_check.config(state='normal')
+            self.detection_combobox.config(state='readonly')
+            self.range_start_entry.config(state='normal')
+            self.range_end_entry.config(state='normal')
         else:
             self.total_leads_entry.config(state='disabled')
             self.lead_combobox.config(state='disabled')
             self.sampling_rate_entry.config(state='disabled')
+            self.merge_files_check.config(state='disabled')
+            self.prefilter_check.config(state='disabled')
+            self.quality_gate_check.config(state='disabled')
+            self.detection_combobox.config(state='disabled')
+            self.range_start_entry.config(state='disabled')
+            self.range_end_entry.config(state='disabled')
 
     def update_lead_options(self):
         """Update lead combobox options based on total leads."""
@@ -281,65 +321,83 @@ class ECGHeartRateGUI(tk.Tk):
 
     # 新增：导入事件Excel文件
     def browse_event_excel(self):
-        """Open dialog to select event Excel file (col A: time, col B: event type)."""
+        """Open dialog to select an event file (xlsx/xls/csv/parquet; col A: time, col B: event type)."""
         file_path = filedialog.askopenfilename(
-            title="Select Event Excel File",
-            filetypes=[("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*")]
+            title="Select Event File",
+            filetypes=[("Event Files", " ".join(f"*{ext}" for ext in EVENT_FILE_TYPES)),
+                       ("Excel Files", "*.xlsx *.xls"), ("CSV Files", "*.csv"), ("Parquet Files", "*.parquet"),
+                       ("All Files", "*.*")]
         )
         if not file_path:
             return
 
+        types_text = simpledialog.askstring("Event Types", "Event types to import (comma separated, empty = all):",
+                                            initialvalue=self.event_types, parent=self)
+        if types_text is None:
+            return
+        self.event_types = types_text
+        event_types = [t.strip() for t in types_text.split(",") if t.strip()] or None
+
         try:
-            # 读取Excel（仅取A、B列，重命名为event_time/event_type）
-            df = pd.read_excel(file_path, usecols=[0, 1], names=['event_time', 'event_type'])
-
-            # 解析时间列（转换为timestamp）
-            df['event_time'] = pd.to_datetime(df['event_time'], errors='coerce')  # 无效时间会转为NaT
-            df = df.dropna(subset=['event_time'])  # 过滤无效时间
-            df['event_ts'] = df['event_time'].apply(lambda x: x.timestamp())  # 转为时间戳
-
-            # 过滤仅包含A/B/C的事件
-            valid_events = df[df['event_type'].isin(['A', 'B', 'C'])].reset_index(drop=True)
-            if valid_events.empty:
-                self.log("Warning: No valid events (A/B/C) found in the Excel file.")
+            self.event_data = load_event_file(file_path, event_types)
+            if not self.event_data:
+                self.event_data = None
+                self.log(f"Warning: No valid events ({types_text or 'any type'}) found in the event file.")
                 return
-
-            # 存储事件数据（列表字典格式）
-            self.event_data = valid_events[['event_ts', 'event_type']].to_dict('records')
-            self.log(f"Successfully imported {len(self.event_data)} events (A/B/C) from Excel.")
+            self.event_styles = event_styles_for(self.event_data.types, self.event_styles)
+            counts = ", ".join(f"{t}: {n}" for t, n in self.event_data.counts().items())
+            self.log(f"Successfully imported {len(self.event_data)} events ({counts}).")
 
             # 重新绘制散点图（加载事件标注）
-            if self.combined_timestamps:
+            if self.hr_series:
                 self.display_scatter_plot()
 
         except Exception as e:
-            self.log(f"Error importing event Excel: {str(e)} (Ensure format: Col A=time, Col B=event(A/B/C))")
-            # 提示依赖安装（若未安装pandas/openpyxl）
-            if "No module named 'pandas'" in str(e):
-                self.log("Tip: Install required packages first: `pip install pandas openpyxl`")
+            self.log(f"Error importing event file: {str(e)} (Ensure format: Col A=time, Col B=event type)")
+            # 提示依赖安装（若未安装pandas/openpyxl/pyarrow）
+            if "No module named" in str(e) or "Missing optional dependency" in str(e):
+                self.log("Tip: Install required packages first: `pip install pandas openpyxl` "
+                         "(Parquet: `pip install pyarrow`)")
 
     def log(self, message):
-        """Thread-safe log writing."""
-        self.after(0, lambda: self._log_in_mainthread(message))
+        """Thread-safe log writing (queued, written by the periodic drain)."""
+        self.log_queue.put(message)
 
-    def _log_in_mainthread(self, message):
-        """Write log to text widget (main thread only)."""
-        self.log_text.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] {message}\n")
-        self.log_text.see(tk.END)
-        self.update_idletasks()
+    def _drain_log_queue(self):
+        """Write queued log messages to text widget in one batch (main thread only)."""
+        lines = []
+        try:
+            while len(lines) < self.LOG_BATCH_SIZE:
+                item = self.log_queue.get_nowait()
+                message = item.getMessage() if isinstance(item, logging.LogRecord) else str(item)
+                lines.append(f"[{datetime.now().strftime('%H:%M:%S')}] {message}\n")
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.log_text.insert(tk.END, "".join(lines))
+            excess = int(self.log_text.index('end-1c').split('.')[0]) - self.LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete('1.0', f'{excess + 1}.0')
+            self.log_text.see(tk.END)
+
+        # Drain again immediately if the batch was full, otherwise wait for the next tick
+        delay = 1 if len(lines) >= self.LOG_BATCH_SIZE else self.LOG_DRAIN_INTERVAL_MS
+        self.after(delay, self._drain_log_queue)
 
     def clear_results(self):
         """Clear all analysis results and plots."""
-        self.combined_timestamps = []
-        self.combined_heart_rates = []
+        self.hr_series = HRSeries()
+        self.hr_stats_acc = HRStatsAccumulator()
+        self.hr_rollup = HRRollup(self.DAY_START_HOUR, self.NIGHT_START_HOUR)
         self.hr_global_stats = {}
         self.hr_range_stats = {}
         self.event_data = None  # 清空事件数据
-        self.is_paused.set(False)
 
-        # Clear plots
-        for widget in self.hr_scatter_frame.winfo_children():
-            widget.destroy()
+        # Clear plots (the main scatter keeps its figure/canvas and is emptied in place)
+        if self.scatter_view is not None:
+            self.scatter_view.clear()
+            self.scatter_view.refresh()
 
         # Clear stats labels
         for lbl in self.global_stats_labels.values():
@@ -352,23 +410,38 @@ class ECGHeartRateGUI(tk.Tk):
         self.line_plot_btn.config(state='disabled')
         self.hist_plot_btn.config(state='disabled')
         self.poincare_btn.config(state='disabled')
+        self.export_plots_btn.config(state='disabled')
+        self.figure_cache.clear()
         self.pause_btn.config(state='disabled', text="Pause")
+        self.cancel_btn.config(state='disabled')
         self.range_stats_btn.config(state='disabled')
         self.import_event_btn.config(state='disabled')  # 禁用事件导入按钮
+        self.rollup_btn.config(state='disabled')
 
         self.log("Results cleared successfully.")
 
     def toggle_pause(self):
         """Toggle pause/resume state during analysis."""
-        if self.is_paused.get():
-            self.is_paused.set(False)
+        if self.job is None:
+            return
+        if self.job.is_paused:
+            self.job.resume()
             self.pause_btn.config(text="Pause")
             self.log("Analysis resumed.")
         else:
-            self.is_paused.set(True)
+            self.job.pause()
             self.pause_btn.config(text="Resume")
             self.log("Analysis paused (click Resume to continue).")
 
+    def cancel_analysis(self):
+        """Cancel the running analysis (results of finished files are kept)."""
+        if self.job is None:
+            return
+        self.job.cancel()
+        self.cancel_btn.config(state='disabled')
+        self.pause_btn.config(state='disabled', text="Pause")
+        self.log("Cancelling analysis...")
+
     def start_analysis(self):
         """Start analysis (threaded to avoid UI freeze)."""
         if self.is_analyzing:
@@ -378,167 +451,424 @@ class ECGHeartRateGUI(tk.Tk):
             return
 
         # Validate parameters
+        input_type = self.input_type.get()
         try:
-            if self.input_type.get() == "raw_ecg":
+            time_range = None
+            if input_type == "raw_ecg":
                 total_leads = int(self.total_leads.get())
                 sampling_rate = int(self.sampling_rate.get())
                 target_lead = self.target_lead.get()
                 if total_leads <= 0 or sampling_rate <= 0 or not (1 <= target_lead <= total_leads):
                     raise ValueError("Invalid ECG parameters (positive integers required)")
+                time_range = self._parse_time_range()
             else:
                 total_leads = 0
                 sampling_rate = 0
                 target_lead = 0
-        except ValueError as e:
+            prefetch = (int(self.prefetch_depth.get()), int(self.prefetch_memory_mb.get()))
+            if prefetch[0] < 1 or prefetch[1] < 1:
+                raise ValueError("Invalid read-ahead settings (positive integers required)")
+        except (ValueError, tk.TclError) as e:
             self.log(f"Error: {str(e)}. Please check input parameters.")
             return
 
+        multi_lead = input_type == "raw_ecg" and self.detection_mode.get() == "Multi-lead fused"
+
         # Update UI state
+        self.clear_results()
+        self.analysis_params = {
+            "folder_path": self.folder_path.get(), "total_leads": total_leads,
+            "target_lead": target_lead, "sampling_rate": sampling_rate, "use_prefilter": self.use_prefilter.get()
+        } if input_type == "raw_ecg" else None
         self.is_analyzing = True
+        self.job = AnalysisJob()
         self.analyze_btn.config(text="Analyzing...", state='disabled')
         self.pause_btn.config(state='normal')
+        self.cancel_btn.config(state='normal')
         self.clear_btn.config(state='disabled')
-        self.clear_results()
 
         # Log start
         self.log("\n" + "=" * 60)
-        self.log(f"Starting analysis (Input Type: {self.input_type.get().upper()})")
-        if self.input_type.get() == "raw_ecg":
+        self.log(f"Starting analysis (Input Type: {input_type.upper()})")
+        if input_type == "raw_ecg":
             self.log(f"- Total Leads: {total_leads}, Target Lead: {target_lead}")
             self.log(f"- Sampling Rate: {sampling_rate} Hz")
+            self.log(f"- Detection: {'multi-lead fused (all leads vote)' if multi_lead else 'single lead'}")
+            self.log(f"- Low-quality minutes: {'skipped' if self.quality_gate.get() else 'kept'}")
+            if time_range is not None:
+                self.log(f"- Time Range: {self.range_start.get().strip() or 'start'} ~ "
+                         f"{self.range_end.get().strip() or 'end'}")
         self.log("=" * 60)
 
-        # Start analysis in background thread
+        # Start analysis in background thread; results come back through the job queue
         analysis_thread = threading.Thread(
             target=self.run_analysis,
-            args=(self.folder_path.get(), total_leads, target_lead, sampling_rate)
+            args=(self.job, input_type, self.folder_path.get(), total_leads, target_lead, sampling_rate,
+                  self.merge_files.get(), self.use_prefilter.get(), multi_lead, time_range, self.quality_gate.get(),
+                  prefetch)
         )
         analysis_thread.daemon = True
         analysis_thread.start()
-
-    def run_analysis(self, folder_path, total_leads, target_lead, sampling_rate):
-        """Core analysis logic (background thread, with pause support)."""
+        self.after(self.RESULT_POLL_INTERVAL_MS, self._poll_job_results)
+
+    def _parse_time_range(self):
+        """(start_ts, end_ts) of the analysis range entries (None for a blank end), None if both are blank."""
+        start_str = self.range_start.get().strip()
+        end_str = self.range_end.get().strip()
+        if not start_str and not end_str:
+            return None
+        start_ts = datetime.strptime(start_str, '%Y-%m-%d %H:%M:%S').timestamp() if start_str else None
+        end_ts = datetime.strptime(end_str, '%Y-%m-%d %H:%M:%S').timestamp() if end_str else None
+        if start_ts is not None and end_ts is not None and start_ts >= end_ts:
+            raise ValueError("Range start must be earlier than range end")
+        return start_ts, end_ts
+
+    def run_analysis(self, job, input_type, folder_path, total_leads, target_lead, sampling_rate,
+                     merge_files=False, use_prefilter=False, multi_lead=False, time_range=None, quality_gate=False,
+                     prefetch=(PREFETCH_DEPTH, PREFETCH_MEMORY_MB)):
+        """Core analysis logic (background thread, no Tk access; talks to the UI via job)."""
+        prefetch_depth, prefetch_memory_mb = prefetch
         try:
-            if self.input_type.get() == "raw_ecg":
+            if input_type == "raw_ecg":
+                # Multi-lead fused detection reads all leads (target lead None)
+                read_lead = None if multi_lead else target_lead
+                if time_range is not None:
+                    # Only files overlapping the range (from the folder catalog), each read from near the start
+                    start_ts, end_ts = time_range
+                    catalog = self._open_catalog(folder_path)
+                    ecg_files = catalog.files_in_range(start_ts, end_ts)
+                    if not ecg_files:
+                        job.finish('error', "No raw ECG data found in the selected time range!")
+                        return
+                    self.log(f"{len(ecg_files)} of {len(catalog)} files overlap the time range. "
+                             f"Starting processing...")
+                    sampling_rate = self._resolve_sampling_rate(ecg_files, sampling_rate, read_lead)
+                    prefilter = self._make_prefilter(use_prefilter, sampling_rate)
+                    # Minutes cut by the range bounds only use the records inside the range
+                    self.run_merged_analysis(job, ecg_files, total_leads, read_lead, sampling_rate, prefilter,
+                                             quality_gate, open_records=lambda path: catalog.iter_range_records(
+                                                 path, start_ts, end_ts, read_lead, total_leads),
+                                             start_times=catalog.start_times(ecg_files),
+                                             prefetch_memory_mb=prefetch_memory_mb)
+                    job.finish('completed')
+                    return
+
                 # Process raw ECG files
                 ecg_files = get_ecg_file_list(folder_path)
                 if not ecg_files:
-                    self.log("Error: No raw ECG (.txt) files found in selected folder!")
+                    job.finish('error', "No raw ECG (.txt) files found in selected folder!")
                     return
 
                 total_files = len(ecg_files)
                 self.log(f"Found {total_files} raw ECG files. Starting processing...")
+                sampling_rate = self._resolve_sampling_rate(ecg_files, sampling_rate, read_lead)
+                prefilter = self._make_prefilter(use_prefilter, sampling_rate)
+
+                if merge_files:
+                    self.run_merged_analysis(job, ecg_files, total_leads, read_lead, sampling_rate, prefilter,
+                                             quality_gate, prefetch_memory_mb=prefetch_memory_mb)
+                    job.finish('completed')
+                    return
 
-                for idx, file_path in enumerate(ecg_files, 1):
-                    # Check pause state
-                    while self.is_paused.get():
-                        time.sleep(0.5)
-
-                    filename = os.path.basename(file_path)
-                    self.log(f"\nProcessing file {idx}/{total_files}: {filename}")
-
-                    # Read signal data
-                    signal_segments, timestamps = read_single_file_lead_data(file_path, target_lead, total_leads)
-                    if not signal_segments:
-                        self.log(f"  Warning: No valid signal data in {filename}. Skipping.")
-                        continue
-
-                    # Analyze HR
-                    file_ts, file_hr = analyze_single_file_hr(signal_segments, timestamps, sampling_rate)
-                    if file_ts and file_hr:
-                        self.combined_timestamps.extend(file_ts)
-                        self.combined_heart_rates.extend(file_hr)
-                        self.log(f"  Success: Extracted {len(file_hr)} valid HR points.")
-                    else:
-                        self.log(f"  Warning: No valid HR data from {filename}.")
+                # Next files are read on background threads while the current one is analyzed
+                if multi_lead:
+                    load = lambda path: list(iter_file_records(path, None, total_leads))
+                else:
+                    load = lambda path: read_single_file_lead_data(path, target_lead, total_leads)
+                with self._prefetch_reader(ecg_files, load, prefetch_depth, prefetch_memory_mb) as reader:
+                    for prefetched in reader:
+                        job.checkpoint()
+
+                        idx = prefetched.index + 1
+                        filename = os.path.basename(prefetched.path)
+                        self.log(f"\nProcessing file {idx}/{total_files}: {filename}")
+                        self._log_prefetch(prefetched)
+                        # Files are analyzed independently (like hr_shard): the filter restarts per file
+                        if prefilter is not None:
+                            prefilter.reset()
+
+                        if multi_lead:
+                            file_ts, file_hr, file_quality, best_leads = [], [], [], []
+                            for minute_ts, minute_hr, minute_quality, best_lead in iter_minute_hr(
+                                    prefetched.data, sampling_rate, quality_gate, prefilter):
+                                job.checkpoint()
+                                file_ts.append(minute_ts)
+                                file_hr.append(minute_hr)
+                                file_quality.append(minute_quality)
+                                best_leads.append(best_lead)
+                            if file_ts:
+                                job.publish(idx, filename, file_ts, file_hr, file_quality, best_leads)
+                                self.log(f"  Success: Extracted {len(file_hr)} valid HR points (multi-lead fused).")
+                                self._log_best_leads(best_leads)
+                            else:
+                                self.log(f"  Warning: No valid HR data from {filename}.")
+                            continue
+
+                        # Signal data (read by the prefetch stage)
+                        signal_segments, timestamps = prefetched.data
+                        if not signal_segments:
+                            self.log(f"  Warning: No valid signal data in {filename}. Skipping.")
+                            continue
+
+                        # Analyze HR
+                        job.checkpoint()
+                        file_ts, file_hr, file_quality = analyze_single_file_hr(
+                            signal_segments, timestamps, sampling_rate, quality_gate, return_quality=True,
+                            prefilter=prefilter)
+                        if file_ts and file_hr:
+                            job.publish(idx, filename, file_ts, file_hr, file_quality)
+                            self.log(f"  Success: Extracted {len(file_hr)} valid HR points.")
+                        else:
+                            self.log(f"  Warning: No valid HR data from {filename}.")
+                self._log_prefetch_summary(reader)
 
             else:
                 # Process HR JSON files
                 json_files = get_hr_json_file_list(folder_path)
                 if not json_files:
-                    self.log("Error: No HR JSON (.json) files found in selected folder!")
+                    job.finish('error', "No HR JSON (.json) files found in selected folder!")
                     return
 
                 total_files = len(json_files)
                 self.log(f"Found {total_files} HR JSON files. Starting processing...")
 
-                for idx, file_path in enumerate(json_files, 1):
-                    # Check pause state
-                    while self.is_paused.get():
-                        time.sleep(0.5)
-
-                    filename = os.path.basename(file_path)
-                    self.log(f"\nProcessing file {idx}/{total_files}: {filename}")
-
-                    # Read JSON HR data
-                    file_ts, file_hr = read_hr_json_file(file_path)
-                    if file_ts and file_hr:
-                        self.combined_timestamps.extend(file_ts)
-                        self.combined_heart_rates.extend(file_hr)
-                        self.log(f"  Success: Extracted {len(file_hr)} valid HR points.")
-                    else:
-                        self.log(f"  Warning: No valid HR data from {filename}.")
-
-            # Check pause state after processing all files
-            while self.is_paused.get():
-                time.sleep(0.5)
-
-            # Analysis summary
-            self.log("\n" + "=" * 60)
+                with self._prefetch_reader(json_files, read_hr_json_file, prefetch_depth,
+                                           prefetch_memory_mb) as reader:
+                    for prefetched in reader:
+                        job.checkpoint()
+
+                        idx = prefetched.index + 1
+                        filename = os.path.basename(prefetched.path)
+                        self.log(f"\nProcessing file {idx}/{total_files}: {filename}")
+
+                        # JSON HR data (read by the prefetch stage)
+                        file_ts, file_hr = prefetched.data
+                        if file_ts and file_hr:
+                            job.publish(idx, filename, file_ts, file_hr)
+                            self.log(f"  Success: Extracted {len(file_hr)} valid HR points.")
+                        else:
+                            self.log(f"  Warning: No valid HR data from {filename}.")
+                self._log_prefetch_summary(reader)
+
+            job.finish('completed')
+
+        except AnalysisCancelled:
+            job.finish('cancelled')
+        except Exception as e:
+            job.finish('error', f"Error during analysis: {str(e)}")
+
+    def _resolve_sampling_rate(self, ecg_files, sampling_rate, target_lead):
+        """Sampling rate from the headers of binary inputs (EDF/WFDB); text inputs use the configured rate."""
+        file_rate = resolve_sampling_rate(ecg_files, sampling_rate, target_lead)
+        if file_rate != sampling_rate:
+            self.log(f"- Sampling Rate: {file_rate} Hz (from file headers, configured {sampling_rate} Hz)")
+        return file_rate
+
+    def _make_prefilter(self, use_prefilter, sampling_rate):
+        """One filter instance for the whole run: state carries across segments (and files when stitched)."""
+        if not use_prefilter:
+            return None
+        try:
+            return ECGStreamFilter(sampling_rate)
+        except ImportError as e:
+            self.log(f"Warning: {str(e)}. Detecting on unfiltered samples.")
+            return None
+
+    def _prefetch_reader(self, paths, load, depth, memory_mb):
+        return PrefetchReader(paths, load, depth=depth, memory_cap_bytes=memory_mb << 20, sizeof=estimate_loaded_bytes)
+
+    def _log_prefetch(self, prefetched):
+        """Per-file read time and the part of it analysis had to wait for (prefetch tuning)."""
+        self.log(f"  Read {prefetched.input_bytes / (1 << 20):.1f} MB ({prefetched.loaded_bytes / (1 << 20):.1f} MB "
+                 f"parsed) in {prefetched.read_s:.2f} s (stalled {prefetched.stall_s:.2f} s)")
+
+    def _log_prefetch_summary(self, reader):
+        self.log(f"\nPrefetch: read {reader.total_read_s:.1f} s in total, analysis stalled {reader.total_stall_s:.1f} s "
+                 f"(depth {reader.depth}, cap {reader.memory_cap_bytes >> 20} MB parsed data)")
+
+    def _open_catalog(self, folder_path):
+        """Load and refresh the dataset catalog of a folder (only new/changed files are indexed)."""
+        catalog = DatasetCatalog(folder_path)
+        catalog.load()
+        counts = catalog.refresh()
+        self.log(f"Dataset catalog: {len(catalog)} files ({counts['indexed']} indexed, "
+                 f"{counts['reused']} unchanged, {counts['removed']} removed)")
+        return catalog
+
+    def run_merged_analysis(self, job, ecg_files, total_leads, target_lead, sampling_rate, prefilter=None,
+                            quality_gate=False, open_records=None, start_times=None,
+                            prefetch_memory_mb=PREFETCH_MEMORY_MB):
+        """Stream all files as one time-ordered record stream (k-way merge + minute stitching)."""
+        self.log("Merging records across files by recordTime (split minutes are stitched)...")
+        # Records hold about one second of float64 samples; up to MAX_DECODE_THREADS files read ahead at once
+        record_bytes = (total_leads if target_lead is None else 1) * sampling_rate * 8
+        read_ahead = max(1, (prefetch_memory_mb << 20) // (MAX_DECODE_THREADS * record_bytes))
+        self.log(f"  Open files are parsed up to {read_ahead} records ahead on background threads.")
+        merge_stats = {}
+        records = iter_merged_records(ecg_files, target_lead, total_leads, merge_stats=merge_stats,
+                                      open_records=open_records, start_times=start_times, read_ahead=read_ahead)
+
+        batch_idx = 0
+        batch_ts, batch_hr, batch_quality, batch_leads = [], [], [], []
+        lead_counts = Counter()
+        for minute_ts, minute_hr, minute_quality, best_lead in iter_minute_hr(records, sampling_rate, quality_gate,
+                                                                              prefilter):
+            job.checkpoint()
+            batch_ts.append(minute_ts)
+            batch_hr.append(minute_hr)
+            batch_quality.append(minute_quality)
+            batch_leads.append(best_lead)
+            if len(batch_ts) >= self.MERGED_BATCH_MINUTES:
+                batch_idx += 1
+                job.publish(batch_idx, f"merged batch {batch_idx}", batch_ts, batch_hr, batch_quality, batch_leads)
+                lead_counts.update(batch_leads)
+                batch_ts, batch_hr, batch_quality, batch_leads = [], [], [], []
+        if batch_ts:
+            job.publish(batch_idx + 1, f"merged batch {batch_idx + 1}", batch_ts, batch_hr, batch_quality,
+                        batch_leads)
+            lead_counts.update(batch_leads)
+
+        self.log(f"  Merged {merge_stats.get('records', 0)} records "
+                 f"({merge_stats.get('duplicates', 0)} duplicates skipped).")
+        self._log_best_leads(lead_counts)
+
+    def _log_best_leads(self, best_leads):
+        """How often each lead was the best (highest-quality voting) lead of a multi-lead minute."""
+        counts = [(lead, count) for lead, count in Counter(best_leads).most_common() if lead]
+        if not counts:
+            return
+        self.log("  Best lead per minute: " + ", ".join(f"lead {lead} ({count} min)" for lead, count in counts))
+
+    def _poll_job_results(self):
+        """Merge queued per-file results into the combined data (main thread only)."""
+        job = self.job
+        if job is None:
+            return
+
+        finished = None
+        received = False
+        for item in job.drain():
+            if isinstance(item, FileResult):
+                self.hr_series.extend(item.timestamps, item.heart_rates, item.quality, item.best_lead)
+                self.hr_stats_acc.update_many(item.heart_rates)
+                self.hr_rollup.update(item.timestamps, item.heart_rates)
+                received = True
+            elif isinstance(item, JobFinished):
+                finished = item
+
+        if finished is not None:
+            self._finish_analysis(finished)
+            return
+
+        # Progressive scatter update, throttled so large runs are not redrawn per file
+        now = time.monotonic()
+        if received and now - self._last_plot_refresh >= self.PLOT_REFRESH_INTERVAL_S:
+            self._last_plot_refresh = now
+            self.display_scatter_plot()
+            # Live global stats straight from the accumulator (no pass over all points)
+            self.hr_global_stats = self.hr_stats_acc.to_stats()
+            self.display_global_stats()
+        self.after(self.RESULT_POLL_INTERVAL_MS, self._poll_job_results)
+
+    def _finish_analysis(self, finished):
+        """Summarize results and restore UI state once the job has ended (main thread only)."""
+        self.job = None
+        self.is_analyzing = False
+
+        if finished.status == 'error':
+            self.log(f"\nError: {finished.message}")
+        elif finished.status == 'cancelled':
+            self.log("\nAnalysis cancelled. Results of completed files are kept.")
+
+        # Analysis summary
+        self.log("\n" + "=" * 60)
+        if finished.status == 'completed':
             self.log("Analysis completed!")
-            self.log(f"Total valid HR data points: {len(self.combined_heart_rates)}")
+        self.log(f"Total valid HR data points: {len(self.hr_series)}")
 
-            if self.combined_heart_rates:
-                # Calculate global stats
-                self.hr_global_stats = calculate_hr_time_domain_stats(self.combined_heart_rates)
+        if self.hr_series:
+            # Global stats were accumulated while results streamed in (same order as hr_series)
+            self.hr_global_stats = self.hr_stats_acc.to_stats()
+            if self.hr_global_stats:
                 self.log(f"Global average HR: {self.hr_global_stats['mean_hr']:.1f} BPM")
                 self.log(f"HR range: {self.hr_global_stats['min_hr']:.1f} - {self.hr_global_stats['max_hr']:.1f} BPM")
 
-                # Update UI: plot + global stats + enable buttons
-                self.after(0, self.display_scatter_plot)
-                self.after(0, self.display_global_stats)
-                self.after(0, lambda: self.range_stats_btn.config(state='normal'))
-                self.after(0, lambda: self.export_btn.config(state='normal'))
-                self.after(0, lambda: self.line_plot_btn.config(state='normal'))
-                self.after(0, lambda: self.hist_plot_btn.config(state='normal'))
-                self.after(0, lambda: self.poincare_btn.config(state='normal'))
-                self.after(0, lambda: self.import_event_btn.config(state='normal'))  # 启用事件导入按钮
-            else:
-                self.log("Warning: No valid HR data found in any file.")
+            # Update UI: plot + global stats + enable buttons
+            self.display_scatter_plot()
+            self.display_global_stats()
+            self.range_stats_btn.config(state='normal')
+            self.export_btn.config(state='normal')
+            self.line_plot_btn.config(state='normal')
+            self.hist_plot_btn.config(state='normal')
+            self.poincare_btn.config(state='normal')
+            self.export_plots_btn.config(state='normal')
+            self.import_event_btn.config(state='normal')  # 启用事件导入按钮
+            self.rollup_btn.config(state='normal')
+        elif finished.status == 'completed':
+            self.log("Warning: No valid HR data found in any file.")
+
+        # Restore UI state
+        self.analyze_btn.config(text="Start Analysis", state='normal')
+        self.pause_btn.config(state='disabled', text="Pause")
+        self.cancel_btn.config(state='disabled')
+        self.clear_btn.config(state='normal')
 
+    def display_scatter_plot(self):
+        """Display HR scatter plot (with event annotations if available), updating the artists in place."""
+        try:
+            if self.scatter_view is None:
+                self._create_scatter_canvas()
+            # Only points added since the last call are converted; events are blitted when only they changed
+            self.scatter_view.set_series(self.hr_series)
+            self.scatter_view.set_events(self.event_data, self.event_styles)
+            if self.scatter_view.needs_full_redraw and not self.scatter_view.is_zoomed:
+                self.scatter_toolbar.update()  # Home view = new data extent (kept while the user is zoomed in)
+            self.scatter_view.refresh()
         except Exception as e:
-            self.log(f"\nError during analysis: {str(e)}")
-        finally:
-            # Restore UI state
-            self.after(0, lambda: self.analyze_btn.config(text="Start Analysis", state='normal'))
-            self.after(0, lambda: self.pause_btn.config(state='disabled', text="Pause"))
-            self.after(0, lambda: self.clear_btn.config(state='normal'))
-            self.is_analyzing = False
-            self.is_paused.set(False)
+            self.log(f"Error displaying scatter plot: {str(e)}")
 
-    def display_scatter_plot(self):
-        """Display HR scatter plot (with event annotations if available)."""
-        for widget in self.hr_scatter_frame.winfo_children():
-            widget.destroy()
+    def _create_scatter_canvas(self):
+        """Create the main scatter figure, canvas and toolbar once."""
+        self.scatter_view = HRScatterView()
+        self.scatter_canvas = FigureCanvasTkAgg(self.scatter_view.fig, master=self.hr_scatter_frame)
+        self.scatter_view.attach(self.scatter_canvas)
+
+        # Add navigation toolbar (zoom/pan for main plot)
+        self.scatter_toolbar = NavigationToolbar2Tk(self.scatter_canvas, self.hr_scatter_frame)
+        self.scatter_toolbar.update()
+
+        # Click on an HR point opens its raw waveform (ignored while zoom/pan is active)
+        self.scatter_canvas.mpl_connect('pick_event', lambda event: self.on_scatter_pick(event, self.scatter_toolbar))
+
+        self.scatter_canvas.get_tk_widget().pack(fill='both', expand=True)
 
+    def on_close(self):
+        """Close all figures and detach the log handler before the window goes away."""
+        logging.getLogger().removeHandler(self.log_handler)
+        self.figure_cache.clear()
+        if self.scatter_view is not None:
+            self.scatter_view.close()
+        self.destroy()
+
+    def on_scatter_pick(self, event, toolbar):
+        """Open the raw waveform of the picked HR minute."""
+        if event.artist.get_gid() != 'hr_scatter' or not len(event.ind) or toolbar.mode:
+            return
+        if not self.analysis_params:
+            self.log("Raw waveform is only available for raw ECG analysis results.")
+            return
+
+        minute_ts = float(self.hr_series.timestamps[event.ind[0]])  # HR points are stamped at minute end
+        params = self.analysis_params
         try:
-            # 传递事件数据和样式到绘图函数
-            fig = plot_combined_hr(
-                self.combined_timestamps,
-                self.combined_heart_rates,
-                event_data=self.event_data,
-                event_styles=self.event_styles
-            )
-            canvas = FigureCanvasTkAgg(fig, master=self.hr_scatter_frame)
-            canvas.draw()
-
-            # Add navigation toolbar (zoom/pan for main plot)
-            toolbar = NavigationToolbar2Tk(canvas, self.hr_scatter_frame)
-            toolbar.update()
-
-            canvas.get_tk_widget().pack(fill='both', expand=True)
+            ecg_files = get_ecg_file_list(params["folder_path"])
+            sampling_rate = resolve_sampling_rate(ecg_files, params["sampling_rate"], params["target_lead"])
+            # R-peaks are detected on the same preprocessing that produced the HR value
+            WaveformViewer(self, ecg_files, minute_ts - 60, minute_ts, params["target_lead"],
+                           params["total_leads"], sampling_rate,
+                           self._make_prefilter(params["use_prefilter"], sampling_rate))
         except Exception as e:
-            self.log(f"Error displaying scatter plot: {str(e)}")
+            self.log(f"Error opening raw waveform: {str(e)}")
 
     def display_global_stats(self):
         """Update global stats labels (main thread)."""
@@ -558,13 +888,12 @@ class ECGHeartRateGUI(tk.Tk):
 
     def open_time_range_dialog(self):
         """Open dialog to select time range for stats calculation."""
-        if not self.combined_timestamps:
+        if not self.hr_series:
             self.log("Error: No HR data available for time-range stats!")
             return
 
         # Convert timestamps to readable format for reference
-        min_ts = min(self.combined_timestamps)
-        max_ts = max(self.combined_timestamps)
+        min_ts, max_ts = self.hr_series.time_range()
         min_time_str = datetime.fromtimestamp(min_ts).strftime('%Y-%m-%d %H:%M:%S')
         max_time_str = datetime.fromtimestamp(max_ts).strftime('%Y-%m-%d %H:%M:%S')
 
@@ -616,26 +945,21 @@ class ECGHeartRateGUI(tk.Tk):
                     self.log(f"Warning: Time range exceeds data range ({min_time_str} ~ {max_time_str})")
 
                 # Filter HR data by time range
-                filtered_ts = []
-                filtered_hr = []
-                for ts, hr in zip(self.combined_timestamps, self.combined_heart_rates):
-                    if start_ts <= ts <= end_ts:
-                        filtered_ts.append(ts)
-                        filtered_hr.append(hr)
-
-                if not filtered_hr:
+                range_series = self.hr_series.time_slice(start_ts, end_ts)
+
+                if not range_series:
                     self.log("Error: No HR data found in selected time range!")
                     dialog.destroy()
                     return
 
                 # Calculate range stats
-                self.hr_range_stats = calculate_hr_time_domain_stats(filtered_hr)
+                self.hr_range_stats = calculate_hr_time_domain_stats(range_series)
                 self.after(0, self.display_range_stats)
 
                 # Log info
                 self.log("\n" + "-" * 50)
                 self.log(f"Time-Range Stats Calculated: {start_str} ~ {end_str}")
-                self.log(f"Valid HR points in range: {len(filtered_hr)}")
+                self.log(f"Valid HR points in range: {len(range_series)}")
                 self.log(f"Mean HR in range: {self.hr_range_stats['mean_hr']:.1f} BPM")
                 self.log("-" * 50)
 
@@ -651,40 +975,107 @@ class ECGHeartRateGUI(tk.Tk):
 
     def show_hr_line_plot(self):
         """Open new window for HR line plot (with zoom/pan)."""
-        if not self.combined_heart_rates:
+        if not self.hr_series:
             self.log("Error: No HR data to plot!")
             return
         try:
-            fig = plot_hr_time_line(self.combined_timestamps, self.combined_heart_rates)
+            fig = self.figure_cache.get("line", self.hr_series.version, lambda: plot_hr_time_line(self.hr_series))
             create_plot_window(fig, "Heart Rate vs Time (Line Plot)")
         except Exception as e:
             self.log(f"Error generating line plot: {str(e)}")
 
     def show_hr_histogram(self):
         """Open new window for HR histogram (with zoom/pan)."""
-        if not self.combined_heart_rates:
+        if not self.hr_series:
             self.log("Error: No HR data to plot!")
             return
         try:
-            fig = plot_hr_histogram(self.combined_heart_rates)
+            fig = self.figure_cache.get("histogram", self.hr_series.version,
+                                        lambda: plot_hr_histogram(self.hr_series))
             create_plot_window(fig, "Heart Rate Frequency Distribution")
         except Exception as e:
             self.log(f"Error generating histogram: {str(e)}")
 
     def show_poincare_plot(self):
         """Open new window for Poincare plot (with zoom/pan)."""
-        if not self.combined_heart_rates:
+        if not self.hr_series:
             self.log("Error: No HR data to plot!")
             return
         try:
-            fig = plot_hr_poincare(self.combined_heart_rates)
+            fig = self.figure_cache.get("poincare", self.hr_series.version, lambda: plot_hr_poincare(self.hr_series))
             create_plot_window(fig, "HR Poincare Scatter Plot")
         except Exception as e:
             self.log(f"Error generating Poincare plot: {str(e)}")
 
+    def show_rollup_table(self):
+        """Open a table of precomputed hourly/daily/day-night HR stats (no scan over the points)."""
+        if not self.hr_rollup:
+            self.log("Error: No HR data available for rollup stats!")
+            return
+
+        window = tk.Toplevel(self)
+        window.title("HR Rollup Stats")
+        window.geometry("900x500")
+
+        top_frame = ttk.Frame(window, padding="5")
+        top_frame.pack(fill='x')
+        ttk.Label(top_frame, text="Group by:").pack(side='left', padx=5)
+        level_names = {description: level for level, description in ROLLUP_LEVELS.items()}
+        level_var = tk.StringVar(value=ROLLUP_LEVELS["hour"])
+        level_combo = ttk.Combobox(top_frame, textvariable=level_var, values=list(level_names), state='readonly',
+                                   width=25)
+        level_combo.pack(side='left', padx=5)
+        ttk.Label(top_frame, text=f"Day: {self.DAY_START_HOUR:02d}:00-{self.NIGHT_START_HOUR:02d}:00, "
+                                  f"night: rest").pack(side='left', padx=10)
+
+        columns = ("group", "count", "mean_hr", "std_hr", "min_hr", "max_hr", "rmssd", "pnn50")
+        headings = ("Group", "Points", "Mean HR", "SDNN", "Min HR", "Max HR", "RMSSD", "PNN50 (%)")
+        table_frame = ttk.Frame(window, padding="5")
+        table_frame.pack(fill='both', expand=True)
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=160 if column == "group" else 90, anchor='w' if column == "group" else 'e')
+        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        def refresh(*_):
+            # Rollup tables are updated as results arrive; this only formats the rows
+            tree.delete(*tree.get_children())
+            for row in self.hr_rollup.rows(level_names[level_var.get()]):
+                tree.insert('', 'end', values=["-" if row[column] is None else row[column] for column in columns])
+
+        level_combo.bind("<<ComboboxSelected>>", refresh)
+        ttk.Button(top_frame, text="Refresh", command=refresh).pack(side='left', padx=5)
+        refresh()
+
+    def export_all_plots(self):
+        """Render scatter/line/histogram/Poincare PNGs per day in background worker processes."""
+        if not self.hr_series:
+            self.log("Error: No data to export!")
+            return
+        output_dir = filedialog.askdirectory(title="Select Folder for Plot Export")
+        if not output_dir:
+            return
+
+        # Workers get a snapshot, so later results do not race with rendering
+        snapshot = self.hr_series.copy()
+        self.log(f"Exporting all plots (per day) to {output_dir}...")
+
+        def run_export():
+            try:
+                written = export_all_plots(snapshot, output_dir=output_dir, group_by="day")
+                self.log(f"Plot export finished: {len(written)} files written.")
+            except Exception as e:
+                self.log(f"Error exporting plots: {str(e)}")
+
+        threading.Thread(target=run_export, daemon=True).start()
+
     def export_data(self):
         """Export HR data + global/range stats to JSON file."""
-        if not self.combined_timestamps:
+        if not self.hr_series:
             self.log("Error: No data to export!")
             return
 
@@ -701,7 +1092,8 @@ class ECGHeartRateGUI(tk.Tk):
                 "time_range_stats": self.hr_range_stats
             } if self.hr_range_stats else self.hr_global_stats
 
-            success = export_to_json(self.combined_timestamps, self.combined_heart_rates, export_stats, save_path)
+            success = export_to_json(self.hr_series, hr_stats=export_stats, export_path=save_path,
+                                     rollups=self.hr_rollup.to_dict())
             self.log(f"JSON export {'successful' if success else 'failed'}: {save_path}")
 
 
@@ -0,0 +1,232 @@
+import os
+import re
+import time
+import logging
+import pickle
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+
+from hr_series import HRSeries, as_hr_arrays, epoch_to_local_datenum
+
+
+logger = logging.getLogger(__name__)
+
+# Plot kinds rendered by export_all_plots (file suffix -> description)
+PLOT_KINDS = {
+    "scatter": "HR vs Time (Scatter)",
+    "line": "HR vs Time (Line)",
+    "histogram": "HR Histogram",
+    "poincare": "HR Poincare"
+}
+
+GROUP_BY = ("day", "subject", "all")
+SUBJECT_SOURCES = ("prefix", "folder")
+
+
+class FigureCache:
+    """
+    Built figures keyed by plot kind, valid for one data version.
+
+    The cache keeps the pickled state of a built figure, not the figure itself:
+    ``get`` returns a new, independent Figure on every call (unpickling skips the
+    plot computation), so every plot window owns its figure and closes it on its
+    own. The version stamp (e.g. HRSeries.version) invalidates the entry.
+    """
+
+    def __init__(self):
+        self._figures = {}  # kind -> (version, pickled figure)
+
+    def get(self, kind, version, build):
+        """
+        Return a new figure of `kind` for `version`, calling build() on a miss.
+
+        Parameters:
+            kind (str): Plot kind (cache slot).
+            version (hashable): Data-version stamp of the plotted data.
+            build (callable): Returns a new matplotlib Figure.
+        """
+        cached = self._figures.get(kind)
+        if cached is None or cached[0] != version:
+            fig = build()
+            # Detached from pyplot before pickling, so copies are not registered with pyplot either
+            plt.close(fig)
+            cached = (version, pickle.dumps(fig))
+            self._figures[kind] = cached
+        return pickle.loads(cached[1])
+
+    def clear(self):
+        """Drop all cached figures."""
+        self._figures.clear()
+
+
+def _init_render_worker():
+    # Headless rendering in worker processes
+    plt.switch_backend('Agg')
+
+
+def _render_plot(kind, timestamps, heart_rates, save_path, dpi):
+    """Render one plot to a file (runs in a worker process)."""
+    from ecg_analysis import plot_combined_hr, plot_hr_time_line
+    from hrv_analysis import plot_hr_histogram, plot_hr_poincare
+
+    if kind == "scatter":
+        fig = plot_combined_hr(timestamps, heart_rates)
+    elif kind == "line":
+        fig = plot_hr_time_line(timestamps, heart_rates)
+    elif kind == "histogram":
+        fig = plot_hr_histogram(heart_rates)
+    else:
+        fig = plot_hr_poincare(heart_rates)
+    fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return save_path
+
+
+def split_by_day(timestamps, heart_rates=None):
+    """
+    Split a HR series into local calendar days (vectorized).
+
+    Returns:
+        list: (day_label 'YYYY-MM-DD', timestamps, heart_rates) tuples in day order.
+    """
+    ts, hr = as_hr_arrays(timestamps, heart_rates)
+    if ts.size == 0:
+        return []
+    order = np.argsort(ts, kind='stable')
+    ts, hr = ts[order], hr[order]
+    days = np.floor(epoch_to_local_datenum(ts)).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    stops = np.r_[starts[1:], ts.size]
+    return [(mdates.num2date(days[start]).strftime('%Y-%m-%d'), ts[start:stop], hr[start:stop])
+            for start, stop in zip(starts, stops)]
+
+
+def subject_of(path, source="prefix"):
+    """
+    Subject label of an input file.
+
+    Parameters:
+        path (str): Input file path.
+        source (str): 'prefix' = file name up to the first '_' or '-' (e.g. 'P001_day1.json' -> 'P001'),
+            'folder' = name of the folder holding the file.
+    """
+    if source == "folder":
+        return os.path.basename(os.path.dirname(os.path.abspath(path)))
+    if source != "prefix":
+        raise ValueError(f"Unsupported subject source: {source} ({' or '.join(SUBJECT_SOURCES)})")
+    name = os.path.basename(path).split('.')[0]
+    return re.split(r'[_-]', name, maxsplit=1)[0] or name
+
+
+def split_by_subject(timestamps, heart_rates, subjects):
+    """
+    Split a HR series by per-point subject labels.
+
+    Returns:
+        list: (subject, timestamps, heart_rates) tuples in subject order, points in time order.
+    """
+    ts, hr = as_hr_arrays(timestamps, heart_rates)
+    subjects = np.asarray(subjects, dtype=str)
+    if subjects.shape != ts.shape:
+        raise ValueError(f"One subject label per point required ({subjects.size} labels, {ts.size} points)")
+    order = np.argsort(ts, kind='stable')
+    ts, hr, subjects = ts[order], hr[order], subjects[order]
+    return [(str(subject), ts[subjects == subject], hr[subjects == subject]) for subject in np.unique(subjects)]
+
+
+def _file_label(label):
+    """Group label usable in a file name."""
+    return re.sub(r'[^\w.-]+', '_', label)
+
+
+def export_all_plots(timestamps, heart_rates=None, output_dir=".", group_by="day", dpi=300, max_workers=None,
+                     kinds=None, subjects=None):
+    """
+    Render the scatter, line, histogram and Poincare plots of a HR series to PNG files.
+
+    Every (group, plot kind) pair is an independent task rendered with the Agg backend
+    in a process pool, so batch report time scales with the number of cores.
+
+    Parameters:
+        timestamps (list/np.array/HRSeries): Epoch timestamps (or a HRSeries).
+        heart_rates (list/np.array): HR values (None for a HRSeries).
+        output_dir (str): Output folder (created if missing).
+        group_by (str): 'day' = one set of plots per local day, 'subject' = one set per subject
+            (see `subjects`), 'all' = one set for the whole series.
+        dpi (int): Output resolution.
+        max_workers (int, optional): Worker processes (default: CPU count).
+        kinds (list, optional): Subset of PLOT_KINDS (default: all).
+        subjects (array-like, optional): Subject label of every point (e.g. subject_of() of its
+            input file); required for group_by='subject'.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"Unsupported group_by: {group_by} ({', '.join(GROUP_BY)})")
+    if group_by == "subject" and subjects is None:
+        raise ValueError("group_by='subject' needs per-point subject labels")
+    kinds = list(PLOT_KINDS) if kinds is None else kinds
+    ts, hr = as_hr_arrays(timestamps, heart_rates)
+    if ts.size == 0:
+        raise ValueError("No valid heart rate data to plot")
+    os.makedirs(output_dir, exist_ok=True)
+
+    if group_by == "day":
+        groups = split_by_day(ts, hr)
+    elif group_by == "subject":
+        groups = split_by_subject(ts, hr, subjects)
+    else:
+        groups = [("all", ts, hr)]
+    tasks = []
+    for label, group_ts, group_hr in groups:
+        for kind in kinds:
+            # Histogram/Poincare need >= 2 points; skip them for tiny groups
+            if kind in ("histogram", "poincare") and group_hr.size < 2:
+                continue
+            tasks.append((kind, group_ts, group_hr, os.path.join(output_dir, f"hr_{_file_label(label)}_{kind}.png"),
+                          dpi))
+
+    start = time.perf_counter()
+    written = []
+    # Spawned (not forked) workers: a fork of the GUI process would copy its Tk state and running threads
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_render_worker) as pool:
+        futures = [pool.submit(_render_plot, *task) for task in tasks]
+        for task, future in zip(tasks, futures):
+            try:
+                written.append(future.result())
+            except Exception as e:
+                logger.error(f"Error rendering {task[0]} plot ({task[3]}): {e}")
+    logger.info(f"Exported {len(written)} plots for {len(groups)} group(s) to {output_dir} "
+                f"in {time.perf_counter() - start:.1f} s")
+    return written
+
+
+if __name__ == "__main__":
+    from data_read import get_hr_json_file_list, read_hr_json_file
+
+    parser = argparse.ArgumentParser(description="Render all HR plots of folders of HR JSON files")
+    parser.add_argument("folders", nargs="+", help="Folders with HR JSON files")
+    parser.add_argument("output_dir", help="Output folder for PNG files")
+    parser.add_argument("--group-by", default="day", choices=GROUP_BY)
+    parser.add_argument("--subject-from", default="prefix", choices=SUBJECT_SOURCES,
+                        help="Subject of a file for --group-by subject: file name prefix or folder name")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    series = HRSeries()
+    point_subjects = []
+    for folder in args.folders:
+        for path in get_hr_json_file_list(folder):
+            file_ts, file_hr = read_hr_json_file(path)
+            series.extend(file_ts, file_hr)
+            point_subjects.extend([subject_of(path, args.subject_from)] * len(file_ts))
+    export_all_plots(series, output_dir=args.output_dir, group_by=args.group_by, dpi=args.dpi,
+                     max_workers=args.workers, subjects=point_subjects)
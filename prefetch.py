@@ -0,0 +1,157 @@
+import sys
+import time
+import zipfile
+import numpy as np
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from compressed_io import split_member_path, file_cache_key
+
+
+DEFAULT_PREFETCH_DEPTH = 2  # Files read ahead of the one being analyzed
+DEFAULT_PREFETCH_MEMORY_BYTES = 512 << 20  # Estimated in-memory bytes of loaded files held by the prefetch stage
+
+# One loaded file: position in the input list, load result, time spent loading on a
+# background thread and time the consumer waited for it (stall), input size on disk
+# and in-memory size of the loaded data (loaded_bytes, None without a sizeof estimator)
+PrefetchedFile = namedtuple('PrefetchedFile',
+                            ['index', 'path', 'data', 'read_s', 'stall_s', 'input_bytes', 'loaded_bytes'])
+
+
+def input_size(path):
+    """Size in bytes of an input file (uncompressed size for zip members)."""
+    archive, member = split_member_path(path)
+    if member is not None:
+        with zipfile.ZipFile(archive) as bundle:
+            return bundle.getinfo(member).file_size
+    return file_cache_key(path)[1]
+
+
+def estimate_loaded_bytes(data):
+    """
+    Approximate in-memory size of loaded file data (nested lists/tuples of numbers, datetimes, arrays).
+
+    Lists are assumed homogeneous: the first item is measured and scaled by the length,
+    so the estimate costs O(nesting depth), not O(items).
+    """
+    if isinstance(data, np.ndarray):
+        return sys.getsizeof(data) + (data.nbytes if data.base is not None else 0)  # Views: buffer not counted
+    if isinstance(data, tuple):
+        return sys.getsizeof(data) + sum(estimate_loaded_bytes(item) for item in data)
+    if isinstance(data, list):
+        return sys.getsizeof(data) + (len(data) * estimate_loaded_bytes(data[0]) if data else 0)
+    return sys.getsizeof(data)
+
+
+def _timed_load(load, path):
+    start = time.perf_counter()
+    data = load(path)
+    return data, time.perf_counter() - start
+
+
+class PrefetchReader:
+    """
+    Load files in background threads ahead of the consumer (bounded read-ahead).
+
+    While the consumer analyzes file N, files N+1..N+depth are read and parsed by
+    ``load`` on worker threads, so file I/O (slow on network storage) overlaps with
+    analysis. Read-ahead stops while the memory of queued files plus the file being
+    analyzed would exceed ``memory_cap_bytes`` (one file is always allowed).
+
+    The cap is on parsed data, not on file sizes: parsed records are far larger than
+    their (often compressed) input. With a ``sizeof`` estimator, the size of every
+    loaded file is measured and the largest parsed-bytes-per-input-byte factor seen so
+    far predicts the size of files not loaded yet; read-ahead starts once the first
+    file is measured. Without ``sizeof`` the cap counts input bytes.
+
+    Files are yielded in input order as PrefetchedFile tuples; ``stall_s`` is how
+    long the consumer waited for the file, i.e. the I/O not hidden by prefetching.
+    Exceptions of ``load`` are re-raised in the consumer. Use as a context manager
+    (or close()) so pending reads are cancelled when the consumer stops early.
+
+    Parameters:
+        paths (list): Input file paths.
+        load (callable): load(path) -> data, run on a worker thread.
+        depth (int): Number of files read ahead (queue depth).
+        memory_cap_bytes (int): Cap on (estimated) bytes of loaded files queued + in analysis.
+        workers (int, optional): Reader threads (default: depth).
+        sizeof (callable, optional): sizeof(data) -> in-memory bytes of a load result
+            (e.g. estimate_loaded_bytes); None = count input bytes.
+    """
+
+    def __init__(self, paths, load, depth=DEFAULT_PREFETCH_DEPTH, memory_cap_bytes=DEFAULT_PREFETCH_MEMORY_BYTES,
+                 workers=None, sizeof=None):
+        if depth < 1:
+            raise ValueError(f"Prefetch depth must be >= 1 (got {depth})")
+        self.paths = list(paths)
+        self.load = load
+        self.depth = depth
+        self.memory_cap_bytes = memory_cap_bytes
+        self.sizeof = sizeof
+        self.expansion = None if sizeof is not None else 1.0  # Loaded bytes per input byte (max seen)
+        self.total_stall_s = 0.0
+        self.total_read_s = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers or depth, thread_name_prefix="prefetch")
+        self._pending = deque()  # (index, path, input_bytes, estimated loaded bytes, future)
+        self._next = 0
+        self._held_bytes = 0  # Estimated bytes of pending files + loaded bytes of the file being consumed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _fill(self):
+        while self._next < len(self.paths) and len(self._pending) < self.depth:
+            if self._held_bytes and self.expansion is None:
+                break  # Size of parsed data unknown until the first file is loaded
+            path = self.paths[self._next]
+            size = input_size(path)
+            estimate = int(size * (self.expansion or 1.0))
+            if self._held_bytes and self._held_bytes + estimate > self.memory_cap_bytes:
+                break
+            self._pending.append((self._next, path, size, estimate,
+                                  self._executor.submit(_timed_load, self.load, path)))
+            self._held_bytes += max(estimate, 1)
+            self._next += 1
+
+    def _measure(self, data, size, estimate):
+        """Replace the estimate of a loaded file by its measured size; returns the loaded bytes."""
+        if self.sizeof is None:
+            return None
+        loaded = self.sizeof(data)
+        if size:
+            self.expansion = max(self.expansion or 0.0, loaded / size)
+        self._held_bytes += max(loaded, 1) - max(estimate, 1)
+        return loaded
+
+    def __iter__(self):
+        try:
+            while True:
+                self._fill()
+                if not self._pending:
+                    return
+                index, path, size, estimate, future = self._pending.popleft()
+                start = time.perf_counter()
+                data, read_s = future.result()
+                stall_s = time.perf_counter() - start
+                self.total_stall_s += stall_s
+                self.total_read_s += read_s
+                loaded = self._measure(data, size, estimate)
+                # Start the next reads before handing the file to the consumer
+                self._fill()
+                yield PrefetchedFile(index, path, data, read_s, stall_s, size, loaded)
+                self._held_bytes -= max(loaded if loaded is not None else estimate, 1)
+        finally:
+            self.close()
+
+    def close(self):
+        """Cancel reads that have not started (running reads finish in the background)."""
+        for *_, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,199 @@
+import os
+import json
+import logging
+import argparse
+import numpy as np
+
+from data_read import get_ecg_file_list, iter_merged_records, resolve_sampling_rate
+from hr_series import local_minute_key
+
+
+logger = logging.getLogger(__name__)
+
+# Per-segment time index: one entry per source record (waveDataVoList segment)
+INDEX_DTYPE = np.dtype([('record_ts', '<f8'), ('offset', '<i8'), ('length', '<i4')])
+
+
+def _store_files(store_path):
+    """Return (data, index, meta) file paths of a raw store."""
+    return store_path + '.dat', store_path + '.idx.npy', store_path + '.json'
+
+
+def convert_to_raw_store(file_paths, store_path, total_leads=9, sampling_rate=250, dtype='int16'):
+    """
+    Convert raw ECG text files into one continuous memory-mappable sample store.
+
+    Records of all files are k-way merged by recordTime (duplicates dropped) and their
+    leads written as a (samples, leads) array to ``<store_path>.dat``. A compact
+    segment index (``.idx.npy``: recordTime, sample offset, length) and metadata
+    (``.json``) are written alongside.
+
+    Parameters:
+        file_paths (list): Raw ECG text files.
+        store_path (str): Output path without extension.
+        total_leads (int): Total number of leads in data.
+        sampling_rate (int): Sampling rate in Hz (binary inputs use the rate of their header).
+        dtype (str): Sample dtype on disk ('int16' or 'float32'). int16 stores integer ADC
+            counts; non-integer samples (e.g. scaled physical units) are rounded and
+            out-of-range ones clipped, both with a warning; use float32 to keep them.
+
+    Returns:
+        RawStore: The opened store.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.dtype('int16'), np.dtype('float32')):
+        raise ValueError(f"Unsupported raw store dtype: {dtype} (int16 or float32)")
+    sampling_rate = resolve_sampling_rate(file_paths, sampling_rate)
+    data_path, index_path, meta_path = _store_files(store_path)
+    out_dir = os.path.dirname(store_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    index_entries = []
+    offset = 0
+    clipped = 0
+    rounded = 0
+    info = np.iinfo(dtype) if dtype.kind == 'i' else None
+    with open(data_path, 'wb') as f:
+        for record_ts, samples in iter_merged_records(file_paths, None, total_leads):
+            block = samples.T  # (n, leads) -> samples-major rows
+            if info is not None:
+                out_of_range = (block < info.min) | (block > info.max)
+                if out_of_range.any():
+                    clipped += int(out_of_range.sum())
+                    block = np.clip(block, info.min, info.max)
+                quantized = np.rint(block)
+                rounded += int(np.count_nonzero(quantized != block))
+                block = quantized
+            f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+            index_entries.append((record_ts, offset, block.shape[0]))
+            offset += block.shape[0]
+
+    np.save(index_path, np.array(index_entries, dtype=INDEX_DTYPE))
+    meta = {
+        "total_leads": total_leads,
+        "sampling_rate": sampling_rate,
+        "dtype": dtype.str,
+        "n_samples": offset,
+        "n_segments": len(index_entries),
+        "source_files": [os.path.basename(path) for path in file_paths]
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    if clipped:
+        logger.warning(f"  Warning: {clipped} samples clipped to {dtype} range in {os.path.basename(data_path)}")
+    if rounded:
+        logger.warning(f"  Warning: {rounded} non-integer samples rounded to {dtype} in {os.path.basename(data_path)} "
+                       f"(convert with dtype='float32' to keep them)")
+    logger.info(f"Raw store written: {data_path} ({offset} samples x {total_leads} leads, "
+                f"{len(index_entries)} segments)")
+    return RawStore(store_path)
+
+
+class RawStore:
+    """
+    Read-only memory-mapped view of a converted recording.
+
+    ``data`` is an (n_samples, total_leads) np.memmap; any time window of any lead
+    is a slice of it (binary search in the segment index, no parsing, no copy).
+
+    Parameters:
+        store_path (str): Store path without extension (as given to convert_to_raw_store).
+    """
+
+    def __init__(self, store_path):
+        data_path, index_path, meta_path = _store_files(store_path)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.store_path = store_path
+        self.total_leads = self.meta["total_leads"]
+        self.sampling_rate = self.meta["sampling_rate"]
+        self.index = np.load(index_path)
+        n_samples = self.meta["n_samples"]
+        if n_samples:
+            self.data = np.memmap(data_path, dtype=np.dtype(self.meta["dtype"]), mode='r',
+                                  shape=(n_samples, self.total_leads))
+        else:
+            self.data = np.empty((0, self.total_leads), dtype=np.dtype(self.meta["dtype"]))
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def time_range(self):
+        """Return (first recordTime, end of last segment) or None if empty."""
+        if not len(self.index):
+            return None
+        last = self.index[-1]
+        return float(self.index['record_ts'][0]), float(last['record_ts'] + last['length'] / self.sampling_rate)
+
+    def sample_offset(self, ts):
+        """Map an epoch timestamp to a sample offset (clamped to the containing segment)."""
+        index = self.index
+        if not len(index):
+            return 0
+        seg = int(np.searchsorted(index['record_ts'], ts, side='right')) - 1
+        if seg < 0:
+            return 0
+        within = int(round((ts - index['record_ts'][seg]) * self.sampling_rate))
+        return int(index['offset'][seg]) + min(max(within, 0), int(index['length'][seg]))
+
+    def window(self, start_ts, end_ts, lead=None):
+        """
+        Return samples between two epoch timestamps as a memmap view.
+
+        Parameters:
+            start_ts (float): Window start (epoch seconds).
+            end_ts (float): Window end (epoch seconds).
+            lead (int, optional): Lead number (1-based); None = all leads.
+
+        Returns:
+            np.ndarray: (n,) view for one lead, (n, leads) view for all leads.
+        """
+        i0 = self.sample_offset(start_ts)
+        i1 = max(self.sample_offset(end_ts), i0)
+        if lead is None:
+            return self.data[i0:i1]
+        return self.data[i0:i1, lead - 1]
+
+    def segment_times(self, start, stop):
+        """Epoch time of each sample in [start, stop) from the segment index."""
+        index = self.index
+        positions = np.arange(start, stop)
+        seg = np.searchsorted(index['offset'], positions, side='right') - 1
+        return index['record_ts'][seg] + (positions - index['offset'][seg]) / self.sampling_rate
+
+    def minute_ranges(self):
+        """
+        Contiguous sample ranges per local minute (records are time sorted).
+
+        Returns:
+            list: (minute_key, start_offset, stop_offset) tuples in time order.
+        """
+        ranges = []
+        current = None
+        for record_ts, offset, length in self.index.tolist():
+            key = local_minute_key(record_ts)
+            if current is not None and current[0] == key:
+                current[2] = offset + length
+            else:
+                if current is not None:
+                    ranges.append(tuple(current))
+                current = [key, offset, offset + length]
+        if current is not None:
+            ranges.append(tuple(current))
+        return ranges
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert raw ECG .txt files into a memory-mapped raw store")
+    parser.add_argument("folder", help="Folder with raw ECG .txt files")
+    parser.add_argument("store_path", help="Output store path (without extension)")
+    parser.add_argument("--total-leads", type=int, default=9)
+    parser.add_argument("--sampling-rate", type=int, default=250)
+    parser.add_argument("--dtype", default="int16", choices=["int16", "float32"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    convert_to_raw_store(get_ecg_file_list(args.folder), args.store_path,
+                         args.total_leads, args.sampling_rate, args.dtype)
@@ -0,0 +1,160 @@
+import numpy as np
+
+
+# Default pass thresholds of the signal-quality gate, calibrated on the detection input
+# (raw or prefiltered). Synthetic 70 bpm ECG: slope kurtosis ~23 raw / ~16 prefiltered,
+# with or without 30-60% baseline wander; 180 bpm prefiltered ~5.6; white noise ~3.0.
+DEFAULT_SQI_THRESHOLDS = {
+    "max_flatline_fraction": 0.5,  # Share of blocks with (almost) no amplitude
+    "max_clipping_fraction": 0.05,  # Share of samples stuck at the window min/max (raw samples)
+    "min_kurtosis": 4.0,  # Kurtosis of the sample-to-sample slope: QRS complexes make it peaked, noise ~3
+    "max_hf_noise_ratio": 0.5,  # Spectral power >= 40 Hz relative to power >= 0.5 Hz
+}
+
+HF_NOISE_CUTOFF_HZ = 40.0
+BASELINE_CUTOFF_HZ = 0.5
+
+# Flatline check: blocks long enough to hold a beat at >= 30 bpm; a block is flat if its
+# peak-to-peak amplitude is below this share of the window's amplitude
+FLATLINE_BLOCK_S = 2.0
+FLATLINE_REL_AMPLITUDE = 0.02
+
+GAUSSIAN_KURTOSIS = 3.0  # Slope kurtosis of pure noise (quality score 0 on that term)
+
+
+def _padded_batch(windows):
+    """Stack variable-length windows into a zero-padded (n, max_len) array + validity mask."""
+    lengths = np.array([len(w) for w in windows], dtype=np.int64)
+    batch = np.zeros((len(windows), int(lengths.max())), dtype=np.float64)
+    for row, window in enumerate(windows):
+        batch[row, :len(window)] = window
+    mask = np.arange(batch.shape[1]) < lengths[:, None]
+    return batch, mask, lengths
+
+
+def _window_range(batch, mask, full):
+    """Per-row (min, max) of the valid samples."""
+    if full:
+        return batch.min(axis=1), batch.max(axis=1)
+    big = np.finfo(np.float64).max
+    return np.where(mask, batch, big).min(axis=1), np.where(mask, batch, -big).max(axis=1)
+
+
+def _clipping_fraction(batch, mask, lengths):
+    """Share of samples sitting at the window extremes (saturated ADC / electrode off)."""
+    full = bool(mask.all())
+    w_min, w_max = _window_range(batch, mask, full)
+    tol = 1e-3 * np.maximum(w_max - w_min, 1e-12)[:, None]
+    at_edge = (batch >= w_max[:, None] - tol) | (batch <= w_min[:, None] + tol)
+    if not full:
+        at_edge &= mask
+    return np.count_nonzero(at_edge, axis=1) / np.maximum(lengths, 1)
+
+
+def _quality_metrics(batch, mask, lengths, sampling_rate):
+    """Per-row flatline fraction, slope kurtosis and HF noise ratio of one padded batch (all NumPy)."""
+    n = np.maximum(lengths, 1).astype(np.float64)
+    mean = batch.sum(axis=1) / n
+    # Equal-length batches (e.g. all leads of one minute) need no masking
+    full = bool(mask.all())
+    centered = batch - mean[:, None]
+    if not full:
+        centered = np.where(mask, centered, 0.0)
+    w_min, w_max = _window_range(batch, mask, full)
+    w_range = w_max - w_min
+
+    # Flatline: blocks whose peak-to-peak amplitude is tiny relative to the window's
+    # (a quantized low-amplitude ECG has many zero steps, but every block holds a beat)
+    block = max(int(FLATLINE_BLOCK_S * sampling_rate), 1)
+    n_blocks = batch.shape[1] // block
+    blocks = batch[:, :n_blocks * block].reshape(len(batch), n_blocks, block)
+    block_ptp = blocks.max(axis=2) - blocks.min(axis=2)
+    block_valid = (np.arange(1, n_blocks + 1) * block)[None, :] <= lengths[:, None]
+    block_flat = (block_ptp <= FLATLINE_REL_AMPLITUDE * w_range[:, None]) & block_valid
+    flatline_fraction = np.count_nonzero(block_flat, axis=1) / np.maximum(block_valid.sum(axis=1), 1)
+
+    # Kurtosis (non-excess) of the first difference: steep QRS slopes make it peaked,
+    # baseline wander barely changes it; a constant window has zero variance -> 0
+    step = np.diff(batch, axis=1)
+    step_valid = mask[:, 1:]
+    n_steps = np.maximum(lengths - 1, 1).astype(np.float64)
+    step_centered = step - (np.where(step_valid, step, 0.0).sum(axis=1) / n_steps)[:, None]
+    if not full:
+        step_centered = np.where(step_valid, step_centered, 0.0)
+    squared = np.square(step_centered)
+    m2 = squared.sum(axis=1) / n_steps
+    m4 = np.einsum('ij,ij->i', squared, squared) / n_steps
+    kurtosis = np.where(m2 > 0, m4 / np.maximum(np.square(m2), 1e-300), 0.0)
+
+    # High-frequency noise ratio from the zero-padded spectrum; band powers are
+    # summed straight from the complex spectrum viewed as (re, im) pairs
+    spectrum = np.fft.rfft(centered, axis=1)
+    freqs = np.fft.rfftfreq(batch.shape[1], d=1.0 / sampling_rate)
+    total = _band_power(spectrum, np.searchsorted(freqs, BASELINE_CUTOFF_HZ))
+    high = _band_power(spectrum, np.searchsorted(freqs, HF_NOISE_CUTOFF_HZ))
+    hf_noise_ratio = np.where(total > 0, high / np.maximum(total, 1e-300), 1.0)
+
+    return flatline_fraction, kurtosis, hf_noise_ratio
+
+
+def _band_power(spectrum, first_bin):
+    """Per-row sum of |X|^2 over bins >= first_bin (no power-spectrum temporary)."""
+    pairs = spectrum.view(np.float64)[:, 2 * first_bin:]
+    return np.einsum('ij,ij->i', pairs, pairs)
+
+
+def compute_window_quality(windows, sampling_rate=250, thresholds=None, batch_size=64, raw_windows=None):
+    """
+    Batched signal-quality index (SQI) of ECG windows (e.g. one window per minute).
+
+    Windows are zero-padded into 2-D arrays and all metrics are computed with NumPy
+    over the whole batch: flatline fraction, clipping fraction, slope kurtosis and
+    high frequency noise ratio. Windows are processed ``batch_size`` at a time to
+    bound memory (windows may be memmap slices).
+
+    `windows` should be the detection input (the prefiltered signal when a prefilter
+    is used). Clipping is measured on `raw_windows` if given, since filtering hides
+    ADC saturation.
+
+    Parameters:
+        windows (list): 1-D sample arrays (detection input).
+        sampling_rate (int): Sampling rate in Hz.
+        thresholds (dict, optional): Overrides of DEFAULT_SQI_THRESHOLDS.
+        batch_size (int): Windows per NumPy batch.
+        raw_windows (list, optional): Unfiltered samples of the same windows (clipping check).
+
+    Returns:
+        dict: Arrays (one entry per window): flatline_fraction, clipping_fraction, kurtosis,
+        hf_noise_ratio, quality_score (0-1) and passed (bool).
+    """
+    limits = dict(DEFAULT_SQI_THRESHOLDS)
+    if thresholds:
+        limits.update(thresholds)
+
+    n_windows = len(windows)
+    metrics = {key: np.zeros(n_windows) for key in
+               ("flatline_fraction", "clipping_fraction", "kurtosis", "hf_noise_ratio")}
+    for start in range(0, n_windows, batch_size):
+        chunk = [np.asarray(w, dtype=np.float64) for w in windows[start:start + batch_size]]
+        batch, mask, lengths = _padded_batch(chunk)
+        values = _quality_metrics(batch, mask, lengths, sampling_rate)
+        for key, value in zip(("flatline_fraction", "kurtosis", "hf_noise_ratio"), values):
+            metrics[key][start:start + len(chunk)] = value
+        if raw_windows is not None:
+            batch, mask, lengths = _padded_batch(
+                [np.asarray(w, dtype=np.float64) for w in raw_windows[start:start + batch_size]])
+        metrics["clipping_fraction"][start:start + len(chunk)] = _clipping_fraction(batch, mask, lengths)
+
+    passed = ((metrics["flatline_fraction"] <= limits["max_flatline_fraction"])
+              & (metrics["clipping_fraction"] <= limits["max_clipping_fraction"])
+              & (metrics["kurtosis"] >= limits["min_kurtosis"])
+              & (metrics["hf_noise_ratio"] <= limits["max_hf_noise_ratio"]))
+    quality_score = ((1 - metrics["flatline_fraction"])
+                     * (1 - metrics["clipping_fraction"])
+                     * np.clip((metrics["kurtosis"] - GAUSSIAN_KURTOSIS)
+                               / max(limits["min_kurtosis"] - GAUSSIAN_KURTOSIS, 1e-12), 0, 1)
+                     * (1 - np.clip(metrics["hf_noise_ratio"], 0, 1)))
+
+    metrics["quality_score"] = quality_score
+    metrics["passed"] = passed
+    return metrics
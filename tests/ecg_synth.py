@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+import numpy as np
+
+
+# P, Q, R, S, T waves: (offset from beat start s, width s, amplitude relative to R)
+BEAT_WAVES = ((0.1, 0.025, 0.12), (0.18, 0.008, -0.1), (0.2, 0.01, 1.0), (0.22, 0.008, -0.25), (0.45, 0.05, 0.3))
+
+START_TS = datetime(2024, 3, 5, 10, 0).timestamp()  # Minute-aligned local time
+
+
+def synth_ecg(seconds=60, sampling_rate=250, hr=70, r_amp=1000.0, noise=0.01, wander=0.0, seed=0):
+    """Synthetic ECG (Gaussian P-QRS-T waves) with white noise and 0.3 Hz baseline wander (relative to R)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sampling_rate)) / sampling_rate
+    rr = 60.0 / hr
+    phase = np.mod(t, rr)
+    signal = np.zeros_like(t)
+    for offset, width, amp in BEAT_WAVES:
+        for shift in (-rr, 0.0, rr):
+            signal += amp * np.exp(-0.5 * ((phase - offset + shift) / width) ** 2)
+    return (signal + wander * np.sin(2 * np.pi * 0.3 * t)) * r_amp + rng.normal(0, noise * r_amp, t.size)
+
+
+def one_second_segments(signal, sampling_rate=250, start_ts=START_TS):
+    """Split a signal into 1 s segments + datetime timestamps (read_single_file_lead_data layout)."""
+    n = len(signal) // sampling_rate
+    segments = [signal[i * sampling_rate:(i + 1) * sampling_rate] for i in range(n)]
+    return segments, [datetime.fromtimestamp(start_ts + i) for i in range(n)]
+
+
+def write_text_record(path, signals, sampling_rate=250, start_ts=START_TS):
+    """Write (leads, n) samples as a raw ECG JSON-lines file (one 1 s record per line)."""
+    signals = np.rint(np.atleast_2d(signals)).astype(int)
+    with open(path, 'w', encoding='utf-8') as f:
+        for second in range(signals.shape[1] // sampling_rate):
+            block = signals[:, second * sampling_rate:(second + 1) * sampling_rate]
+            leads = [{"waveDataVoList": [{"sample": int(v)} for v in lead]} for lead in block]
+            f.write(json.dumps({"recordTime": start_ts + second, "data": {"waveDataList": leads}}) + "\n")
+    return str(path)
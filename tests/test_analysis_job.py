@@ -0,0 +1,72 @@
+import threading
+import numpy as np
+import pytest
+
+from analysis_job import AnalysisCancelled, AnalysisJob, FileResult, JobFinished
+
+
+def _worker(job, steps, done):
+    """Count checkpoints passed until cancelled; record how the loop ended."""
+    try:
+        while True:
+            job.checkpoint()
+            steps.append(1)
+            if len(steps) > 10000:
+                done.append('runaway')
+                return
+    except AnalysisCancelled:
+        done.append('cancelled')
+
+
+def test_pause_blocks_checkpoint_and_resume_releases_it():
+    job = AnalysisJob()
+    job.pause()
+    assert job.is_paused
+    passed = threading.Event()
+    worker = threading.Thread(target=lambda: (job.checkpoint(), passed.set()), daemon=True)
+    worker.start()
+    assert not passed.wait(0.2)  # Blocked while paused
+
+    job.resume()
+    assert passed.wait(2.0)
+    worker.join(2.0)
+    assert not job.is_paused
+
+
+def test_cancel_wakes_a_paused_worker():
+    job = AnalysisJob()
+    job.pause()
+    steps, done = [], []
+    worker = threading.Thread(target=_worker, args=(job, steps, done), daemon=True)
+    worker.start()
+    worker.join(0.2)
+    assert worker.is_alive() and not steps
+
+    job.cancel()
+    worker.join(2.0)
+    assert not worker.is_alive()
+    assert done == ['cancelled'] and not steps
+    assert job.is_cancelled
+    with pytest.raises(AnalysisCancelled):
+        job.checkpoint()
+
+
+def test_published_batches_are_immutable_and_ordered():
+    job = AnalysisJob()
+    timestamps, heart_rates = [60.0, 120.0], [70, 72]
+    job.publish(0, "a.txt", timestamps, heart_rates)
+    job.publish(1, "b.txt", [180.0], [75], quality=[0.9])
+    job.finish('completed', "done")
+    heart_rates[0] = 999  # The worker's own lists stay its own
+
+    first, second, finished = job.drain()
+    assert isinstance(first, FileResult) and first.file_name == "a.txt"
+    assert first.heart_rates.tolist() == [70, 72] and np.all(np.isnan(first.quality))
+    assert second.quality.dtype == np.float32 and second.quality[0] == np.float32(0.9)
+    for array in (first.timestamps, first.heart_rates, first.quality):
+        with pytest.raises(ValueError):
+            array[0] = 0
+    with pytest.raises(AttributeError):
+        first.heart_rates = None
+    assert finished == JobFinished('completed', "done")
+    assert job.drain() == []
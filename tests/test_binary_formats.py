@@ -0,0 +1,135 @@
+from datetime import datetime
+import numpy as np
+import pytest
+
+import binary_ecg
+from binary_ecg import read_edf, read_wfdb
+from data_read import read_lead_window, read_single_file_lead_data, resolve_sampling_rate
+from ecg_analysis import ECGStreamFilter, analyze_single_file_hr
+from ecg_synth import START_TS, synth_ecg
+
+
+def _field(value, width):
+    return str(value).ljust(width)[:width].encode()
+
+
+def write_edf(path, signals, labels, samples_per_record, start=datetime.fromtimestamp(START_TS)):
+    """EDF(+) file with 1 s records; signals: one int16 array per label (n_records * samples_per_record[k])."""
+    n_sig = len(signals)
+    n_records = len(signals[0]) // samples_per_record[0]
+    header = b''.join([
+        _field(0, 8), _field('X', 80), _field('Y', 80), _field(start.strftime('%d.%m.%y'), 8),
+        _field(start.strftime('%H.%M.%S'), 8), _field(256 * (n_sig + 1), 8), _field('EDF+C', 44),
+        _field(n_records, 8), _field(1, 8), _field(n_sig, 4)
+    ])
+    for width, values in ((16, labels), (80, [''] * n_sig), (8, ['uV'] * n_sig), (8, [-32768] * n_sig),
+                          (8, [32767] * n_sig), (8, [-32768] * n_sig), (8, [32767] * n_sig), (80, [''] * n_sig),
+                          (8, samples_per_record), (32, [''] * n_sig)):
+        header += b''.join(_field(value, width) for value in values)
+    records = [np.concatenate([signal[r * spr:(r + 1) * spr] for signal, spr in zip(signals, samples_per_record)])
+               for r in range(n_records)]
+    with open(path, 'wb') as f:
+        f.write(header + np.concatenate(records).astype('<i2').tobytes())
+
+
+def write_wfdb16(folder, name, signals, sampling_rate, start=datetime.fromtimestamp(START_TS)):
+    """WFDB record (format 16) of (n_sig, n) int16 samples; returns the .hea path."""
+    (folder / f"{name}.dat").write_bytes(np.asarray(signals).T.astype('<i2').tobytes())
+    lines = [f"{name} {len(signals)} {sampling_rate} {len(signals[0])} "
+             f"{start.strftime('%H:%M:%S')} {start.strftime('%d/%m/%Y')}"]
+    lines += [f"{name}.dat 16 1(0)/uV 16 0 0 0 0 ECG{k}" for k in range(len(signals))]
+    hea = folder / f"{name}.hea"
+    hea.write_text("\n".join(lines) + "\n")
+    return str(hea)
+
+
+def write_wfdb212(folder, name, signals, sampling_rate, start=datetime.fromtimestamp(START_TS)):
+    """WFDB record (format 212: two 12-bit samples per 3 bytes) of (n_sig, n) samples in [-2048, 2047]."""
+    values = np.asarray(signals).T.ravel().astype(np.int64) & 0xFFF
+    if values.size % 2:
+        values = np.append(values, 0)
+    first, second = values[0::2], values[1::2]
+    packed = np.stack([first & 0xFF, (first >> 8) | ((second >> 8) << 4), second & 0xFF], axis=1)
+    (folder / f"{name}.dat").write_bytes(packed.astype(np.uint8).tobytes())
+    lines = [f"{name} {len(signals)} {sampling_rate} {len(signals[0])} "
+             f"{start.strftime('%H:%M:%S')} {start.strftime('%d/%m/%Y')}"]
+    lines += [f"{name}.dat 212 200(-5)/mV 12 0 0 0 0 ECG{k}" for k in range(len(signals))]
+    hea = folder / f"{name}.hea"
+    hea.write_text("\n".join(lines) + "\n")
+    return str(hea)
+
+
+@pytest.mark.parametrize("n_signals", [2, 3])  # 3 signals: frames split across byte triplets
+def test_wfdb212_round_trip_decodes_each_file_once(tmp_path, monkeypatch, n_signals):
+    rng = np.random.default_rng(n_signals)
+    adc = rng.integers(-2048, 2048, size=(n_signals, 1001))
+    adc[:, :4] = [-2048, 2047, -1, 0]  # Range limits and sign boundaries
+    path = write_wfdb212(tmp_path, "rec212", adc, 250)
+
+    decode_calls = []
+    decode = binary_ecg._decode_212
+    monkeypatch.setattr(binary_ecg, "_decode_212", lambda raw: decode_calls.append(raw.size) or decode(raw))
+
+    segments, timestamps = read_wfdb(path)
+    assert len(decode_calls) == 1
+    physical = np.concatenate(segments, axis=-1)
+    assert physical.shape == adc.shape
+    assert np.allclose(physical, (adc + 5) / 200)
+    assert len(timestamps) == 5 and timestamps[0] == datetime.fromtimestamp(START_TS)
+
+    segments, _ = read_wfdb(path, target_lead=n_signals)
+    assert np.allclose(np.concatenate(segments), (adc[-1] + 5) / 200)
+
+
+def test_wfdb_header_rate_drives_analysis(tmp_path):
+    ecg = np.rint(synth_ecg(seconds=180, sampling_rate=360, hr=70)).astype(np.int16)
+    path = write_wfdb16(tmp_path, "rec360", [ecg, ecg // 2], 360)
+
+    sampling_rate = resolve_sampling_rate([path], 250, target_lead=1)
+    assert sampling_rate == 360
+    segments, timestamps = read_single_file_lead_data(path, 1, 9)
+    _, heart_rates = analyze_single_file_hr(segments, timestamps, sampling_rate,
+                                            prefilter=ECGStreamFilter(sampling_rate))
+    assert len(heart_rates) == 3
+    assert np.allclose(heart_rates, 70, atol=0.5)
+    # The configured rate would scale every HR value by 250/360
+    _, wrong_rates = analyze_single_file_hr(segments, timestamps, 250, prefilter=ECGStreamFilter(250))
+    assert np.allclose(wrong_rates, 70 * 250 / 360, atol=1.0)
+
+
+def test_mixed_sampling_rates_are_rejected(tmp_path):
+    ecg = np.rint(synth_ecg(seconds=10, sampling_rate=250)).astype(np.int16)
+    path_250 = write_wfdb16(tmp_path, "a", [ecg], 250)
+    path_500 = write_wfdb16(tmp_path, "b", [np.repeat(ecg, 2)], 500)
+    text_path = tmp_path / "c.txt"
+    text_path.write_text('{"recordTime": 0, "data": {"waveDataList": []}}\n')
+
+    assert resolve_sampling_rate([path_250, str(text_path)], 250) == 250
+    with pytest.raises(ValueError):
+        resolve_sampling_rate([path_250, path_500], 250)
+    with pytest.raises(ValueError):
+        resolve_sampling_rate([path_500, str(text_path)], 250)
+
+
+def test_edf_plus_annotation_signal_is_not_a_lead(tmp_path):
+    ecg = np.rint(synth_ecg(seconds=5)).astype(np.int16)
+    annotations = np.zeros(5 * 30, dtype=np.int16)  # TAL bytes, 60 bytes per record
+    path = str(tmp_path / "rec.edf")
+    write_edf(path, [ecg, ecg // 2, annotations], ["ECG I", "ECG II", "EDF Annotations"], [250, 250, 30])
+
+    segments, timestamps = read_edf(path)
+    assert len(segments) == 5 and segments[0].shape == (2, 250)
+    assert np.allclose(np.concatenate([segment[1] for segment in segments]), ecg // 2)
+    with pytest.raises(IndexError):
+        read_edf(path, target_lead=3)
+    assert resolve_sampling_rate([path], 500) == 250
+
+
+def test_read_lead_window_uses_binary_lead_count(tmp_path):
+    ecg = np.rint(synth_ecg(seconds=20)).astype(np.int16)
+    path = write_wfdb16(tmp_path, "rec", [ecg, ecg, ecg // 3], 250)
+
+    # The configured lead count (2) does not apply to a 3-signal record
+    record_times, segments = read_lead_window(path, START_TS + 5, START_TS + 8, target_lead=3, total_leads=2)
+    assert len(segments) == 3 and record_times[0] == START_TS + 5
+    assert np.allclose(np.concatenate(segments), (ecg // 3)[5 * 250:8 * 250])
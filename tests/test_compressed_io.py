@@ -0,0 +1,132 @@
+import gzip
+import logging
+import threading
+import zipfile
+import numpy as np
+import pytest
+
+import compressed_io
+from compressed_io import (
+    FRAME_INDEX_DTYPE, MAX_DECODE_THREADS, compress_seekable, iter_line_offsets, iter_lines, iter_lines_from,
+    list_input_files, read_byte_range
+)
+from data_read import iter_merged_records
+from ecg_synth import START_TS, synth_ecg, write_text_record
+
+
+def test_corrupt_zip_bundle_is_skipped(tmp_path, caplog):
+    write_text_record(tmp_path / "a.txt", synth_ecg(seconds=2))
+    with zipfile.ZipFile(tmp_path / "good.zip", "w") as bundle:
+        bundle.write(tmp_path / "a.txt", "b.txt")
+    (tmp_path / "bad.zip").write_bytes(b"PK\x03\x04 not a zip archive")
+
+    with caplog.at_level(logging.WARNING):
+        paths = list_input_files(str(tmp_path))
+    assert [p.split(str(tmp_path))[1] for p in paths] == ["/a.txt", "/good.zip::b.txt"]
+    assert "bad.zip" in caplog.text
+
+
+def test_merge_of_many_compressed_inputs_bounds_decode_threads(tmp_path):
+    n_files = 3 * MAX_DECODE_THREADS
+    for idx in range(n_files):
+        # Interleaved records: every input stays open until the end of the merge
+        path = write_text_record(tmp_path / f"rec_{idx}.txt", synth_ecg(seconds=5, seed=idx),
+                                 start_ts=START_TS + idx / n_files)
+        with open(path, "rb") as src, gzip.open(str(tmp_path / f"rec_{idx}.txt.gz"), "wb") as dst:
+            dst.write(src.read())
+    plain = [str(tmp_path / f"rec_{idx}.txt") for idx in range(n_files)]
+    compressed = [path + ".gz" for path in plain]
+
+    baseline = threading.active_count()
+    peak = 0
+    records = []
+    for record_ts, samples in iter_merged_records(compressed, 1, 1):
+        peak = max(peak, threading.active_count())
+        records.append((record_ts, samples))
+    assert peak - baseline <= MAX_DECODE_THREADS
+
+    expected = list(iter_merged_records(plain, 1, 1))
+    assert len(records) == len(expected) == 5 * n_files
+    assert all(ts == ref_ts and np.array_equal(s, ref_s) for (ts, s), (ref_ts, ref_s) in zip(records, expected))
+
+
+@pytest.fixture()
+def plain_record(tmp_path):
+    return write_text_record(tmp_path / "rec.txt", np.stack([synth_ecg(seconds=40, seed=3)] * 2))
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".zst"])
+def test_compress_seekable_round_trip_and_frame_index(plain_record, suffix):
+    if suffix == ".zst":
+        pytest.importorskip("zstandard")
+    with open(plain_record, "rb") as f:
+        plain = f.read()
+    path = plain_record + suffix
+    n_frames = compress_seekable(plain_record, path, frame_bytes=len(plain) // 7)
+    assert 7 <= n_frames <= 8
+
+    frames = []
+    offsets_and_lines = list(iter_line_offsets(path, frames))
+    assert b"".join(line for _, line in offsets_and_lines) == plain
+    assert all(plain[offset:offset + len(line)] == line for offset, line in offsets_and_lines)
+    frames = np.array(frames, dtype=FRAME_INDEX_DTYPE)
+    assert len(frames) == n_frames and frames["offset"][0] == 0
+    # Every frame starts on a line boundary of the decompressed stream
+    assert all(offset == 0 or plain[offset - 1:offset] == b"\n" for offset in frames["offset"].tolist())
+    assert b"".join(iter_lines(path)) == plain
+
+    line_starts = [offset for offset, _ in offsets_and_lines]
+    for start in (0, line_starts[13], int(frames["offset"][3]), line_starts[-1]):
+        assert b"".join(iter_lines_from(path, start, frames)) == plain[start:]
+        assert b"".join(iter_lines_from(path, start)) == plain[start:]  # Without index: decode from the start
+    for start, stop in ((0, 10), (line_starts[5], line_starts[30]), (int(frames["offset"][2]) - 3,
+                                                                     int(frames["offset"][4]) + 3),
+                        (len(plain) - 5, len(plain))):
+        assert read_byte_range(path, start, stop, frames) == plain[start:stop]
+        assert read_byte_range(path, start, stop) == plain[start:stop]
+
+
+def test_frame_index_skips_earlier_frames(plain_record, monkeypatch):
+    path = plain_record + ".gz"
+    compress_seekable(plain_record, path, frame_bytes=1 << 14)
+    frames = []
+    for _ in iter_line_offsets(path, frames):
+        pass
+    frames = np.array(frames, dtype=FRAME_INDEX_DTYPE)
+    decoded_from = []
+    original = compressed_io.iter_decompressed_blocks
+
+    def tracking(path, compressed_offset=0):
+        decoded_from.append(compressed_offset)
+        return original(path, compressed_offset)
+
+    monkeypatch.setattr(compressed_io, "iter_decompressed_blocks", tracking)
+    start = int(frames["offset"][-2]) + 1
+    read_byte_range(path, start, start + 100, frames)
+    assert decoded_from == [int(frames["compressed_offset"][-2])]
+
+
+def test_zstd_inputs_merge_like_plain_inputs(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    plain, compressed = [], []
+    for idx in range(3):
+        path = write_text_record(tmp_path / f"rec_{idx}.txt", synth_ecg(seconds=20, seed=idx),
+                                 start_ts=START_TS + 10 * idx)
+        with open(path, "rb") as src:
+            (tmp_path / f"rec_{idx}.txt.zst").write_bytes(zstandard.ZstdCompressor().compress(src.read()))
+        plain.append(path)
+        compressed.append(path + ".zst")
+    assert sorted(list_input_files(str(tmp_path))) == sorted(plain + compressed)
+
+    records = list(iter_merged_records(compressed, 1, 1))
+    expected = list(iter_merged_records(plain, 1, 1))
+    assert len(records) == len(expected) == 40
+    assert all(ts == ref_ts and np.array_equal(s, ref_s) for (ts, s), (ref_ts, ref_s) in zip(records, expected))
+
+
+def test_corrupt_zstd_input_raises(tmp_path):
+    pytest.importorskip("zstandard")
+    path = tmp_path / "bad.txt.zst"
+    path.write_bytes(b"\x28\xb5\x2f\xfd" + b"garbage" * 10)
+    with pytest.raises(OSError, match="Corrupt zstd"):
+        list(iter_lines(str(path)))
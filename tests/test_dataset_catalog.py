@@ -0,0 +1,127 @@
+import json
+import os
+import numpy as np
+import pytest
+
+from compressed_io import compress_seekable
+from data_read import iter_merged_records
+from dataset_catalog import CATALOG_FILE_NAME, DatasetCatalog
+from ecg_synth import START_TS, write_text_record
+
+STRIDE = 10
+
+
+def _constant_file(path, value, seconds, start_ts):
+    """Text input whose samples all equal `value` (identifies the file a record came from)."""
+    return write_text_record(path, np.full((1, seconds * 250), value), start_ts=start_ts)
+
+
+@pytest.fixture()
+def folder(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    _constant_file(data / "a.txt", 1, 100, START_TS)
+    _constant_file(data / "b.txt", 2, 100, START_TS + 80)  # Overlaps a by 20 s
+    plain = _constant_file(tmp_path / "c.txt", 3, 60, START_TS + 300)
+    compress_seekable(plain, str(data / "c.txt.gz"), frame_bytes=os.path.getsize(plain) // 6)
+    (data / "empty.txt").write_text("")
+    return data
+
+
+def _records(records):
+    return [(ts, float(samples[0])) for ts, samples in records]
+
+
+def test_build_and_incremental_refresh(folder):
+    catalog = DatasetCatalog(str(folder), index_stride=STRIDE)
+    assert catalog.refresh() == {"reused": 0, "indexed": 4, "removed": 0}
+    assert os.path.exists(folder / CATALOG_FILE_NAME)
+
+    a, gz, empty = catalog.entries["a.txt"], catalog.entries["c.txt.gz"], catalog.entries["empty.txt"]
+    assert (a["format"], a["records"], a["first_ts"], a["last_ts"]) == ("text", 100, START_TS, START_TS + 99)
+    assert len(a["index"]) == 10 and a["frames"] == []
+    assert (gz["format"], gz["records"], gz["first_ts"]) == ("gzip", 60, START_TS + 300)
+    assert len(gz["frames"]) >= 6
+    assert empty["first_ts"] is None and empty["records"] == 0
+    assert catalog.time_span() == (START_TS, START_TS + 359)
+
+    # Reloaded from disk: nothing is re-read
+    reopened = DatasetCatalog(str(folder), index_stride=STRIDE)
+    assert reopened.load() and reopened.entries == json.loads(json.dumps(catalog.entries))
+    assert reopened.refresh() == {"reused": 4, "indexed": 0, "removed": 0}
+    # Another stride invalidates the saved catalog
+    assert not DatasetCatalog(str(folder), index_stride=STRIDE + 1).load()
+
+    # Changed mtime (same size): re-indexed; removed and new inputs
+    stat = os.stat(folder / "a.txt")
+    os.utime(folder / "a.txt", (stat.st_atime, stat.st_mtime + 10))
+    os.remove(folder / "b.txt")
+    _constant_file(folder / "d.txt", 4, 30, START_TS + 500)
+    reopened = DatasetCatalog.open(str(folder), index_stride=STRIDE)
+    assert sorted(os.path.basename(path) for path in reopened.files()) == ["a.txt", "c.txt.gz", "d.txt", "empty.txt"]
+    assert reopened.entries["a.txt"]["mtime"] == stat.st_mtime + 10
+    assert reopened.entries["a.txt"]["index"] == a["index"]
+    assert DatasetCatalog.open(str(folder), index_stride=STRIDE, refresh=False).refresh() == \
+        {"reused": 4, "indexed": 0, "removed": 0}
+
+
+def test_refresh_counts(folder):
+    catalog = DatasetCatalog.open(str(folder), index_stride=STRIDE)
+    stat = os.stat(folder / "c.txt.gz")
+    os.utime(folder / "c.txt.gz", (stat.st_atime, stat.st_mtime + 5))
+    os.remove(folder / "empty.txt")
+    assert catalog.refresh() == {"reused": 2, "indexed": 1, "removed": 1}
+
+
+def test_files_in_range(folder):
+    catalog = DatasetCatalog.open(str(folder), index_stride=STRIDE)
+    names = lambda start, end: [os.path.basename(path) for path in catalog.files_in_range(start, end)]
+    assert names(None, None) == ["a.txt", "b.txt", "c.txt.gz"]  # Time order, no empty input
+    assert names(START_TS + 90, START_TS + 95) == ["a.txt", "b.txt"]
+    assert names(START_TS + 99, START_TS + 100) == ["a.txt", "b.txt"]  # Last record of a included
+    assert names(START_TS + 100, START_TS + 300) == ["b.txt"]  # End is exclusive
+    assert names(START_TS + 200, START_TS + 250) == []
+    assert names(None, START_TS + 1) == ["a.txt"]
+    assert names(START_TS + 350, None) == ["c.txt.gz"]
+
+
+def _line_offsets(path):
+    offsets, position = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            offsets.append(position)
+            position += len(line)
+    return offsets
+
+
+def test_seek_offset_is_the_last_index_entry_before_the_start(folder):
+    catalog = DatasetCatalog.open(str(folder), index_stride=STRIDE)
+    path = str(folder / "a.txt")
+    offsets = _line_offsets(path)
+    assert catalog.seek_offset(path, None) == 0
+    assert catalog.seek_offset(path, START_TS - 5) == 0
+    assert catalog.seek_offset(path, START_TS + 35) == offsets[30]
+    assert catalog.seek_offset(path, START_TS + 30) == offsets[20]  # A record at start_ts is not skipped
+    assert catalog.seek_offset(path, START_TS + 500) == offsets[90]
+
+    # Compressed input: offsets in the decompressed stream
+    gz = str(folder / "c.txt.gz")
+    offset = catalog.seek_offset(gz, START_TS + 335)
+    assert offset == _line_offsets(str(folder.parent / "c.txt"))[30]
+    records = _records(catalog.iter_range_records(gz, START_TS + 335, START_TS + 340, 1, 1))
+    assert records == [(START_TS + second, 3.0) for second in range(335, 340)]
+
+
+@pytest.mark.parametrize("start, end", [(None, None), (START_TS + 45.5, START_TS + 330),
+                                        (START_TS + 85, START_TS + 90), (START_TS + 99, None),
+                                        (START_TS + 200, START_TS + 250)])
+def test_iter_range_equals_filtered_full_merge(folder, start, end):
+    catalog = DatasetCatalog.open(str(folder), index_stride=STRIDE)
+    lo = -np.inf if start is None else start
+    hi = np.inf if end is None else end
+    full = [record for record in _records(iter_merged_records(catalog.files(), 1, 1)) if lo <= record[0] < hi]
+
+    merge_stats = {}
+    ranged = _records(catalog.iter_range(start, end, target_lead=1, total_leads=1, merge_stats=merge_stats))
+    assert ranged == full
+    assert merge_stats["records"] == len(full)
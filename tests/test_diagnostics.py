@@ -0,0 +1,43 @@
+import logging
+import numpy as np
+
+from data_read import read_single_file_lead_data
+from diagnostics import FileDiagnostics
+from ecg_synth import synth_ecg, write_text_record
+
+
+def test_warnings_are_counted_with_capped_samples():
+    diagnostics = FileDiagnostics("rec.txt", max_samples=2)
+    for line_no in range(5):
+        diagnostics.warn('data_error', f"bad {line_no}", line_no)
+    diagnostics.warn('json_decode_error', "oops")
+    assert diagnostics.total == 6
+    assert diagnostics.summary() == {
+        'data_error': {"count": 5, "samples": ["line 0: bad 0", "line 1: bad 1"]},
+        'json_decode_error': {"count": 1, "samples": ["oops"]},
+    }
+
+
+def test_one_summary_line_per_category(caplog):
+    diagnostics = FileDiagnostics("rec.txt")
+    for _ in range(100):
+        diagnostics.warn('data_error', "KeyError('data')")
+    with caplog.at_level(logging.WARNING):
+        diagnostics.emit()
+    assert len(caplog.records) == 1
+    assert "100 x data_error in rec.txt" in caplog.text
+
+
+def test_reader_aggregates_malformed_lines_per_file(tmp_path, caplog):
+    path = write_text_record(tmp_path / "rec.txt", synth_ecg(seconds=3))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("not json\n" * 4 + '{"recordTime": 0}\n' * 2)
+
+    diagnostics = FileDiagnostics("rec.txt")
+    with caplog.at_level(logging.WARNING):
+        segments, _ = read_single_file_lead_data(path, 1, 1, diagnostics=diagnostics)
+    assert len(segments) == 3 and np.all([len(segment) == 250 for segment in segments])
+    assert diagnostics.counts == {'json_decode_error': 4, 'data_error': 2}
+    assert diagnostics.samples['json_decode_error'][0].startswith("line 4: ")
+    assert len(diagnostics.samples['json_decode_error']) == diagnostics.max_samples
+    assert sum("Warning:" in record.getMessage() for record in caplog.records) == 2
@@ -0,0 +1,128 @@
+import math
+import time
+import numpy as np
+import pytest
+
+from event_index import EventIndex, event_styles_for, event_times_to_epoch, load_event_file
+
+pd = pytest.importorskip("pandas")
+
+# Not minute-aligned, no DST nearby
+EVENT_TS = pd.Timestamp('2024-03-05 10:00:07').timestamp()
+
+
+def test_window_times_and_counts():
+    index = EventIndex([50, 10, 30, 20, 40, 10], ['B', 'A', 'A', 'B', 'C', 'B'])
+    assert len(index) == 6 and index.counts() == {'B': 3, 'A': 2, 'C': 1}
+    assert index.times('B').tolist() == [10, 20, 50]
+    assert index.times('X').size == 0
+    assert index.window(20, 40, 'B').tolist() == [20]
+    assert {t: v.tolist() for t, v in index.window(20, 40).items()} == {'B': [20], 'A': [30], 'C': [40]}
+    assert index.window(event_type='A').tolist() == [10, 30]  # Open bounds
+    assert index.window(60, 70, 'A').size == 0
+    with pytest.raises(ValueError):
+        index.times('A')[0] = 0  # Read-only
+    with pytest.raises(ValueError, match="mismatch"):
+        EventIndex([1, 2], ['A'])
+
+
+def test_type_order_is_first_seen_and_stable():
+    # 'C' sorts last alphabetically but is seen first; equal times keep their order within a type
+    index = EventIndex([5, 1, 5, 3, 2], ['C', 'A', 'C', 'A', 'B'])
+    assert index.types == ['C', 'A', 'B']
+    assert index.times('C').tolist() == [5, 5] and index.times('A').tolist() == [1, 3]
+    assert list(event_styles_for(index.types)) == ['A', 'B', 'C']  # Defaults kept, nothing added
+    styles = event_styles_for(['A', 'X', 'Y'])
+    assert styles['X'] != styles['Y'] and styles['A']['color'] == 'red'
+
+    empty = EventIndex([], [])
+    assert not empty and empty.types == [] and empty.window(0, 1) == {}
+
+
+def test_event_times_to_epoch_naive_aware_and_invalid():
+    naive = pd.Series(pd.to_datetime(['2024-03-05 10:00:07', None]))
+    assert event_times_to_epoch(naive)[0] == pd.Timestamp('2024-03-05 10:00:07').timestamp()
+    assert math.isnan(event_times_to_epoch(naive)[1])
+
+    aware = pd.Series(pd.to_datetime(['2024-03-05 10:00:07', None])).dt.tz_localize('Europe/Berlin')
+    assert event_times_to_epoch(aware)[0] == EVENT_TS - 3600 and math.isnan(event_times_to_epoch(aware)[1])
+
+    # Strings (CSV cells): naive, with mixed UTC offsets, unparseable
+    strings = pd.Series(['2024-03-05 10:00:07', 'not a time', ''])
+    epoch = event_times_to_epoch(strings)
+    assert epoch[0] == EVENT_TS and np.isnan(epoch[1:]).all()
+    offsets = pd.Series(['2024-03-05 10:00:07+01:00', '2024-03-05 10:00:07+00:00', 'not a time'])
+    epoch = event_times_to_epoch(offsets)
+    assert epoch[:2].tolist() == [EVENT_TS - 3600, EVENT_TS] and np.isnan(epoch[2])
+
+
+def _event_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp('2024-03-05') + pd.to_timedelta(np.round(rng.uniform(0, 7 * 86400, n)), unit='s')
+    return pd.DataFrame({'Time': times, 'Type': rng.choice(['A', 'B', 'C', 'D'], n)})
+
+
+def _check_loaded(index, df, event_types):
+    kept = df[df['Type'].isin(event_types)] if event_types is not None else df
+    assert len(index) == len(kept)
+    for event_type in index.types:
+        expected = np.sort(kept.loc[kept['Type'] == event_type, 'Time'].map(pd.Timestamp.timestamp).to_numpy())
+        assert np.array_equal(index.times(event_type), expected)
+
+
+def test_load_csv_with_configured_types(tmp_path):
+    df = _event_frame(500)
+    path = str(tmp_path / "events.csv")
+    out = df.copy()
+    out['Type'] = " " + out['Type']  # Padded type cells are stripped
+    out.to_csv(path, index=False)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("not a time,A\n")
+
+    _check_loaded(load_event_file(path), df, ['A', 'B', 'C'])
+    _check_loaded(load_event_file(path, event_types=None), df, None)
+    assert load_event_file(path, event_types=['D']).types == ['D']
+
+
+def test_load_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = _event_frame(500, seed=1)
+    path = str(tmp_path / "events.parquet")
+    df.to_parquet(path)
+    _check_loaded(load_event_file(path, event_types=None), df, None)
+
+
+def test_load_xlsx(tmp_path):
+    pytest.importorskip("openpyxl")
+    df = _event_frame(50, seed=2)
+    path = str(tmp_path / "events.xlsx")
+    df.to_excel(path, index=False)
+    _check_loaded(load_event_file(path, event_types=None), df, None)
+    with pytest.raises(ValueError, match="Unsupported"):
+        load_event_file(str(tmp_path / "events.json"))
+
+
+def _time_import(path, n, budget_s):
+    start = time.perf_counter()
+    index = load_event_file(path, event_types=None)
+    elapsed = time.perf_counter() - start
+    assert len(index) == n
+    assert elapsed < budget_s, f"{n} events imported in {elapsed:.2f} s"
+
+
+def test_import_100k_csv_events_within_a_second(tmp_path):
+    n = 100_000
+    df = _event_frame(n, seed=3)
+    df['Time'] = df['Time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    path = str(tmp_path / "events.csv")
+    df.to_csv(path, index=False)
+    _time_import(path, n, 1.0)
+
+
+def test_import_100k_xlsx_events_within_a_second(tmp_path):
+    # Excel sheets reach the target with the calamine reader only (openpyxl takes ~5 s)
+    pytest.importorskip("python_calamine")
+    n = 100_000
+    path = str(tmp_path / "events.xlsx")
+    _event_frame(n, seed=4).to_excel(path, index=False)
+    _time_import(path, n, 1.5)
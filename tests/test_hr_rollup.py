@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+import numpy as np
+
+from hr_rollup import HRRollup
+
+
+def _ts(day, hour, minute):
+    return (datetime(2024, 3, 5) + timedelta(days=day, hours=hour, minutes=minute)).timestamp()
+
+
+def _row(rollup, level, group):
+    return next(row for row in rollup.rows(level) if row["group"] == group)
+
+
+def test_pooled_levels_do_not_difference_across_days():
+    # One minute per day at 10:30 / 23:30: no two points share an hour or a period
+    timestamps = [_ts(day, hour, 30) for day in range(5) for hour in (10, 23)]
+    heart_rates = [60 + 10 * day + hour for day in range(5) for hour in (10, 23)]
+    rollup = HRRollup.from_series(timestamps, heart_rates)
+
+    for level, group in (("hour_of_day", "10:00"), ("day_night", "day"), ("day_night", "night")):
+        row = _row(rollup, level, group)
+        assert row["count"] == 5
+        assert row["rmssd"] is None and row["pnn50"] is None
+
+
+def test_pooled_levels_match_within_run_differences():
+    # Two points per day in the same hour and night; day-to-day jumps must not count
+    values = {0: (70, 80, 50, 55), 1: (60, 62, 90, 91), 2: (100, 130, 40, 40)}
+    timestamps, heart_rates = [], []
+    for day, (a, b, c, d) in values.items():
+        timestamps += [_ts(day, 10, 0), _ts(day, 10, 1), _ts(day, 23, 59), _ts(day + 1, 0, 1)]
+        heart_rates += [a, b, c, d]
+
+    whole = HRRollup.from_series(timestamps, heart_rates)
+    per_day = HRRollup()
+    for start in range(0, len(timestamps), 4):
+        per_day.update(timestamps[start:start + 4], heart_rates[start:start + 4])
+    assert whole.to_dict() == per_day.to_dict()
+
+    hour_diffs = np.array([b - a for a, b, _, _ in values.values()], dtype=float)
+    row = _row(whole, "hour_of_day", "10:00")
+    assert row["rmssd"] == round(float(np.sqrt(np.mean(hour_diffs ** 2))), 2)
+    assert row["pnn50"] == round(100 * np.mean(np.abs(hour_diffs) > 5), 2)
+
+    # A night runs past midnight: 23:59 -> 00:01 is one run
+    night_diffs = np.array([d - c for _, _, c, d in values.values()], dtype=float)
+    row = _row(whole, "day_night", "night")
+    assert row["rmssd"] == round(float(np.sqrt(np.mean(night_diffs ** 2))), 2)
+
+
+def test_merged_rollups_keep_runs():
+    timestamps = [_ts(0, 10, 0), _ts(0, 10, 1), _ts(1, 10, 0), _ts(1, 10, 1)]
+    heart_rates = [70, 72, 90, 93]
+    first = HRRollup.from_series(timestamps[:3], heart_rates[:3])
+    merged = first.merge(HRRollup.from_series(timestamps[3:], heart_rates[3:]))
+    assert merged.to_dict() == HRRollup.from_series(timestamps, heart_rates).to_dict()
+    assert _row(merged, "hour_of_day", "10:00")["rmssd"] == round(float(np.sqrt((4 + 9) / 2)), 2)
@@ -0,0 +1,53 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from hr_scatter_view import HRScatterView
+from hr_series import HRSeries
+from ecg_synth import START_TS
+
+
+def _series(minutes, start=0):
+    series = HRSeries()
+    series.extend(START_TS + 60 * np.arange(start, start + minutes), 70 + np.arange(start, start + minutes) % 20)
+    return series
+
+
+def test_view_follows_data_until_zoomed():
+    view = HRScatterView()
+    series = _series(60)
+    view.set_series(series)
+    first_view = view.ax.get_xlim()
+    assert not view.is_zoomed
+
+    series.extend(START_TS + 60 * np.arange(60, 120), np.full(60, 150.0))
+    view.set_series(series)
+    assert view.ax.get_xlim()[1] > first_view[1] and view.ax.get_ylim()[1] > 150
+
+    # User zooms in: new batches keep the zoomed view
+    view.ax.set_xlim(first_view[0], first_view[0] + 0.01)
+    zoomed = view.ax.get_xlim() + view.ax.get_ylim()
+    series.extend(START_TS + 60 * np.arange(120, 180), np.full(60, 40.0))
+    view.set_series(series)
+    assert view.is_zoomed
+    assert view.ax.get_xlim() + view.ax.get_ylim() == zoomed
+
+    # Back to the data view (toolbar Home): the next batch extends it again
+    view.ax.set_xlim(*view._applied_limits[0])
+    view.ax.set_ylim(*view._applied_limits[1])
+    assert not view.is_zoomed
+    series.extend(START_TS + 60 * np.arange(180, 240), np.full(60, 70.0))
+    view.set_series(series)
+    assert view.ax.get_ylim()[0] < 40
+    view.close()
+
+
+def test_clear_resets_zoom():
+    view = HRScatterView()
+    view.set_series(_series(30))
+    view.ax.set_xlim(0, 1)
+    view.clear()
+    assert not view.is_zoomed
+    view.set_series(_series(30, start=1000))
+    assert view.ax.get_xlim()[0] > 1
+    view.close()
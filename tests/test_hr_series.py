@@ -0,0 +1,83 @@
+import pickle
+import numpy as np
+import pytest
+
+from hr_series import HRSeries
+
+
+def _series(n, start=0.0, step=60.0):
+    return HRSeries(start + step * np.arange(n), 60.0 + np.arange(n))
+
+
+def test_append_growth_keeps_points_and_chunked_capacity():
+    series = HRSeries()
+    n = 3 * HRSeries.CHUNK_SIZE + 7
+    versions = set()
+    for idx in range(n):
+        series.append(60.0 * idx, 60 + idx % 50, quality=0.5)
+        versions.add(series.version)
+    assert len(series) == n and len(versions) == n
+    assert len(series._ts) % HRSeries.CHUNK_SIZE == 0 and len(series._ts) >= n
+    assert np.array_equal(series.timestamps, 60.0 * np.arange(n))
+    assert np.array_equal(series.heart_rates, (60 + np.arange(n) % 50).astype(np.float32))
+    assert np.all(series.quality == 0.5) and series.is_sorted
+
+    series.append(0.0, 70)  # Out of order
+    assert not series.is_sorted
+    with pytest.raises(ValueError):
+        series.heart_rates[0] = 1  # Read-only views
+    with pytest.raises(ValueError, match="mismatch"):
+        series.extend([1.0, 2.0], [70.0])
+
+
+def test_merged_is_sorted_and_stable():
+    a = HRSeries([0.0, 120.0, 60.0], [1.0, 3.0, 2.0], [0.1, 0.3, 0.2])
+    b = HRSeries([60.0, 180.0], [20.0, 40.0])
+    merged = a.merged(b)
+    assert merged.is_sorted
+    assert merged.timestamps.tolist() == [0.0, 60.0, 60.0, 120.0, 180.0]
+    assert merged.heart_rates.tolist() == [1.0, 2.0, 20.0, 3.0, 40.0]  # `self` first on ties
+    assert np.allclose(merged.quality[:3], [0.1, 0.2, np.nan], equal_nan=True)
+    assert a.timestamps.tolist() == [0.0, 120.0, 60.0]  # Inputs untouched
+
+    restored = pickle.loads(pickle.dumps(merged))
+    assert restored.timestamps.tolist() == merged.timestamps.tolist() and restored.is_sorted
+
+
+@pytest.mark.parametrize("is_sorted", [True, False])
+def test_time_slice_selects_inclusive_range(is_sorted):
+    series = _series(10)
+    if not is_sorted:
+        series = HRSeries(series.timestamps[::-1], series.heart_rates[::-1])
+    part = series.time_slice(120, 360)
+    assert sorted(part.timestamps.tolist()) == [120.0, 180.0, 240.0, 300.0, 360.0]
+    assert part.is_sorted == is_sorted
+    assert len(series.time_slice(1000, 2000)) == 0
+    assert len(series.time_slice()) == 10
+
+
+@pytest.mark.parametrize("is_sorted", [True, False])
+def test_time_slice_is_isolated_from_parent(is_sorted):
+    series = _series(10)
+    if not is_sorted:
+        series.append(30.0, 1.0)
+    expected = series.heart_rates.copy()
+
+    part = series.time_slice(120, 360)
+    with pytest.raises(ValueError):
+        part.heart_rates[0] = 999
+    part.clear()
+    part.extend([1.0], [999.0])
+    part.append(2.0, 998.0)
+    assert np.array_equal(series.heart_rates, expected)
+    assert part.heart_rates.tolist() == [999.0, 998.0]
+
+    # Changes to the parent do not show through an earlier slice either
+    part = series.time_slice(120, 360)
+    sliced = part.heart_rates.copy()
+    series.append(0.0, 1.0)
+    series.sort()
+    assert np.array_equal(part.heart_rates, sliced)
+    series.clear()
+    series.extend(np.arange(10.0), np.zeros(10))
+    assert np.array_equal(part.heart_rates, sliced)
@@ -0,0 +1,151 @@
+import random
+import numpy as np
+import pytest
+
+from data_read import get_ecg_file_list, iter_file_records, iter_merged_records, read_single_file_lead_data
+from dataset_catalog import DatasetCatalog
+from ecg_analysis import ECGStreamFilter, analyze_single_file_hr, iter_minute_hr
+from ecg_synth import START_TS, synth_ecg, write_text_record
+from hr_rollup import HRRollup
+from hr_shard import (
+    build_shard, build_stitched_shard, merge_shards, read_shard, select_shard_files, select_shard_range,
+    shard_results, shard_rr_intervals, write_shard
+)
+from hr_stats import HRStatsAccumulator
+
+FILE_SECONDS = 150  # Not minute-aligned: minutes at file boundaries are cut in per-file mode
+
+
+@pytest.fixture(scope="module")
+def study(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("study")
+    for idx, hr in enumerate((62, 70, 85, 75, 98)):
+        signal = synth_ecg(seconds=FILE_SECONDS, hr=hr, wander=0.2, seed=idx)
+        write_text_record(folder / f"rec_{idx}.txt", [signal * 0.5, signal], start_ts=START_TS + idx * FILE_SECONDS)
+    return str(folder)
+
+
+def _results(shard):
+    series, stats_acc, rollup = shard_results(shard)
+    return series.timestamps.tolist(), series.heart_rates.tolist(), stats_acc.to_stats(), rollup.to_dict()
+
+
+@pytest.mark.parametrize("use_prefilter", [False, True])
+def test_sharded_run_matches_monolithic_run(study, tmp_path, use_prefilter):
+    files = get_ecg_file_list(study)
+    params = dict(target_lead=2, total_leads=2, sampling_rate=250, use_prefilter=use_prefilter)
+    monolithic = build_shard(files, study, **params)
+
+    shard_paths = []
+    for idx in range(3):
+        path = str(tmp_path / f"shard_{idx}.json")
+        write_shard(build_shard(select_shard_files(files, idx, 3), study, **params), path)
+        shard_paths.append(path)
+    random.Random(0).shuffle(shard_paths)
+    merged = merge_shards([read_shard(path) for path in shard_paths])
+    staged = merge_shards([merge_shards([read_shard(shard_paths[0]), read_shard(shard_paths[2])]),
+                           read_shard(shard_paths[1])])
+
+    expected = _results(monolithic)
+    assert len(expected[0]) > 0
+    assert _results(merged) == expected
+    assert _results(staged) == expected
+
+
+def test_shards_match_gui_per_file_mode(study):
+    files = get_ecg_file_list(study)
+    shard = build_shard(files, study, target_lead=2, total_leads=2, use_prefilter=True)
+
+    # GUI per-file loop: one filter, restarted for every file, results accumulated file by file
+    prefilter = ECGStreamFilter(250)
+    stats_acc, rollup, heart_rates = HRStatsAccumulator(), HRRollup(), []
+    for path in files:
+        prefilter.reset()
+        segments, timestamps = read_single_file_lead_data(path, 2, 2)
+        file_ts, file_hr = analyze_single_file_hr(segments, timestamps, 250, prefilter=prefilter)
+        file_hr = np.array(file_hr, dtype=np.float32)
+        stats_acc.update_many(file_hr)
+        rollup.update(np.array(file_ts), file_hr)
+        heart_rates.extend(file_hr.tolist())
+
+    series, shard_stats, shard_rollup = shard_results(shard)
+    assert series.heart_rates.tolist() == heart_rates
+    assert shard_stats.to_stats() == stats_acc.to_stats()
+    assert shard_rollup.to_dict() == rollup.to_dict()
+
+
+def test_merge_rejects_mismatched_shards(study):
+    files = get_ecg_file_list(study)
+    filtered = build_shard(files[:2], study, target_lead=2, total_leads=2, use_prefilter=True)
+    unfiltered = build_shard(files[2:], study, target_lead=2, total_leads=2, use_prefilter=False)
+    with pytest.raises(ValueError, match="prefilter"):
+        merge_shards([filtered, unfiltered])
+    with pytest.raises(ValueError, match="more than one shard"):
+        merge_shards([filtered, filtered])
+
+
+def _stitched_run(folder, target_lead, use_prefilter):
+    # GUI default mode: one merged record stream, one filter for the whole run
+    prefilter = ECGStreamFilter(250) if use_prefilter else None
+    records = iter_merged_records(get_ecg_file_list(folder), target_lead, 2)
+    return list(iter_minute_hr(records, 250, prefilter=prefilter))
+
+
+@pytest.mark.parametrize("use_prefilter", [False, True])
+def test_stitched_shards_match_gui_stitched_mode(study, tmp_path, use_prefilter):
+    catalog = DatasetCatalog.open(study, catalog_path=str(tmp_path / "catalog.json"))
+    params = dict(target_lead=2, total_leads=2, sampling_rate=250, use_prefilter=use_prefilter)
+    ranges = [select_shard_range(catalog.time_span(), idx, 3) for idx in range(3)]
+    assert all(start % 60 == 0 and end % 60 == 0 for start, end in ranges)
+    assert ranges[0][0] <= START_TS and ranges[-1][1] > START_TS + 5 * FILE_SECONDS - 1
+    shards = [build_stitched_shard(catalog, start, end, **params) for start, end in ranges]
+    merged = merge_shards(shards[::-1])
+
+    series, stats_acc, _ = shard_results(merged)
+    expected = _stitched_run(study, 2, use_prefilter)
+    assert series.timestamps.tolist() == [minute[0] for minute in expected]
+    # Minutes spanning two files are analyzed whole: one per minute of the study
+    assert len(series) == len(set(minute[0] for minute in expected)) == 5 * FILE_SECONDS // 60 + 1
+    # The prefilter warm-up before each range reproduces the filter state of the single run
+    expected_hr = np.float32([minute[1] for minute in expected])
+    assert series.heart_rates.tolist() == expected_hr.tolist()
+    assert series.quality.tolist() == np.float32([minute[2] for minute in expected]).tolist()
+    assert stats_acc.to_stats() == HRStatsAccumulator.from_values(expected_hr).to_stats()
+
+    with pytest.raises(ValueError, match="overlap"):
+        merge_shards([shards[0], build_stitched_shard(catalog, ranges[0][0] + 60, ranges[1][1], **params)])
+    with pytest.raises(ValueError, match="mode"):
+        merge_shards([shards[0], build_shard(get_ecg_file_list(study)[-1:], study, **params)])
+
+
+def test_shards_store_r_peaks_of_every_minute(study):
+    files = get_ecg_file_list(study)
+    shard = build_shard(files[:2], study, target_lead=2, total_leads=2, use_prefilter=True)
+    for entry in shard["files"]:
+        assert len(entry["r_peaks"]) == len(entry["heart_rates"])
+        assert entry["best_leads"] == [0] * len(entry["heart_rates"])
+
+    series, _, _ = shard_results(shard)
+    rr_intervals = shard_rr_intervals(shard)
+    assert len(rr_intervals) == len(series)
+    for rr, hr in zip(rr_intervals, series.heart_rates.tolist()):
+        # The minute's HR is the mean of its beat-to-beat rates
+        assert np.mean(60 / rr) == pytest.approx(hr, rel=1e-6)
+    first_file_rr = np.concatenate(rr_intervals[:len(shard["files"][0]["r_peaks"])])
+    assert np.median(first_file_rr) == pytest.approx(60 / 62, abs=0.01)
+
+
+def test_multi_lead_shards_match_gui_multi_lead_mode(study):
+    files = get_ecg_file_list(study)
+    shard = build_shard(files, study, target_lead=None, total_leads=2, use_prefilter=True)
+    assert shard["params"]["target_lead"] is None
+
+    prefilter = ECGStreamFilter(250)
+    expected = []
+    for path in files:
+        prefilter.reset()
+        expected.extend(iter_minute_hr(list(iter_file_records(path, None, 2)), 250, prefilter=prefilter))
+    series, _, _ = shard_results(shard)
+    assert series.heart_rates.tolist() == np.float32([minute[1] for minute in expected]).tolist()
+    assert series.best_lead.tolist() == [minute[3] for minute in expected]
+    assert set(series.best_lead.tolist()) <= {1, 2} and len(series) > 0
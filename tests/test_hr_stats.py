@@ -0,0 +1,94 @@
+import json
+import math
+import numpy as np
+import pytest
+
+from ecg_analysis import calculate_hr_time_domain_stats
+from hr_stats import HIST_BIN_BPM, HRStatsAccumulator
+
+
+def _hr(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (70 + 10 * np.sin(np.arange(n) / 500) + rng.normal(0, 4, n)).astype(np.float32)
+
+
+def test_merge_of_chunks_equals_single_pass():
+    values = _hr(70000)
+    single = HRStatsAccumulator.from_values(values)
+
+    merged = HRStatsAccumulator()
+    for chunk in np.array_split(values, 7):
+        merged.merge(HRStatsAccumulator.from_values(chunk))
+    # Chunks of chunks: (a + b) + (c + ...) in time order
+    staged = HRStatsAccumulator.from_values(values[:100]).merge(
+        HRStatsAccumulator.from_values(values[100:5000]).merge(HRStatsAccumulator.from_values(values[5000:])))
+
+    for acc in (merged, staged):
+        assert acc.count == single.count
+        assert acc.mean == pytest.approx(single.mean, rel=1e-12)
+        assert acc.variance == pytest.approx(single.variance, rel=1e-9)
+        assert (acc.min, acc.max, acc.diff_count, acc.diff_over) == \
+            (single.min, single.max, single.diff_count, single.diff_over)
+        assert acc.diff_sq_sum == pytest.approx(single.diff_sq_sum, rel=1e-9)
+        assert np.array_equal(acc.hist, single.hist)
+    assert merged.to_stats() == single.to_stats()
+    exact = calculate_hr_time_domain_stats(values)
+    # Stats are rounded to 2 decimals; the histogram median may land on the neighbouring step
+    assert single.to_stats() == pytest.approx(exact, abs=HIST_BIN_BPM + 1e-9)
+
+
+def test_update_matches_update_many_and_skips_nan():
+    values = _hr(1000, seed=1)
+    one_by_one = HRStatsAccumulator()
+    for value in np.r_[values[:10], np.nan, values[10:]]:
+        one_by_one.update(value)
+    batched = HRStatsAccumulator().update_many(np.r_[values[:500], np.nan]).update_many(values[500:])
+    assert one_by_one.count == batched.count == 1000
+    assert one_by_one.to_stats() == batched.to_stats()
+
+
+@pytest.mark.parametrize("q", [0, 1, 5, 25, 50, 75, 95, 99, 100])
+def test_percentiles_within_bin_width(q):
+    values = _hr(20001, seed=2)
+    acc = HRStatsAccumulator.from_values(values)
+    assert abs(acc.percentile(q) - np.percentile(values.astype(np.float64), q)) <= HIST_BIN_BPM
+    if q == 50:
+        assert abs(acc.median() - np.median(values.astype(np.float64))) <= HIST_BIN_BPM
+
+
+def test_state_round_trip():
+    acc = HRStatsAccumulator.from_values(_hr(5000, seed=3))
+    restored = HRStatsAccumulator.from_state(json.loads(json.dumps(acc.to_state())))
+    assert restored.to_state() == acc.to_state()
+    assert np.array_equal(restored.hist, acc.hist)
+    assert restored.to_stats() == acc.to_stats()
+    # Restored accumulators keep merging like the original
+    tail = HRStatsAccumulator.from_values(_hr(10, seed=4))
+    assert restored.merge(tail).to_state() == acc.copy().merge(tail).to_state()
+
+    empty = HRStatsAccumulator.from_state(json.loads(json.dumps(HRStatsAccumulator().to_state())))
+    assert empty.count == 0 and empty.min == np.inf and empty.last is None
+
+
+def test_empty_accumulator():
+    acc = HRStatsAccumulator()
+    assert len(acc) == 0 and acc.to_stats() == {}
+    assert math.isnan(acc.variance) and math.isnan(acc.median()) and math.isnan(acc.percentile(90))
+    acc.update_many([])
+    acc.merge(HRStatsAccumulator())
+    assert acc.count == 0 and acc.first is None
+
+    values = _hr(50, seed=5)
+    assert HRStatsAccumulator().merge(HRStatsAccumulator.from_values(values)).to_state() == \
+        HRStatsAccumulator.from_values(values).to_state()
+    assert HRStatsAccumulator.from_values([72.0]).to_stats() == {}  # One value: no stats yet
+
+
+def test_merge_order_matters_only_for_successive_differences():
+    a, b = np.full(100, 60.0), np.full(100, 90.0)
+    ab = HRStatsAccumulator.from_values(a).merge(HRStatsAccumulator.from_values(b))
+    ba = HRStatsAccumulator.from_values(b).merge(HRStatsAccumulator.from_values(a))
+    assert (ab.count, ab.mean, ab.m2, ab.min, ab.max) == (ba.count, ba.mean, ba.m2, ba.min, ba.max)
+    assert np.array_equal(ab.hist, ba.hist)
+    assert ab.diff_count == ba.diff_count == 199 and ab.diff_over == ba.diff_over == 1
+    assert (ab.first, ab.last) == (60.0, 90.0) and (ba.first, ba.last) == (90.0, 60.0)
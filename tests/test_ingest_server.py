@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import numpy as np
+import pytest
+
+import ingest_server
+from ecg_synth import START_TS
+from ingest_server import HRIngestServer, benchmark_ingest, query_status, send_records, synthetic_record_lines
+
+
+def _run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=60))
+
+
+async def _consumed(server, device_id, n_lines):
+    # send_records returns once the lines are written; wait until the server has taken all of them
+    while True:
+        state = server.devices.get(device_id)
+        if state is not None and state.records + state.diagnostics.total >= n_lines:
+            break
+        await asyncio.sleep(0.01)
+    await server.drain()
+
+
+def test_devices_get_minute_hr_and_stats():
+    async def scenario():
+        server = HRIngestServer(port=0, target_lead=2, total_leads=2, queue_size=8)
+        await server.start()
+        await asyncio.gather(
+            send_records(synthetic_record_lines(START_TS, 150, total_leads=2, heart_rate=72), port=server.port,
+                         device_id="bed-1"),
+            send_records(synthetic_record_lines(START_TS, 150, total_leads=2, heart_rate=60, seed=1),
+                         port=server.port, device_id="bed-2"))
+        await _consumed(server, "bed-1", 150)
+        await _consumed(server, "bed-2", 150)
+        live = await query_status(port=server.port)
+        one = await query_status(port=server.port, device_id="bed-2")
+        await server.stop()
+        return live, one, server.status()
+
+    live, one, final = _run(scenario())
+    assert sorted(live["devices"]) == ["bed-1", "bed-2"]
+    assert live["devices"]["bed-1"]["records"] == 150 and live["devices"]["bed-1"]["rejected_records"] == 0
+    assert live["devices"]["bed-1"]["minutes"] == 2  # The third minute is still open
+    assert one["device"]["minutes"] == 2 and one["device"]["latest"]["timestamp"] == START_TS + 120
+
+    # stop() flushes the open 30 s minute
+    for device_id, hr in (("bed-1", 72), ("bed-2", 60)):
+        status = final[device_id]
+        assert status["minutes"] == 3 and status["latest"]["timestamp"] == START_TS + 180
+        assert status["latest"]["heart_rate"] == pytest.approx(hr, abs=1)
+        assert status["stats"]["mean_hr"] == pytest.approx(hr, abs=1)
+
+
+def test_backpressure_bounds_the_device_queue():
+    queue_size = 4
+
+    async def scenario():
+        server = HRIngestServer(port=0, target_lead=1, total_leads=9, queue_size=queue_size)
+        await server.start()
+        queued = []
+        sending = asyncio.ensure_future(send_records(synthetic_record_lines(START_TS, 240), port=server.port,
+                                                     device_id="fast"))
+        while not sending.done():
+            state = server.devices.get("fast")
+            if state is not None:
+                queued.append(state.queue.qsize())
+                queued.append((await query_status(port=server.port, device_id="fast"))["device"]["queued_records"])
+            await asyncio.sleep(0)
+        await sending
+        await _consumed(server, "fast", 240)
+        await server.stop()
+        return queued, server.status("fast")
+
+    queued, status = _run(scenario())
+    assert queued and max(queued) <= queue_size
+    assert status["records"] == 240 and status["queued_records"] == 0
+
+
+def test_bad_lines_are_rejected_and_counted():
+    lines = synthetic_record_lines(START_TS, 70, total_leads=1)
+    lines[10:10] = [b'not json at all, but long enough ' * 40 + b'\n', b'{"recordTime": 1, "data": {}}\n']
+
+    async def scenario():
+        server = HRIngestServer(port=0, target_lead=1, total_leads=1)
+        await server.start()
+        await send_records(lines, port=server.port, device_id="noisy")
+        await _consumed(server, "noisy", len(lines))
+        status = await query_status(port=server.port, device_id="noisy")
+        unknown = await query_status(port=server.port, device_id="missing")
+        await server.stop()
+        return status["device"], unknown
+
+    status, unknown = _run(scenario())
+    assert status["rejected_records"] == 2 and status["records"] == 70
+    assert status["minutes"] == 1
+    assert unknown == {"device": None}
+
+
+def test_benchmark_runs_clients_out_of_process():
+    result = benchmark_ingest(n_devices=2, seconds=70, total_leads=2, target_lead=1)
+    assert result["records"] == 140 and result["minutes_analyzed"] >= 2
+    assert result["server_cpu_s"] > 0 and result["devices_per_core"] != result["records_per_s"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGINT delivery to a child process")
+def test_serve_cli_flushes_open_minutes_on_ctrl_c():
+    module_dir = os.path.dirname(os.path.abspath(ingest_server.__file__))
+    process = subprocess.Popen([sys.executable, "-u", os.path.join(module_dir, "ingest_server.py"), "serve",
+                                "--port", "0", "--target-lead", "1", "--total-leads", "1"],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        port = None
+        while port is None:
+            line = process.stderr.readline()
+            assert line, "server exited before listening"
+            match = re.search(r"listening on .*:(\d+)", line)
+            port = int(match.group(1)) if match else None
+
+        async def send():
+            await send_records(synthetic_record_lines(START_TS, 90, total_leads=1), port=port, device_id="bed")
+            while (await query_status(port=port, device_id="bed"))["device"]["records"] < 90:
+                await asyncio.sleep(0.05)
+
+        _run(send())
+        process.send_signal(signal.SIGINT)
+        stdout, _ = process.communicate(timeout=30)
+    finally:
+        if process.poll() is None:
+            process.kill()
+    status = json.loads(stdout)["devices"]["bed"]
+    assert status["minutes"] == 2  # One complete minute + the open 30 s flushed on Ctrl-C
+    assert status["latest"]["timestamp"] == START_TS + 120 and np.isfinite(status["stats"]["mean_hr"])
@@ -0,0 +1,88 @@
+import gzip
+import threading
+import time
+import numpy as np
+
+from data_read import get_file_start_time, iter_file_records, iter_merged_records
+from ecg_synth import START_TS, write_text_record
+
+
+def _constant_file(path, value, seconds, start_ts):
+    """Text input whose samples all equal `value` (identifies the file a record came from)."""
+    return write_text_record(path, np.full((1, seconds * 250), value), start_ts=start_ts)
+
+
+def _tracked_opener(open_now, peak):
+    def open_records(path):
+        open_now.add(path)
+        peak.append(len(open_now))
+        try:
+            yield from iter_file_records(path, 1, 1)
+        finally:
+            open_now.discard(path)
+    return open_records
+
+
+def test_files_are_opened_in_time_order_only_when_reached(tmp_path):
+    # Listed in reverse time order; one file overlaps its neighbour
+    paths = [_constant_file(tmp_path / f"rec_{idx}.txt", idx, 10, START_TS + 100 * (9 - idx)) for idx in range(10)]
+    paths.append(_constant_file(tmp_path / "overlap.txt", 99, 10, START_TS + 5))
+    open_now, peak = set(), []
+
+    records = list(iter_merged_records(paths, 1, 1, open_records=_tracked_opener(open_now, peak)))
+    timestamps = [ts for ts, _ in records]
+    assert timestamps == sorted(timestamps) and len(timestamps) == 10 * 10 + 5
+    assert max(peak) == 2  # Only the overlapping pair is ever open together
+    assert not open_now  # All files closed
+
+
+def test_duplicates_keep_the_earlier_listed_file(tmp_path):
+    late = _constant_file(tmp_path / "a.txt", 1, 10, START_TS + 5)
+    early = _constant_file(tmp_path / "b.txt", 2, 10, START_TS)
+    merge_stats = {}
+    records = dict((ts - START_TS, samples[0]) for ts, samples in
+                   iter_merged_records([late, early], 1, 1, merge_stats=merge_stats))
+    assert merge_stats == {"records": 15, "duplicates": 5}
+    assert [records[second] for second in range(15)] == [2] * 5 + [1] * 10
+
+
+def test_read_ahead_parses_on_background_threads(tmp_path):
+    paths = [_constant_file(tmp_path / f"rec_{idx}.txt", idx, 10, START_TS + 7 * idx) for idx in range(4)]
+    reader_threads = set()
+
+    def open_records(path):
+        for record in iter_file_records(path, 1, 1):
+            reader_threads.add(threading.current_thread())
+            yield record
+
+    inline_stats, ahead_stats = {}, {}
+    inline = list(iter_merged_records(paths, 1, 1, merge_stats=inline_stats))
+    ahead = list(iter_merged_records(paths, 1, 1, merge_stats=ahead_stats, open_records=open_records,
+                                     read_ahead=3))
+    assert inline_stats == ahead_stats == {"records": 31, "duplicates": 9}
+    assert [ts for ts, _ in ahead] == [ts for ts, _ in inline]
+    assert all(np.array_equal(s, ref_s) for (_, s), (_, ref_s) in zip(ahead, inline))
+    assert threading.current_thread() not in reader_threads
+
+    # Stopping early stops the reader threads
+    baseline = threading.active_count()
+    records = iter_merged_records(paths, 1, 1, read_ahead=2)
+    next(records)
+    assert threading.active_count() > baseline
+    records.close()
+    deadline = time.monotonic() + 5
+    while threading.active_count() > baseline and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == baseline
+
+
+def test_start_time_of_compressed_and_empty_inputs(tmp_path):
+    path = _constant_file(tmp_path / "rec.txt", 1, 3, START_TS + 42)
+    with open(path, 'rb') as src, gzip.open(str(tmp_path / "rec.txt.gz"), 'wb') as dst:
+        dst.write(src.read())
+    (tmp_path / "empty.txt").write_text("")
+    assert get_file_start_time(str(tmp_path / "rec.txt.gz")) == START_TS + 42
+    assert get_file_start_time(str(tmp_path / "empty.txt")) is None
+
+    records = list(iter_merged_records([str(tmp_path / "empty.txt"), path], 1, 1))
+    assert [ts - START_TS for ts, _ in records] == [42, 43, 44]
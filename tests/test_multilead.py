@@ -0,0 +1,55 @@
+import json
+import numpy as np
+
+from analysis_job import AnalysisJob
+from data_export import export_to_json
+from ecg_analysis import ECGStreamFilter, iter_minute_hr
+from ecg_synth import START_TS, synth_ecg
+from hr_series import HRSeries
+
+
+def _records(leads, sampling_rate=250):
+    signals = np.vstack(leads)
+    return [(START_TS + second, signals[:, second * sampling_rate:(second + 1) * sampling_rate])
+            for second in range(signals.shape[1] // sampling_rate)]
+
+
+def _multilead_minutes():
+    rng = np.random.default_rng(1)
+    noise_only = rng.normal(0, 300, 180 * 250)
+    clean = synth_ecg(seconds=180, hr=70, noise=0.005, seed=2)
+    second = synth_ecg(seconds=180, hr=70, noise=0.1, seed=3)
+    return list(iter_minute_hr(_records([noise_only, clean, second]), 250, quality_gate=True,
+                               prefilter=ECGStreamFilter(250)))
+
+
+def test_best_lead_is_reported_per_minute_as_lead_number():
+    minutes = _multilead_minutes()
+    assert len(minutes) == 3
+    assert np.allclose([hr for _, hr, _, _ in minutes], 70, atol=0.5)
+    # Lead 1 fails the quality check; the best voter is reported by its number among all leads
+    assert [best_lead for _, _, _, best_lead in minutes] == [2, 2, 2]
+
+
+def test_single_lead_minutes_have_no_best_lead():
+    records = [(ts, samples[0]) for ts, samples in _records([synth_ecg(seconds=120)])]
+    minutes = list(iter_minute_hr(records, 250))
+    assert len(minutes) == 2 and [best_lead for *_, best_lead in minutes] == [0, 0]
+
+
+def test_best_lead_is_carried_into_results_and_export(tmp_path):
+    minutes = _multilead_minutes()
+    job = AnalysisJob()
+    job.publish(1, "merged batch 1", *zip(*minutes))
+    batch = job.drain()[0]
+    series = HRSeries()
+    series.extend(batch.timestamps, batch.heart_rates, batch.quality, batch.best_lead)
+    series.extend(HRSeries([START_TS + 600], [80.0]))  # A single-lead point
+    assert series.best_lead.tolist() == [2, 2, 2, 0]
+    assert series.time_slice(START_TS + 120, START_TS + 180).best_lead.tolist() == [2, 2]
+
+    path = str(tmp_path / "hr.json")
+    assert export_to_json(series, export_path=path)
+    with open(path, encoding='utf-8') as f:
+        exported = json.load(f)["heart_rate_time_domain"]
+    assert exported["best_leads"] == [2, 2, 2, None]
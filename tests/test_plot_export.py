@@ -0,0 +1,67 @@
+import os
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from hrv_analysis import plot_hr_histogram
+from plot_export import FigureCache, export_all_plots, split_by_subject, subject_of
+from ecg_synth import START_TS
+
+
+def test_figure_cache_returns_independent_figures():
+    heart_rates = np.random.default_rng(0).normal(70, 5, 500)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return plot_hr_histogram(heart_rates)
+
+    open_figures = plt.get_fignums()
+    cache = FigureCache()
+    first = cache.get("histogram", 1, build)
+    second = cache.get("histogram", 1, build)
+    assert len(builds) == 1
+    assert first is not second
+    assert first.axes[0].patches[0] is not second.axes[0].patches[0]
+    assert plt.get_fignums() == open_figures  # Copies are not kept alive by pyplot
+
+    first.axes[0].set_xlim(0, 1)  # Zoom in one window does not leak into the next
+    assert cache.get("histogram", 1, build).axes[0].get_xlim() == second.axes[0].get_xlim()
+    cache.get("histogram", 2, build)
+    assert len(builds) == 2
+
+
+def test_export_all_plots_in_spawned_workers(tmp_path):
+    timestamps = START_TS + 60 * np.arange(180)
+    heart_rates = 70 + 5 * np.sin(np.arange(180) / 20)
+    written = export_all_plots(timestamps, heart_rates, str(tmp_path), group_by="all", dpi=50, max_workers=1,
+                               kinds=["histogram", "poincare"])
+    assert sorted(os.path.basename(path) for path in written) == ["hr_all_histogram.png", "hr_all_poincare.png"]
+
+
+def test_subject_labels_from_prefix_or_folder(tmp_path):
+    assert subject_of("/data/P001_2024-03-05.json") == "P001"
+    assert subject_of("/data/P002-night.json") == "P002"
+    assert subject_of("/data/P003.json") == "P003"
+    assert subject_of(str(tmp_path / "subject A" / "day1.json"), source="folder") == "subject A"
+    with pytest.raises(ValueError):
+        subject_of("/data/P001.json", source="device")
+
+
+def test_export_all_plots_per_subject(tmp_path):
+    timestamps = START_TS + 60 * np.arange(120)
+    heart_rates = 70 + 5 * np.sin(np.arange(120) / 20)
+    subjects = np.where(np.arange(120) % 3 == 0, "P1", "subject A")  # Interleaved in time
+
+    groups = split_by_subject(timestamps[::-1], heart_rates[::-1], subjects[::-1])
+    assert [label for label, _, _ in groups] == ["P1", "subject A"]
+    assert np.array_equal(groups[0][1], timestamps[::3]) and np.array_equal(groups[0][2], heart_rates[::3])
+
+    written = export_all_plots(timestamps, heart_rates, str(tmp_path), group_by="subject", subjects=subjects,
+                               dpi=50, max_workers=1, kinds=["histogram"])
+    assert sorted(os.path.basename(path) for path in written) == ["hr_P1_histogram.png",
+                                                                  "hr_subject_A_histogram.png"]
+    with pytest.raises(ValueError, match="subject"):
+        export_all_plots(timestamps, heart_rates, str(tmp_path), group_by="subject")
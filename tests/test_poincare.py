@@ -0,0 +1,65 @@
+import math
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from hr_series import HRSeries
+from hrv_analysis import POINCARE_DENSITY_THRESHOLD, compute_poincare_sd, plot_hr_poincare
+
+
+def _hr(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 70 + np.cumsum(rng.normal(0, 0.5, n)) * 0.1 + rng.normal(0, 2, n)
+
+
+def test_sd1_sd2_match_textbook_formulas():
+    hr = _hr(500)
+    sd = compute_poincare_sd(hr)
+
+    # Points rotated by 45 degrees: SD1/SD2 are the sample std perpendicular to / along the identity line
+    x, y = hr[:-1].tolist(), hr[1:].tolist()
+    across = [(b - a) / math.sqrt(2) for a, b in zip(x, y)]
+    along = [(b + a) / math.sqrt(2) for a, b in zip(x, y)]
+
+    def sample_std(values):
+        mean = sum(values) / len(values)
+        return math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+
+    assert sd["sd1"] == pytest.approx(sample_std(across), rel=1e-9)
+    assert sd["sd2"] == pytest.approx(sample_std(along), rel=1e-9)
+    assert sd["sd1_sd2_ratio"] == pytest.approx(sd["sd1"] / sd["sd2"])
+    assert (sd["center_x"], sd["center_y"]) == pytest.approx((np.mean(x), np.mean(y)))
+    # SD1^2 = SDSD^2 / 2 and SD1^2 + SD2^2 = 2 * SDNN^2 (up to end effects of the pairs)
+    assert sd["sd1"] ** 2 == pytest.approx(np.var(np.diff(hr), ddof=1) / 2, rel=1e-9)
+    assert sd["sd1"] ** 2 + sd["sd2"] ** 2 == pytest.approx(2 * np.var(hr, ddof=1), rel=0.02)
+
+
+def test_sd_of_constant_and_short_series():
+    sd = compute_poincare_sd(HRSeries(np.arange(5.0), np.full(5, 60.0)))
+    assert sd["sd1"] == 0 and sd["sd2"] == 0 and math.isnan(sd["sd1_sd2_ratio"])
+    with pytest.raises(ValueError):
+        compute_poincare_sd([70, 71])
+
+
+@pytest.mark.parametrize("pairs, density", [(POINCARE_DENSITY_THRESHOLD, False),
+                                            (POINCARE_DENSITY_THRESHOLD + 1, True)])
+def test_density_rendering_switches_at_threshold(pairs, density):
+    fig = plot_hr_poincare(_hr(pairs + 1))
+    try:
+        ax = fig.axes[0]
+        assert bool(ax.images) == density
+        assert bool(ax.collections) == (not density)  # One scatter collection in point mode
+        assert ('Density' in ax.get_title()) == density
+        assert any(type(patch).__name__ == 'Ellipse' for patch in ax.patches)
+    finally:
+        plt.close(fig)
+
+
+def test_density_mode_can_be_forced():
+    fig = plot_hr_poincare(_hr(100), density=True, bins=10)
+    try:
+        assert fig.axes[0].images[0].get_array().shape == (10, 10)
+    finally:
+        plt.close(fig)
@@ -0,0 +1,62 @@
+import time
+import threading
+import numpy as np
+
+from prefetch import PrefetchReader, estimate_loaded_bytes
+
+
+def _loader(expansion):
+    """Load an input as zeros of `expansion` x its size; tracks how many results are alive."""
+    state = {"alive": 0, "peak": 0, "lock": threading.Lock()}
+
+    def load(path):
+        with open(path, 'rb') as f:
+            data = np.zeros(len(f.read()) * expansion, dtype=np.uint8)
+        with state["lock"]:
+            state["alive"] += 1
+            state["peak"] = max(state["peak"], state["alive"])
+        return data
+    return load, state
+
+
+def _inputs(tmp_path, count, size):
+    paths = []
+    for idx in range(count):
+        path = tmp_path / f"in_{idx}.bin"
+        path.write_bytes(b'x' * size)
+        paths.append(str(path))
+    return paths
+
+
+def test_memory_cap_counts_parsed_bytes(tmp_path):
+    paths = _inputs(tmp_path, 8, 1000)
+    load, state = _loader(expansion=10)
+    # 25 KB cap: two parsed files (10 KB each) fit, although all inputs together are only 8 KB
+    with PrefetchReader(paths, load, depth=4, memory_cap_bytes=25_000, sizeof=estimate_loaded_bytes) as reader:
+        seen = []
+        for prefetched in reader:
+            assert prefetched.loaded_bytes >= 10_000
+            seen.append(prefetched.index)
+            time.sleep(0.05)  # Analysis: read-ahead finishes meanwhile
+            state["alive"] -= 1  # Consumer is done with the file
+    assert seen == list(range(8))
+    assert state["peak"] == 2
+    assert reader.expansion >= 10
+
+
+def test_without_sizeof_cap_counts_input_bytes(tmp_path):
+    paths = _inputs(tmp_path, 6, 1000)
+    load, state = _loader(expansion=10)
+    with PrefetchReader(paths, load, depth=4, memory_cap_bytes=25_000) as reader:
+        for prefetched in reader:
+            assert prefetched.loaded_bytes is None
+            time.sleep(0.05)
+            state["alive"] -= 1
+    assert state["peak"] == 5  # Current file + depth 4
+
+
+def test_estimate_loaded_bytes_of_parsed_records():
+    segments = [[float(v) for v in range(250)] for _ in range(60)]
+    estimate = estimate_loaded_bytes((segments, [1.0] * 60))
+    assert 60 * 250 * 24 <= estimate <= 60 * 250 * 40
+    assert estimate_loaded_bytes([np.zeros((9, 250))] * 4) >= 4 * 9 * 250 * 8
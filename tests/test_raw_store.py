@@ -0,0 +1,28 @@
+import logging
+import numpy as np
+
+from ecg_synth import START_TS, synth_ecg, write_text_record
+from raw_store import convert_to_raw_store
+
+
+def test_int16_store_keeps_integer_samples_silently(tmp_path, caplog):
+    signal = np.rint(synth_ecg(seconds=120))
+    path = write_text_record(tmp_path / "rec.txt", [signal, -signal])
+    with caplog.at_level(logging.WARNING):
+        store = convert_to_raw_store([path], str(tmp_path / "store"), total_leads=2)
+    assert "rounded" not in caplog.text
+    assert np.array_equal(store.data[:, 1], -signal[:len(store.data)])
+    assert store.minute_ranges()[0][0] == (2024, 3, 5, 10, 0)
+
+
+def test_int16_store_warns_about_rounded_samples(tmp_path, caplog):
+    path = tmp_path / "rec.txt"
+    path.write_text('{"recordTime": %r, "data": {"waveDataList": [{"waveDataVoList": '
+                    '[{"sample": 1.25}, {"sample": 2.0}, {"sample": -3.5}]}]}}\n' % START_TS)
+    with caplog.at_level(logging.WARNING):
+        store = convert_to_raw_store([str(path)], str(tmp_path / "store"), total_leads=1)
+    assert "2 non-integer samples rounded" in caplog.text
+    assert store.data[:, 0].tolist() == [1, 2, -4]
+
+    float_store = convert_to_raw_store([str(path)], str(tmp_path / "float_store"), total_leads=1, dtype='float32')
+    assert float_store.data[:, 0].tolist() == [1.25, 2.0, -3.5]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from ecg_synth import one_second_segments, synth_ecg
+from ecg_analysis import ECGStreamFilter, analyze_single_file_hr
+from signal_quality import compute_window_quality
+
+
+def _analyze(signal, quality_gate, prefilter):
+    segments, timestamps = one_second_segments(signal)
+    return analyze_single_file_hr(segments, timestamps, 250, quality_gate, return_quality=True,
+                                  prefilter=ECGStreamFilter(250) if prefilter else None)
+
+
+@pytest.mark.parametrize("signal", [
+    synth_ecg(wander=0.3),  # Baseline wander: plain kurtosis ~4
+    np.rint(synth_ecg(r_amp=50, noise=0.004)),  # Quantized, R wave of 50 counts: most steps are 0
+    np.rint(synth_ecg(r_amp=50, noise=0.004, wander=0.3)),
+], ids=["wander", "quantized", "quantized-wander"])
+def test_gate_keeps_clean_minutes(signal):
+    ts, hr, quality = _analyze(signal, quality_gate=True, prefilter=True)
+    assert len(hr) == 1
+    assert hr[0] == pytest.approx(70.0, abs=0.1)
+    assert compute_window_quality([signal], 250)["passed"][0]
+
+
+def test_gate_is_off_by_default():
+    segments, timestamps = one_second_segments(np.r_[synth_ecg(seconds=20), np.zeros(250 * 40)])
+    assert len(analyze_single_file_hr(segments, timestamps, 250)[1]) == 1
+
+
+@pytest.mark.parametrize("signal", [
+    np.r_[synth_ecg(seconds=20), np.full(250 * 40, 3.0)],  # Lead off for 40 s
+    np.random.default_rng(1).normal(0, 100, 250 * 60),  # Noise only
+    np.clip(synth_ecg(wander=0.3), -200, 150),  # Saturated ADC (hidden by the prefilter)
+], ids=["flatline", "noise", "clipping"])
+def test_gate_rejects_bad_minutes(signal):
+    assert _analyze(signal, quality_gate=True, prefilter=True)[1] == []
+    assert _analyze(signal, quality_gate=True, prefilter=False)[1] == []
+
+
+def test_flatline_is_relative_to_amplitude():
+    quantized = np.rint(synth_ecg(r_amp=50, noise=0.004))
+    assert np.mean(np.diff(quantized) == 0) > 0.5
+    assert compute_window_quality([quantized], 250)["flatline_fraction"][0] == 0.0
+    lead_off = np.r_[synth_ecg(seconds=20), np.full(250 * 40, 3.0)]
+    assert compute_window_quality([lead_off], 250)["flatline_fraction"][0] > 0.5
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from ecg_analysis import ECGStreamFilter, benchmark_stream_filter
+from ecg_synth import synth_ecg
+
+
+def _segments(signal, sizes):
+    bounds = np.cumsum([0] + list(sizes))
+    return [signal[..., b0:b1] for b0, b1 in zip(bounds[:-1], bounds[1:])]
+
+
+@pytest.mark.parametrize("leads", [1, 3])
+def test_segmented_process_equals_one_shot(leads):
+    signal = np.stack([synth_ecg(seconds=20, wander=0.3, seed=k) for k in range(leads)]).squeeze()
+    one_shot = ECGStreamFilter(250).process(signal, 0.0)
+
+    stream_filter = ECGStreamFilter(250)
+    sizes = [250] * 5 + [17, 483, 1, 3249]  # Uneven segments, still contiguous in time
+    out, record_ts = [], 0.0
+    for segment in _segments(signal, sizes):
+        out.append(stream_filter.process(segment, record_ts))
+        record_ts += segment.shape[-1] / 250
+    assert sum(sizes) == signal.shape[-1]
+    assert np.allclose(np.concatenate(out, axis=-1), one_shot, rtol=0, atol=1e-9)
+
+
+def test_gap_resets_the_state():
+    first, second = _segments(synth_ecg(seconds=4, wander=0.3), [500, 500])
+    fresh = ECGStreamFilter(250).process(second, 10.0)
+
+    stream_filter = ECGStreamFilter(250, max_gap_s=1.0)
+    stream_filter.process(first, 0.0)
+    continued = stream_filter.process(second, 2.5)  # 0.5 s gap: state carried
+    assert not np.allclose(continued, fresh)
+
+    stream_filter.process(first, 20.0)
+    after_gap = stream_filter.process(second, 23.5)  # 1.5 s gap: restarted
+    assert np.allclose(after_gap, fresh, rtol=0, atol=1e-9)
+
+
+def test_zero_phase_keeps_peak_positions():
+    signal = synth_ecg(seconds=10, wander=0.3)
+    filtered = ECGStreamFilter(250).apply_zero_phase(signal)
+    assert filtered.shape == signal.shape
+    beat = int(60 / 70 * 250)
+    # Largest sample of a clean beat stays on the raw R wave
+    assert abs(int(np.argmax(np.abs(filtered[beat:2 * beat]))) - int(np.argmax(signal[beat:2 * beat]))) <= 2
+
+
+def test_benchmark_stream_filter_runs():
+    result = benchmark_stream_filter(n_leads=2, seconds=5)
+    assert result["samples"] == 2 * 250 * 5
+    assert result["elapsed_s"] >= 0 and result["samples_per_s"] > 0
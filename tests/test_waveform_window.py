@@ -0,0 +1,79 @@
+import gzip
+import os
+import numpy as np
+import pytest
+
+from data_read import build_record_offset_index, read_lead_window, read_single_file_lead_data
+from ecg_analysis import ECGStreamFilter
+from ecg_synth import START_TS, synth_ecg, write_text_record
+from waveform_viewer import MinMaxPyramid, detect_window_peaks, load_waveform_window
+
+
+@pytest.mark.parametrize("n", [1, 2, 1000, 1023])
+def test_pyramid_envelope_matches_block_min_max(n):
+    signal = np.random.default_rng(n).normal(size=n)
+    pyramid = MinMaxPyramid(signal)
+    for start, stop, max_points in ((0, n, 10), (3, n - 5, 64), (0, n, 5000)):
+        block_starts, mins, maxs = pyramid.envelope(start, stop, max_points)
+        if stop <= start:
+            assert len(block_starts) == 0
+            continue
+        block = 1 if len(block_starts) < 2 else int(block_starts[1] - block_starts[0])
+        assert len(mins) <= max(max_points, 1) * 2 + 1
+        for b0, lo, hi in zip(block_starts, mins, maxs):
+            chunk = signal[b0:b0 + block]
+            assert lo == chunk.min() and hi == chunk.max()
+        assert block_starts[0] <= max(start, 0) < block_starts[0] + block
+        assert block_starts[-1] < stop
+
+
+@pytest.fixture()
+def text_record(tmp_path):
+    leads = np.stack([synth_ecg(seconds=30, seed=1), synth_ecg(seconds=30, seed=2) / 2])
+    return write_text_record(tmp_path / "rec.txt", leads)
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_window_read_matches_full_read(text_record, compressed):
+    path = text_record
+    if compressed:
+        with open(path, 'rb') as src, gzip.open(path + ".gz", 'wb') as dst:
+            dst.write(src.read())
+        path += ".gz"
+    index = build_record_offset_index(path)
+    assert len(index) == 30 and np.all(np.diff(index['record_ts']) > 0)
+    assert build_record_offset_index(path) is index  # Cached
+
+    segments, timestamps = read_single_file_lead_data(path, 2, 2)
+    record_times, window = read_lead_window(path, START_TS + 10.5, START_TS + 14, target_lead=2, total_leads=2)
+    # The record starting before the window is included
+    assert record_times.tolist() == [START_TS + second for second in range(10, 14)]
+    assert all(np.array_equal(got, want) for got, want in zip(window, segments[10:14]))
+    with pytest.raises(IndexError):
+        read_lead_window(path, START_TS, START_TS + 1, target_lead=3, total_leads=2)
+
+
+def test_offset_index_is_rebuilt_after_the_file_changes(text_record):
+    assert len(build_record_offset_index(text_record)) == 30
+    with open(text_record, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(text_record, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:5])
+    stat = os.stat(text_record)
+    os.utime(text_record, (stat.st_atime, stat.st_mtime + 10))
+    assert len(build_record_offset_index(text_record)) == 5
+
+
+def test_window_peaks_use_the_analysis_prefilter(tmp_path):
+    hr = 70
+    path = write_text_record(tmp_path / "rec.txt", synth_ecg(seconds=120, hr=hr, wander=0.3))
+    sample_times, samples = load_waveform_window([path], START_TS + 60, START_TS + 120, 1, 1)
+    assert len(samples) == 60 * 250 and sample_times[0] == START_TS + 60
+
+    peaks = detect_window_peaks(samples, 250, ECGStreamFilter(250))
+    assert len(peaks) == hr
+    # Zero-phase filtering keeps the peaks on the R waves of the raw trace (R at 0.2 s of each beat)
+    rr = 60.0 / hr
+    offset = np.mod(sample_times[peaks] - START_TS - 0.2 + rr / 2, rr) - rr / 2
+    assert np.abs(offset).max() < 0.03
+    assert len(detect_window_peaks(samples, 250)) > hr  # Unfiltered, T waves are counted as beats
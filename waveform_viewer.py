@@ -0,0 +1,236 @@
+import logging
+import functools
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+from data_read import get_file_time_span, build_record_offset_index, read_lead_window
+from compressed_io import file_cache_key
+from ecg_analysis import detect_r_peaks
+
+
+logger = logging.getLogger(__name__)
+
+SPAN_CACHE_FILES = 1024  # (first_ts, last_ts) of raw files kept (least recently used are evicted)
+
+
+class MinMaxPyramid:
+    """
+    Min/max decimation pyramid of a 1-D signal for fast zoomed-out drawing.
+
+    Level k stores the min and max of consecutive blocks of 2**k samples; drawing
+    picks the coarsest level that still gives enough points for the visible range.
+
+    Parameters:
+        signal (np.array): Signal samples.
+    """
+
+    def __init__(self, signal):
+        signal = np.asarray(signal, dtype=np.float64)
+        self.levels = [(signal, signal)]
+        mins, maxs = signal, signal
+        while len(mins) > 1:
+            n = len(mins) // 2 * 2
+            tail_min, tail_max = mins[n:], maxs[n:]
+            mins = np.concatenate([np.minimum(mins[:n:2], mins[1:n:2]), tail_min])
+            maxs = np.concatenate([np.maximum(maxs[:n:2], maxs[1:n:2]), tail_max])
+            self.levels.append((mins, maxs))
+
+    def envelope(self, start, stop, max_points=2000):
+        """
+        Return the min/max envelope of samples [start, stop) with at most ~max_points blocks.
+
+        Returns:
+            tuple: (block_start_indices, block_mins, block_maxs)
+        """
+        start = max(int(start), 0)
+        stop = min(int(stop), len(self.levels[0][0]))
+        if stop <= start:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty
+        level = 0
+        while level + 1 < len(self.levels) and (stop - start) >> level > max_points:
+            level += 1
+        mins, maxs = self.levels[level]
+        b0, b1 = start >> level, min(-(-stop >> level), len(mins))
+        return np.arange(b0, b1, dtype=np.int64) << level, mins[b0:b1], maxs[b0:b1]
+
+
+def _cached_time_span(file_path):
+    return _time_span_of(file_cache_key(file_path), file_path)
+
+
+@functools.lru_cache(maxsize=SPAN_CACHE_FILES)
+def _time_span_of(key, file_path):
+    return get_file_time_span(file_path)
+
+
+def detect_window_peaks(samples, sampling_rate=250, prefilter=None):
+    """
+    R-peaks of a raw waveform window, detected on the same preprocessing as the HR analysis.
+
+    With a prefilter (ECGStreamFilter of the analysis), detection runs on the
+    zero-phase filtered window, so the peaks stay aligned with the raw trace.
+
+    Returns:
+        np.array: Peak sample indices into `samples`.
+    """
+    detect_input = samples if prefilter is None else prefilter.apply_zero_phase(samples)
+    return detect_r_peaks(detect_input, sampling_rate)
+
+
+def load_waveform_window(file_paths, start_ts, end_ts, target_lead=4, total_leads=9, sampling_rate=250):
+    """
+    Load one lead between two timestamps from the raw files that overlap the window.
+
+    Files are selected by their first/last recordTime, and inside each file only the
+    lines of the window are decoded (see data_read.read_lead_window). Records repeated
+    across overlapping files are kept once.
+
+    Returns:
+        tuple: (sample_times (np.array epoch), samples (np.array))
+    """
+    record_times = []
+    segments = []
+    for file_path in file_paths:
+        span = _cached_time_span(file_path)
+        # A record may start up to one segment before the window; 1 s slack covers it
+        if span is None or span[1] < start_ts - 1 or span[0] >= end_ts:
+            continue
+        file_times, file_segments = read_lead_window(file_path, start_ts, end_ts, target_lead, total_leads,
+                                                     build_record_offset_index(file_path))
+        record_times.extend(file_times.tolist())
+        segments.extend(file_segments)
+
+    if not segments:
+        return np.empty(0), np.empty(0)
+
+    order = np.argsort(record_times, kind='stable')
+    sample_times = []
+    samples = []
+    last_ts = None
+    for idx in order:
+        if record_times[idx] == last_ts:
+            continue
+        last_ts = record_times[idx]
+        segment = segments[idx]
+        sample_times.append(last_ts + np.arange(len(segment)) / sampling_rate)
+        samples.append(segment)
+    sample_times = np.concatenate(sample_times)
+    samples = np.concatenate(samples)
+    keep = (sample_times >= start_ts) & (sample_times < end_ts)
+    return sample_times[keep], samples[keep]
+
+
+class WaveformViewer(tk.Toplevel):
+    """
+    Raw ECG waveform window for a time range, with detected R-peaks overlaid.
+
+    Only the requested window is decoded; Prev/Next load the adjacent windows. The
+    trace is drawn from a min/max pyramid, so zooming out redraws a bounded number
+    of points.
+
+    Parameters:
+        master (tk.Widget): Parent window.
+        file_paths (list): Raw ECG text files of the analyzed folder.
+        start_ts (float): Window start (epoch seconds).
+        end_ts (float): Window end (epoch seconds).
+        target_lead (int): Lead number (1-based).
+        total_leads (int): Total number of leads in data.
+        sampling_rate (int): Sampling rate in Hz.
+        prefilter (ECGStreamFilter, optional): Filter of the analysis, applied before R-peak detection.
+    """
+
+    MAX_DRAW_POINTS = 2000  # Envelope blocks drawn for the visible range
+
+    def __init__(self, master, file_paths, start_ts, end_ts, target_lead=4, total_leads=9, sampling_rate=250,
+                 prefilter=None):
+        super().__init__(master)
+        self.geometry("1100x500")
+        self.file_paths = file_paths
+        self.target_lead = target_lead
+        self.total_leads = total_leads
+        self.sampling_rate = sampling_rate
+        self.prefilter = prefilter
+        self.window_s = end_ts - start_ts
+        self.sample_times = np.empty(0)
+        self.pyramid = None
+
+        nav_frame = ttk.Frame(self, padding="5")
+        nav_frame.pack(fill='x')
+        ttk.Button(nav_frame, text="<< Prev", command=lambda: self.shift_window(-1)).pack(side='left', padx=5)
+        ttk.Button(nav_frame, text="Next >>", command=lambda: self.shift_window(1)).pack(side='left', padx=5)
+        self.info_label = ttk.Label(nav_frame, text="")
+        self.info_label.pack(side='left', padx=10)
+
+        self.fig = Figure(figsize=(11, 4), dpi=100)
+        self.ax = self.fig.add_subplot(111)
+        self.trace_line, = self.ax.plot([], [], color='black', linewidth=0.8, label=f'Lead {target_lead}')
+        self.peak_line, = self.ax.plot([], [], 'rv', markersize=6, label='Detected R-peaks')
+        self.ax.set_xlabel('Time (s from window start)', fontsize=10)
+        self.ax.set_ylabel('Amplitude', fontsize=10)
+        self.ax.grid(alpha=0.5, linestyle='--')
+        self.ax.legend(fontsize=9, loc='upper right')
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        toolbar = NavigationToolbar2Tk(self.canvas, self)
+        toolbar.update()
+        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+        self.load_window(start_ts, end_ts)
+
+    def load_window(self, start_ts, end_ts):
+        """Decode [start_ts, end_ts), rebuild the pyramid and R-peak overlay."""
+        self.start_ts, self.end_ts = start_ts, end_ts
+        self.title(f"Raw ECG - Lead {self.target_lead} - "
+                   f"{datetime.fromtimestamp(start_ts).strftime('%Y-%m-%d %H:%M:%S')} ~ "
+                   f"{datetime.fromtimestamp(end_ts).strftime('%H:%M:%S')}")
+        try:
+            self.sample_times, samples = load_waveform_window(
+                self.file_paths, start_ts, end_ts, self.target_lead, self.total_leads, self.sampling_rate)
+        except Exception as e:
+            logger.error(f"Error loading raw waveform: {e}")
+            self.sample_times, samples = np.empty(0), np.empty(0)
+
+        if not len(samples):
+            self.pyramid = None
+            self.trace_line.set_data([], [])
+            self.peak_line.set_data([], [])
+            self.info_label.config(text="No raw samples in this window.")
+            self.canvas.draw_idle()
+            return
+
+        self.pyramid = MinMaxPyramid(samples)
+        peaks = detect_window_peaks(samples, self.sampling_rate, self.prefilter)
+        self.peak_line.set_data(self.sample_times[peaks] - start_ts, samples[peaks])
+        self.info_label.config(text=f"{len(samples)} samples, {len(peaks)} R-peaks")
+
+        self.ax.set_xlim(0, self.window_s)
+        self.ax.set_ylim(samples.min() - 0.05 * np.ptp(samples), samples.max() + 0.1 * np.ptp(samples) + 1)
+        self._redraw_trace()
+
+    def shift_window(self, direction):
+        """Load the previous (-1) or next (+1) window."""
+        offset = direction * self.window_s
+        self.load_window(self.start_ts + offset, self.end_ts + offset)
+
+    def _on_xlim_changed(self, ax):
+        if self.pyramid is not None:
+            self._redraw_trace()
+
+    def _redraw_trace(self):
+        """Draw the visible range from the matching pyramid level (min/max zig-zag)."""
+        x0, x1 = self.ax.get_xlim()
+        times = self.sample_times - self.start_ts
+        start = int(np.searchsorted(times, x0, side='left'))
+        stop = int(np.searchsorted(times, x1, side='right'))
+        block_starts, mins, maxs = self.pyramid.envelope(start, stop, self.MAX_DRAW_POINTS)
+        x = np.repeat(times[block_starts], 2)
+        y = np.empty(2 * len(mins))
+        y[0::2], y[1::2] = mins, maxs
+        self.trace_line.set_data(x, y)
+        self.canvas.draw_idle()